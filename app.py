@@ -1,14 +1,39 @@
+import os
+import uuid
+from contextlib import nullcontext
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from funcoes_financeiras import (
-    calcular_juros_compostos, calcular_vpl, calcular_tir, 
+    calcular_juros_compostos, calcular_tir, 
     calcular_amortizacao_sac, calcular_amortizacao_price, calcular_amortizacao_sac_american,
     calcular_retorno_acao, calcular_volatilidade, calcular_beta, calcular_sharpe_ratio,
     calcular_max_drawdown, calcular_roi_fundo, calcular_volatilidade_cripto,
-    calcular_correlacao_ativos, calcular_alocacao_otima,
-    obter_lista_acoes_b3, buscar_dados_acao, calcular_metricas_acao, buscar_dados_mercado
+    calcular_correlacao_ativos,
+    buscar_dados_acao, calcular_metricas_acao, calcular_metricas_incrementais,
+    iniciar_busca_dados, obter_serie_precos
+)
+from risco import calcular_var_cvar, calcular_correlacao_movel
+from backtest import executar_backtest
+from simulador_financiamento import simular_cenarios_amortizacao
+from cet import calcular_cet_ofertas, COLUNAS_OFERTA
+from fatores import regredir_fatores
+from dataset import (
+    construir_dataset_tickers, selecionar_tickers, calcular_metricas_dataset, calcular_correlacao_dataset
+)
+from catalogo_b3 import buscar_ativos, nome_ativo, TIPOS_ATIVO
+from perfilamento import perfilamento_ativo, perfilar
+from opcoes import precificar_cadeia, calcular_volatilidade_implicita
+from metas import (
+    calcular_taxa_necessaria, calcular_tempo_necessario, calcular_aporte_necessario,
+    calcular_principal_maximo, calcular_taxa_maxima, calcular_prazo_minimo, gerar_tabela_acessibilidade,
+    SISTEMAS_META
+)
+from cenarios import (
+    avaliar_cenario, salvar_cenario, abrir_cenario, remover_cenario, listar_cenarios,
+    comparar_cenarios, reavaliar_cenarios, CAMPOS_TAXA, DONO_PADRAO, MULTIUSUARIO
 )
 
 # Configuração da página
@@ -132,16 +157,36 @@ with st.sidebar:
     
     opcao = st.selectbox(
         "Selecione a ferramenta:",
-        ["Juros Compostos", "Valor Presente Líquido (VPL)", "Taxa Interna de Retorno (TIR)", "Sistema de Amortização", "Análise de Investimentos"],
+        ["Juros Compostos", "Valor Presente Líquido (VPL)", "Taxa Interna de Retorno (TIR)", "Sistema de Amortização", "Análise de Investimentos", "Cenários Salvos"],
         format_func=lambda x: {
             "Juros Compostos": "📈 Juros Compostos",
             "Valor Presente Líquido (VPL)": "💼 VPL",
             "Taxa Interna de Retorno (TIR)": "🎯 TIR", 
             "Sistema de Amortização": "🏦 Amortização",
-            "Análise de Investimentos": "📊 Investimentos"
+            "Análise de Investimentos": "📊 Investimentos",
+            "Cenários Salvos": "💾 Cenários"
         }[x]
     )
 
+# Dono dos cenários: o usuário autenticado (st.login), o dono fixo da
+# instalação (CALCULADORA_CENARIOS_DONO) ou, só no modo multiusuário, a sessão
+def dono_cenarios():
+    if st.user.get('is_logged_in') and st.user.get('email'):
+        return st.user['email']
+    if not MULTIUSUARIO:
+        return DONO_PADRAO
+    if 'dono_cenarios' not in st.session_state:
+        st.session_state['dono_cenarios'] = uuid.uuid4().hex
+    return st.session_state['dono_cenarios']
+
+# Campo de nome e botão para salvar o cenário atual
+def salvar_cenario_interface(tipo, entradas, chave):
+    with st.expander("💾 Salvar cenário"):
+        nome = st.text_input("Nome do cenário", key=f"nome_cenario_{chave}")
+        if st.button("Salvar", key=f"salvar_cenario_{chave}"):
+            cenario = salvar_cenario(nome or tipo, tipo, entradas, dono=dono_cenarios())
+            st.success(f"Cenário salvo ({cenario['hash'][:10]})")
+
 # Função para juros compostos
 def juros_compostos():
     st.markdown("""
@@ -286,6 +331,37 @@ def juros_compostos():
         
         st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Cálculo inverso: a partir do montante desejado
+    st.markdown("### 🎯 Metas")
+    with st.expander("Quanto preciso para chegar ao meu objetivo?"):
+        col1, col2 = st.columns(2)
+        with col1:
+            montante_meta = st.number_input("Montante desejado (R$)", min_value=0.0, value=max(capital * 2, 1000.0), step=1000.0)
+            incognita = st.radio("Calcular:", ["Taxa necessária", "Prazo necessário", "Aporte mensal necessário"])
+        with col2:
+            aporte_meta = st.number_input("Aporte mensal (R$)", min_value=0.0, value=0.0, step=100.0,
+                                          disabled=incognita == "Aporte mensal necessário")
+        
+        if incognita == "Taxa necessária":
+            try:
+                taxa_meta = calcular_taxa_necessaria(capital, montante_meta, tempo, aporte_meta)
+            except ValueError as e:
+                st.warning(str(e))
+            else:
+                if np.isnan(taxa_meta):
+                    st.warning("Não há taxa que leve a esse montante no prazo informado.")
+                else:
+                    st.metric("Taxa necessária", f"{taxa_meta*100:.4f}% ao mês", f"{((1 + taxa_meta) ** 12 - 1)*100:.2f}% ao ano")
+        elif incognita == "Prazo necessário":
+            tempo_meta = calcular_tempo_necessario(capital, montante_meta, taxa, aporte_meta)
+            if np.isnan(tempo_meta):
+                st.warning("O montante desejado não é atingível com essa taxa e esses aportes.")
+            else:
+                st.metric("Prazo necessário", f"{int(np.ceil(tempo_meta))} meses", f"{tempo_meta/12:.1f} anos")
+        else:
+            aporte_necessario = calcular_aporte_necessario(montante_meta, taxa, tempo, capital)
+            st.metric("Aporte mensal necessário", f"R$ {aporte_necessario:,.2f}")
 
 # Função para VPL
 def valor_presente_liquido():
@@ -324,7 +400,8 @@ def valor_presente_liquido():
     
     # Cálculo do VPL
     try:
-        vpl = calcular_vpl(fluxos, taxa_desconto)
+        entradas_vpl = {'fluxos': fluxos, 'taxa': taxa_desconto}
+        vpl = avaliar_cenario('vpl', entradas_vpl, dono_cenarios())
         
         # Resultados
         st.markdown("### 📊 Resultados")
@@ -349,6 +426,8 @@ def valor_presente_liquido():
         })
         st.dataframe(df_fluxos, use_container_width=True)
         
+        salvar_cenario_interface('vpl', entradas_vpl, 'vpl')
+        
     except Exception as e:
         st.error(f"Erro no cálculo: {str(e)}")
 
@@ -430,14 +509,16 @@ def sistema_amortizacao():
     st.markdown("### 🎯 Sistema de Amortização")
     sistema = st.selectbox(
         "Escolha o sistema de amortização:",
-        ["SAC (Sistema de Amortização Constante)", "Price (Prestações Fixas)", "SAC Americano", "Comparação dos Sistemas"]
+        ["SAC (Sistema de Amortização Constante)", "Price (Prestações Fixas)", "SAC Americano", "Amortização Extraordinária", "Custo Efetivo Total (CET)", "Capacidade de Financiamento", "Comparação dos Sistemas"]
     )
     
     if sistema == "SAC (Sistema de Amortização Constante)":
         st.markdown("#### 📊 SAC - Sistema de Amortização Constante")
         st.markdown("**Características:** Prestações decrescentes, amortização constante")
         
-        df_sac = calcular_amortizacao_sac(valor_principal, taxa_mensal, num_parcelas)
+        entradas_amortizacao = {'valor_principal': valor_principal, 'taxa_mensal': taxa_mensal,
+                                 'num_parcelas': num_parcelas, 'sistema': 'SAC'}
+        df_sac = avaliar_cenario('amortizacao', entradas_amortizacao, dono_cenarios())
         
         # Métricas
         col1, col2, col3, col4 = st.columns(4)
@@ -465,12 +546,16 @@ def sistema_amortizacao():
         
         fig.update_layout(title="Evolução das Prestações - SAC", xaxis_title="Período", yaxis_title="Valor (R$)")
         st.plotly_chart(fig, use_container_width=True)
+        
+        salvar_cenario_interface('amortizacao', entradas_amortizacao, 'amortizacao_sac')
     
     elif sistema == "Price (Prestações Fixas)":
         st.markdown("#### 📊 Price - Prestações Fixas")
         st.markdown("**Características:** Prestações constantes, amortização crescente")
         
-        df_price = calcular_amortizacao_price(valor_principal, taxa_mensal, num_parcelas)
+        entradas_amortizacao = {'valor_principal': valor_principal, 'taxa_mensal': taxa_mensal,
+                                 'num_parcelas': num_parcelas, 'sistema': 'Price'}
+        df_price = avaliar_cenario('amortizacao', entradas_amortizacao, dono_cenarios())
         
         # Métricas
         col1, col2, col3, col4 = st.columns(4)
@@ -498,12 +583,16 @@ def sistema_amortizacao():
         
         fig.update_layout(title="Evolução das Prestações - Price", xaxis_title="Período", yaxis_title="Valor (R$)")
         st.plotly_chart(fig, use_container_width=True)
+        
+        salvar_cenario_interface('amortizacao', entradas_amortizacao, 'amortizacao_price')
     
     elif sistema == "SAC Americano":
         st.markdown("#### 📊 SAC Americano")
         st.markdown("**Características:** Juros pagos mensalmente, principal no final")
         
-        df_american = calcular_amortizacao_sac_american(valor_principal, taxa_mensal, num_parcelas)
+        entradas_amortizacao = {'valor_principal': valor_principal, 'taxa_mensal': taxa_mensal,
+                                 'num_parcelas': num_parcelas, 'sistema': 'SAC Americano'}
+        df_american = avaliar_cenario('amortizacao', entradas_amortizacao, dono_cenarios())
         
         # Métricas
         col1, col2, col3, col4 = st.columns(4)
@@ -531,6 +620,140 @@ def sistema_amortizacao():
         
         fig.update_layout(title="Evolução das Prestações - SAC Americano", xaxis_title="Período", yaxis_title="Valor (R$)")
         st.plotly_chart(fig, use_container_width=True)
+        
+        salvar_cenario_interface('amortizacao', entradas_amortizacao, 'amortizacao_american')
+    
+    elif sistema == "Amortização Extraordinária":
+        st.markdown("#### 📊 Amortização Extraordinária e Refinanciamento")
+        st.markdown("**Características:** Aportes extras reduzindo prazo ou prestação, nova taxa e correção monetária")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sistema_base = st.selectbox("Sistema do financiamento:", ["SAC", "Price"])
+            periodo_aporte = st.number_input("Aporte após a parcela nº", min_value=0, max_value=int(num_parcelas), value=min(12, int(num_parcelas)), step=1)
+            valor_aporte = st.number_input("Valor do Aporte (R$)", min_value=0.0, value=10000.0, step=1000.0)
+        with col2:
+            periodo_nova_taxa = st.number_input("Nova taxa a partir da parcela nº (0 = sem mudança)", min_value=0, max_value=int(num_parcelas), value=0, step=1)
+            nova_taxa_anual = st.number_input("Nova Taxa de Juros (% ao ano)", min_value=0.0, max_value=100.0, value=taxa_anual, step=0.1)
+        with col3:
+            correcao_mensal = st.number_input("Correção Monetária TR/IPCA (% ao mês)", min_value=0.0, max_value=5.0, value=0.0, step=0.01) / 100
+        
+        eventos_taxa = []
+        if periodo_nova_taxa > 0:
+            eventos_taxa = [{'periodo': periodo_nova_taxa - 1, 'taxa_mensal': nova_taxa_anual / 12 / 100}]
+        
+        cenarios = {
+            'Refinanciamento': eventos_taxa,
+            'Reduzir Prazo': eventos_taxa + [{'periodo': periodo_aporte, 'valor': valor_aporte, 'modo': 'prazo'}],
+            'Reduzir Prestação': eventos_taxa + [{'periodo': periodo_aporte, 'valor': valor_aporte, 'modo': 'prestacao'}]
+        }
+        tabelas, resumo = simular_cenarios_amortizacao(
+            valor_principal, taxa_mensal, num_parcelas, cenarios, sistema=sistema_base, indexador=correcao_mensal
+        )
+        
+        # Métricas
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Juros sem Aporte", f"R$ {resumo.loc[1, 'Total_Juros']:,.2f}")
+        with col2:
+            st.metric("Economia (Reduzir Prazo)", f"R$ {resumo.loc[1, 'Total_Juros'] - resumo.loc[2, 'Total_Juros']:,.2f}")
+        with col3:
+            st.metric("Economia (Reduzir Prestação)", f"R$ {resumo.loc[1, 'Total_Juros'] - resumo.loc[3, 'Total_Juros']:,.2f}")
+        with col4:
+            st.metric("Novo Prazo", f"{resumo.loc[2, 'Prazo_Final']} parcelas")
+        
+        # Tabela comparativa
+        st.markdown("### 📋 Comparação dos Cenários")
+        st.dataframe(resumo, use_container_width=True)
+        
+        # Gráfico
+        fig = go.Figure()
+        cores = {'Base': 'gray', 'Refinanciamento': 'blue', 'Reduzir Prazo': 'green', 'Reduzir Prestação': 'orange'}
+        for nome, tabela in tabelas.items():
+            fig.add_trace(go.Scatter(x=tabela['Periodo'], y=tabela['Saldo_Devedor'],
+                                    mode='lines', name=nome, line=dict(color=cores[nome])))
+        
+        fig.update_layout(title="Evolução do Saldo Devedor por Cenário", xaxis_title="Período", yaxis_title="Saldo Devedor (R$)")
+        st.plotly_chart(fig, use_container_width=True)
+        
+        cenario_tabela = st.selectbox("Ver tabela do cenário:", list(tabelas.keys()))
+        st.dataframe(tabelas[cenario_tabela], use_container_width=True)
+    
+    elif sistema == "Custo Efetivo Total (CET)":
+        st.markdown("#### 📊 Custo Efetivo Total (CET) - Comparação de Ofertas")
+        st.markdown("**Características:** Inclui IOF (diário + adicional), tarifas e seguro no custo do crédito")
+        
+        financiar_iof = st.checkbox("IOF financiado junto com o empréstimo", value=True)
+        
+        st.markdown("### 📝 Ofertas dos Bancos")
+        ofertas_padrao = pd.DataFrame({
+            'Banco': ['Banco A', 'Banco B', 'Banco C'],
+            'Valor': [valor_principal] * 3,
+            'Taxa_Mensal': [taxa_mensal, taxa_mensal * 0.95, taxa_mensal * 1.05],
+            'Parcelas': [int(num_parcelas)] * 3,
+            'Sistema': ['Price', 'SAC', 'Price'],
+            'Tarifas': [0.0, 1500.0, 500.0],
+            'Seguro_Mensal': [0.0, 25.0, 10.0]
+        }, columns=COLUNAS_OFERTA)
+        ofertas = st.data_editor(ofertas_padrao, num_rows="dynamic", use_container_width=True)
+        ofertas = ofertas.dropna(subset=['Valor', 'Taxa_Mensal', 'Parcelas'])
+        
+        if ofertas.empty:
+            st.info("Inclua ao menos uma oferta para calcular o CET.")
+        else:
+            ranking = calcular_cet_ofertas(ofertas, financiar_iof=financiar_iof)
+            melhor = ranking.iloc[0]
+            
+            # Métricas
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Melhor Oferta", f"{melhor['Banco']}")
+            with col2:
+                st.metric("CET Anual", f"{melhor['CET_Anual']*100:.2f}%")
+            with col3:
+                st.metric("IOF", f"R$ {melhor['IOF']:,.2f}")
+            with col4:
+                st.metric("Total Pago", f"R$ {melhor['Total_Pago']:,.2f}")
+            
+            # Tabela
+            st.markdown("### 📋 Ranking por CET")
+            st.dataframe(ranking, use_container_width=True)
+            
+            # Gráfico
+            fig = go.Figure()
+            fig.add_trace(go.Bar(x=ranking['Banco'], y=ranking['CET_Anual'] * 100, name='CET Anual', marker_color='purple'))
+            fig.add_trace(go.Bar(x=ranking['Banco'], y=((1 + ranking['Taxa_Mensal']) ** 12 - 1) * 100, name='Taxa Nominal Anual', marker_color='lightblue'))
+            fig.update_layout(title="CET x Taxa Nominal", xaxis_title="Oferta", yaxis_title="% ao ano", barmode='group')
+            st.plotly_chart(fig, use_container_width=True)
+    
+    elif sistema == "Capacidade de Financiamento":
+        st.markdown("#### 🎯 Capacidade de Financiamento")
+        st.markdown("**Quanto é possível financiar com uma prestação que cabe no orçamento**")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            prestacao_maxima = st.number_input("Prestação máxima (R$)", min_value=1.0, value=2000.0, step=100.0)
+        with col2:
+            sistema_capacidade = st.selectbox("Sistema:", SISTEMAS_META, index=1)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Valor Máximo Financiável",
+                      f"R$ {calcular_principal_maximo(prestacao_maxima, taxa_mensal, num_parcelas, sistema_capacidade):,.2f}")
+        with col2:
+            prazo_minimo = calcular_prazo_minimo(valor_principal, prestacao_maxima, taxa_mensal, sistema_capacidade)
+            st.metric("Prazo Mínimo", "—" if np.isnan(prazo_minimo) else f"{int(prazo_minimo)} parcelas")
+        with col3:
+            taxa_maxima = calcular_taxa_maxima(valor_principal, prestacao_maxima, num_parcelas, sistema_capacidade)
+            st.metric("Taxa Máxima Aceitável", "—" if np.isnan(taxa_maxima) else f"{taxa_maxima*100:.3f}% a.m.")
+        
+        # Tabela de valores financiáveis por taxa e prazo
+        st.markdown("### 📋 Valor Financiável por Taxa e Prazo")
+        taxas_tabela = taxa_mensal * np.array([0.75, 0.9, 1.0, 1.1, 1.25])
+        prazos_tabela = np.array([12, 24, 36, 48, 60, 120, 240, 360])
+        tabela = gerar_tabela_acessibilidade(prestacao_maxima, taxas_tabela, prazos_tabela, sistema_capacidade)
+        tabela.index = [f"{t*100:.3f}% a.m." for t in tabela.index]
+        st.dataframe(tabela.style.format("R$ {:,.2f}"), use_container_width=True)
     
     else:  # Comparação dos Sistemas
         st.markdown("#### 📊 Comparação dos Sistemas de Amortização")
@@ -581,7 +804,7 @@ def analise_investimentos():
     # Submenu para tipos de investimento
     tipo_investimento = st.sidebar.selectbox(
         "Tipo de Análise:",
-        ["Análise de Ações", "Fundos de Investimento", "Criptomoedas", "Correlação de Ativos"]
+        ["Análise de Ações", "Fundos de Investimento", "Criptomoedas", "Opções", "Correlação de Ativos"]
     )
     
     if tipo_investimento == "Análise de Ações":
@@ -596,16 +819,25 @@ def analise_investimentos():
         if modo_analise == "Dados Reais da B3":
             st.markdown("#### 🎯 Seleção da Ação")
             
-            # Lista de ações da B3
-            acoes_b3 = obter_lista_acoes_b3()
-            
             col1, col2 = st.columns(2)
             
             with col1:
+                # Busca no catálogo da B3 (ações, FIIs, BDRs e ETFs)
+                consulta = st.text_input("Buscar ativo (ticker ou nome):", value="")
+                tipo_ativo = st.selectbox("Tipo de ativo:", ["Todos"] + TIPOS_ATIVO)
+                opcoes = [
+                    f"{t}.SA" for t in buscar_ativos(consulta, limite=50, tipos=None if tipo_ativo == "Todos" else [tipo_ativo])
+                ]
+                if not opcoes:
+                    st.warning("Nenhum ativo encontrado para a busca")
+                    opcoes = ['PETR4.SA']
+                acoes_b3 = {t: nome_ativo(t) for t in opcoes}
+                
                 # Seleção da ação
                 acao_selecionada = st.selectbox(
                     "Escolha uma ação:",
-                    options=list(acoes_b3.keys()),
+                    options=opcoes,
+                    index=opcoes.index('PETR4.SA') if 'PETR4.SA' in opcoes else 0,
                     format_func=lambda x: f"{x} - {acoes_b3[x]}"
                 )
                 
@@ -625,130 +857,194 @@ def analise_investimentos():
                 
                 # Botão para buscar dados
                 if st.button("🔍 Buscar Dados da Ação"):
-                    with st.spinner("Buscando dados..."):
-                        # Buscar dados da ação
-                        dados_acao, erro_acao = buscar_dados_acao(acao_selecionada, periodo)
+                    # Ação e Ibovespa são buscados em paralelo
+                    futuro_acao, futuro_mercado = iniciar_busca_dados(acao_selecionada, periodo)
+                    
+                    with st.spinner("Buscando dados da ação..."):
+                        dados_acao, erro_acao = futuro_acao.result()
+                    
+                    if erro_acao:
+                        st.error(erro_acao)
+                    else:
+                        # Calcular métricas
+                        metricas = calcular_metricas_acao(dados_acao)
                         
-                        if erro_acao:
-                            st.error(erro_acao)
-                        else:
-                            # Buscar dados do mercado
-                            dados_mercado, erro_mercado = buscar_dados_mercado(periodo)
+                        if metricas:
+                            # Exibir resultados
+                            st.markdown("### 📊 Resultados da Análise")
+                            col1, col2, col3, col4 = st.columns(4)
+                            
+                            with col1:
+                                st.metric("Preço Atual", f"R$ {metricas['preco_atual']:.2f}")
+                            with col2:
+                                st.metric("Retorno do Período", f"{metricas['retorno_periodo']*100:.2f}%")
+                            with col3:
+                                st.metric("Volatilidade Anual", f"{metricas['volatilidade']*100:.2f}%")
+                            with col4:
+                                st.metric("Sharpe Ratio", f"{metricas['sharpe_ratio']:.3f}")
+                            
+                            # Métricas adicionais
+                            col1, col2, col3 = st.columns(3)
+                            with col1:
+                                st.metric("Retorno Médio Anual", f"{metricas['retorno_medio']*100:.2f}%")
+                            with col2:
+                                st.metric("Máximo Drawdown", f"{metricas['max_drawdown']*100:.2f}%")
+                            with col3:
+                                st.metric("Preço Inicial", f"R$ {metricas['preco_inicial']:.2f}")
+                            
+                            col1, col2, col3 = st.columns(3)
+                            with col1:
+                                st.metric("Calmar", f"{metricas['calmar']:.3f}")
+                            with col2:
+                                st.metric("Sortino", f"{metricas['sortino']:.3f}")
+                            with col3:
+                                st.metric("Ulcer Index", f"{metricas['ulcer']*100:.2f}%")
+                            
+                            # Interpretação
+                            st.markdown("### 📋 Interpretação")
+                            col1, col2 = st.columns(2)
+                            
+                            with col1:
+                                st.markdown("**Volatilidade:**")
+                                if metricas['volatilidade'] < 0.2:
+                                    st.success("Baixa volatilidade - Ação defensiva")
+                                elif metricas['volatilidade'] < 0.4:
+                                    st.info("Volatilidade moderada")
+                                else:
+                                    st.warning("Alta volatilidade - Ação agressiva")
+                            
+                            with col2:
+                                st.markdown("**Sharpe Ratio:**")
+                                if metricas['sharpe_ratio'] > 1:
+                                    st.success("Excelente retorno ajustado ao risco")
+                                elif metricas['sharpe_ratio'] > 0.5:
+                                    st.info("Bom retorno ajustado ao risco")
+                                else:
+                                    st.warning("Baixo retorno ajustado ao risco")
+                            
+                            # Dados do mercado (busca já iniciada em paralelo)
+                            with st.spinner("Buscando dados do mercado..."):
+                                dados_mercado, erro_mercado = futuro_mercado.result()
                             
                             if erro_mercado:
                                 st.warning(f"Aviso: {erro_mercado}")
                                 dados_mercado = None
                             
-                            # Calcular métricas
-                            metricas = calcular_metricas_acao(dados_acao)
-                            
-                            if metricas:
-                                # Exibir resultados
-                                st.markdown("### 📊 Resultados da Análise")
-                                col1, col2, col3, col4 = st.columns(4)
-                                
-                                with col1:
-                                    st.metric("Preço Atual", f"R$ {metricas['preco_atual']:.2f}")
-                                with col2:
-                                    st.metric("Retorno do Período", f"{metricas['retorno_periodo']*100:.2f}%")
-                                with col3:
-                                    st.metric("Volatilidade Anual", f"{metricas['volatilidade']*100:.2f}%")
-                                with col4:
-                                    st.metric("Sharpe Ratio", f"{metricas['sharpe_ratio']:.3f}")
+                            # Beta, alfa e R² contra o Ibovespa
+                            if dados_mercado is not None:
+                                regressao = regredir_fatores(
+                                    metricas['retornos'].rename(acao_selecionada),
+                                    obter_serie_precos(dados_mercado).pct_change().dropna().rename('Ibovespa')
+                                ).iloc[0]
                                 
-                                # Métricas adicionais
                                 col1, col2, col3 = st.columns(3)
                                 with col1:
-                                    st.metric("Retorno Médio Anual", f"{metricas['retorno_medio']*100:.2f}%")
+                                    st.metric("Beta (Ibovespa)", f"{regressao['Beta_Ibovespa']:.3f}")
                                 with col2:
-                                    st.metric("Máximo Drawdown", f"{metricas['max_drawdown']*100:.2f}%")
+                                    st.metric("Alfa Anual", f"{regressao['Alfa_Anual']*100:.2f}%")
                                 with col3:
-                                    st.metric("Preço Inicial", f"R$ {metricas['preco_inicial']:.2f}")
-                                
-                                # Interpretação
-                                st.markdown("### 📋 Interpretação")
-                                col1, col2 = st.columns(2)
-                                
-                                with col1:
-                                    st.markdown("**Volatilidade:**")
-                                    if metricas['volatilidade'] < 0.2:
-                                        st.success("Baixa volatilidade - Ação defensiva")
-                                    elif metricas['volatilidade'] < 0.4:
-                                        st.info("Volatilidade moderada")
-                                    else:
-                                        st.warning("Alta volatilidade - Ação agressiva")
-                                
-                                with col2:
-                                    st.markdown("**Sharpe Ratio:**")
-                                    if metricas['sharpe_ratio'] > 1:
-                                        st.success("Excelente retorno ajustado ao risco")
-                                    elif metricas['sharpe_ratio'] > 0.5:
-                                        st.info("Bom retorno ajustado ao risco")
-                                    else:
-                                        st.warning("Baixo retorno ajustado ao risco")
-                                
-                                # Gráfico de preços
-                                st.markdown("### 📈 Evolução dos Preços")
-                                fig = go.Figure()
+                                    st.metric("R²", f"{regressao['R2']:.3f}")
+                            
+                            # Gráfico de preços
+                            st.markdown("### 📈 Evolução dos Preços")
+                            fig = go.Figure()
+                            fig.add_trace(go.Scatter(
+                                x=dados_acao.index, 
+                                y=dados_acao['Close'], 
+                                mode='lines', 
+                                name=acoes_b3[acao_selecionada],
+                                line=dict(color='blue')
+                            ))
+                            
+                            if 'Retorno_Total' in dados_acao:
                                 fig.add_trace(go.Scatter(
                                     x=dados_acao.index, 
-                                    y=dados_acao['Close'], 
+                                    y=dados_acao['Retorno_Total'], 
                                     mode='lines', 
-                                    name=acoes_b3[acao_selecionada],
-                                    line=dict(color='blue')
+                                    name='Retorno total (proventos reinvestidos)',
+                                    line=dict(color='green')
                                 ))
-                                
-                                if dados_mercado is not None:
-                                    # Normalizar dados do mercado para comparação
-                                    mercado_normalizado = dados_mercado['Close'] / dados_mercado['Close'].iloc[0] * dados_acao['Close'].iloc[0]
-                                    fig.add_trace(go.Scatter(
-                                        x=dados_mercado.index, 
-                                        y=mercado_normalizado, 
-                                        mode='lines', 
-                                        name='Bovespa (normalizado)',
-                                        line=dict(color='red', dash='dash')
-                                    ))
-                                
-                                fig.update_layout(
-                                    title=f"Evolução dos Preços - {acoes_b3[acao_selecionada]}",
-                                    xaxis_title="Data",
-                                    yaxis_title="Preço (R$)"
-                                )
-                                st.plotly_chart(fig, use_container_width=True)
-                                
-                                # Gráfico de retornos
-                                st.markdown("### 📊 Distribuição dos Retornos")
-                                fig_retornos = go.Figure()
-                                fig_retornos.add_trace(go.Histogram(
-                                    x=metricas['retornos']*100,
-                                    nbinsx=30,
-                                    name='Retornos Diários',
-                                    marker_color='lightblue'
+                            
+                            if dados_mercado is not None:
+                                # Normalizar dados do mercado para comparação
+                                mercado_normalizado = dados_mercado['Close'] / dados_mercado['Close'].iloc[0] * dados_acao['Close'].iloc[0]
+                                fig.add_trace(go.Scatter(
+                                    x=dados_mercado.index, 
+                                    y=mercado_normalizado, 
+                                    mode='lines', 
+                                    name='Bovespa (normalizado)',
+                                    line=dict(color='red', dash='dash')
                                 ))
-                                fig_retornos.update_layout(
-                                    title="Distribuição dos Retornos Diários",
-                                    xaxis_title="Retorno (%)",
-                                    yaxis_title="Frequência"
+                            
+                            fig.update_layout(
+                                title=f"Evolução dos Preços - {acoes_b3[acao_selecionada]}",
+                                xaxis_title="Data",
+                                yaxis_title="Preço (R$)"
+                            )
+                            st.plotly_chart(fig, use_container_width=True)
+                            
+                            # Gráfico underwater e episódios de drawdown
+                            st.markdown("### 🌊 Drawdowns")
+                            fig_submerso = go.Figure()
+                            fig_submerso.add_trace(go.Scatter(
+                                x=metricas['submerso'].index,
+                                y=metricas['submerso']*100,
+                                mode='lines',
+                                fill='tozeroy',
+                                name='Queda desde o pico',
+                                line=dict(color='firebrick')
+                            ))
+                            fig_submerso.update_layout(
+                                title="Gráfico Underwater (queda em relação ao pico anterior)",
+                                xaxis_title="Data",
+                                yaxis_title="Drawdown (%)"
+                            )
+                            st.plotly_chart(fig_submerso, use_container_width=True)
+                            
+                            episodios = metricas['drawdowns'].sort_values('Profundidade').head(10)
+                            if not episodios.empty:
+                                st.markdown("**Maiores episódios de drawdown** (durações em pregões)")
+                                st.dataframe(
+                                    episodios.assign(Profundidade=episodios['Profundidade']*100)
+                                    .rename(columns={'Profundidade': 'Profundidade (%)'})
+                                    .round(2),
+                                    use_container_width=True
                                 )
-                                st.plotly_chart(fig_retornos, use_container_width=True)
-                                
-                                # Tabela de dados
-                                st.markdown("### 📋 Resumo dos Dados")
-                                resumo = pd.DataFrame({
-                                    'Métrica': ['Preço Atual', 'Preço Inicial', 'Retorno do Período', 'Volatilidade Anual', 'Retorno Médio Anual', 'Máximo Drawdown', 'Sharpe Ratio'],
-                                    'Valor': [
-                                        f"R$ {metricas['preco_atual']:.2f}",
-                                        f"R$ {metricas['preco_inicial']:.2f}",
-                                        f"{metricas['retorno_periodo']*100:.2f}%",
-                                        f"{metricas['volatilidade']*100:.2f}%",
-                                        f"{metricas['retorno_medio']*100:.2f}%",
-                                        f"{metricas['max_drawdown']*100:.2f}%",
-                                        f"{metricas['sharpe_ratio']:.3f}"
-                                    ]
-                                })
-                                st.dataframe(resumo, use_container_width=True)
-                            else:
-                                st.error("Erro ao calcular métricas da ação")
+                            
+                            # Gráfico de retornos
+                            st.markdown("### 📊 Distribuição dos Retornos")
+                            fig_retornos = go.Figure()
+                            fig_retornos.add_trace(go.Histogram(
+                                x=metricas['retornos']*100,
+                                nbinsx=30,
+                                name='Retornos Diários',
+                                marker_color='lightblue'
+                            ))
+                            fig_retornos.update_layout(
+                                title="Distribuição dos Retornos Diários",
+                                xaxis_title="Retorno (%)",
+                                yaxis_title="Frequência"
+                            )
+                            st.plotly_chart(fig_retornos, use_container_width=True)
+                            
+                            # Tabela de dados
+                            st.markdown("### 📋 Resumo dos Dados")
+                            resumo = pd.DataFrame({
+                                'Métrica': ['Preço Atual', 'Preço Inicial', 'Retorno do Período', 'Retorno Anualizado (DU/252)', 'Volatilidade Anual', 'Retorno Médio Anual', 'Máximo Drawdown', 'Sharpe Ratio'],
+                                'Valor': [
+                                    f"R$ {metricas['preco_atual']:.2f}",
+                                    f"R$ {metricas['preco_inicial']:.2f}",
+                                    f"{metricas['retorno_periodo']*100:.2f}%",
+                                    f"{metricas['retorno_anualizado']*100:.2f}%",
+                                    f"{metricas['volatilidade']*100:.2f}%",
+                                    f"{metricas['retorno_medio']*100:.2f}%",
+                                    f"{metricas['max_drawdown']*100:.2f}%",
+                                    f"{metricas['sharpe_ratio']:.3f}"
+                                ]
+                            })
+                            st.dataframe(resumo, use_container_width=True)
+                        else:
+                            st.error("Erro ao calcular métricas da ação")
         
         else:  # Dados Simulados
             st.markdown("### 📊 Análise de Ações (Dados Simulados)")
@@ -778,9 +1074,9 @@ def analise_investimentos():
                 
                 # Calcular métricas
                 retorno_total = calcular_retorno_acao(preco_inicial, preco_final, dividendos)
-                volatilidade = calcular_volatilidade(retornos_acao_array)
+                volatilidade = calcular_volatilidade(retornos_acao_array, periodos_por_ano=12)
                 beta = calcular_beta(retornos_acao_array, retornos_mercado_array)
-                sharpe = calcular_sharpe_ratio(retornos_acao_array, taxa_livre_risco)
+                sharpe = calcular_sharpe_ratio(retornos_acao_array, taxa_livre_risco, periodos_por_ano=12)
                 
                 # Resultados
                 st.markdown("### 📊 Resultados da Análise")
@@ -789,7 +1085,7 @@ def analise_investimentos():
                 with col1:
                     st.metric("Retorno Total", f"{retorno_total*100:.2f}%")
                 with col2:
-                    st.metric("Volatilidade", f"{volatilidade*100:.2f}%")
+                    st.metric("Volatilidade Anualizada", f"{volatilidade*100:.2f}%")
                 with col3:
                     st.metric("Beta", f"{beta:.3f}")
                 with col4:
@@ -959,6 +1255,67 @@ def analise_investimentos():
                 else:
                     st.info("Manter posição")
             
+            # Valor em risco diário por método
+            st.markdown("### 📉 Valor em Risco (VaR / CVaR)")
+            retornos_cripto = np.diff(np.log(precos_array))
+            metodos_var = {
+                'historico': 'Histórico',
+                'parametrico': 'Paramétrico (Normal)',
+                'cornish_fisher': 'Cornish-Fisher',
+                'ewma': 'EWMA'
+            }
+            linhas_var = []
+            for metodo, nome_metodo in metodos_var.items():
+                risco_cripto = calcular_var_cvar(retornos_cripto, niveis=(0.95, 0.99), metodo=metodo)
+                linhas_var.append({
+                    'Método': nome_metodo,
+                    'VaR 95% (%)': risco_cripto['var'][0, 0] * 100,
+                    'CVaR 95% (%)': risco_cripto['cvar'][0, 0] * 100,
+                    'VaR 99% (%)': risco_cripto['var'][1, 0] * 100,
+                    'CVaR 99% (%)': risco_cripto['cvar'][1, 0] * 100
+                })
+            df_var = pd.DataFrame(linhas_var)
+            st.dataframe(df_var, use_container_width=True)
+            
+            var_95 = df_var.loc[0, 'VaR 95% (%)'] / 100
+            st.markdown(f"Com 95% de confiança, a perda em um dia não deve passar de **US$ {preco_atual * var_95:,.0f}** por unidade (método histórico).")
+            if stop_loss < var_95:
+                st.warning("O Stop Loss está abaixo do VaR diário de 95%: oscilações normais podem acioná-lo com frequência.")
+            
+            # Backtest das regras de stop loss / take profit sobre o histórico
+            st.markdown("### 🔁 Backtest de Stop Loss / Take Profit")
+            st.markdown("Compra quando o preço supera o de *lookback* dias atrás e vende ao atingir o stop ou o take.")
+            stops_grade = np.append(np.arange(0.05, 0.31, 0.05), stop_loss)
+            takes_grade = np.append(np.arange(0.05, 0.51, 0.05), take_profit)
+            lookbacks_grade = [3, 5, 10]
+            backtest = executar_backtest(precos_array, stops_grade, takes_grade, lookbacks_grade, periodos_por_ano=365)
+            resultados_bt = backtest['resultados']
+            
+            # Combinação escolhida pelo usuário (último stop, último take, lookback de 5 dias)
+            indice_usuario = ((len(stops_grade) - 1) * len(takes_grade) + len(takes_grade) - 1) * len(lookbacks_grade) + 1
+            usuario = resultados_bt.iloc[indice_usuario]
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Retorno da Estratégia", f"{usuario['Retorno_Total']*100:.2f}%")
+            with col2:
+                st.metric("Operações", f"{int(usuario['Operacoes'])}")
+            with col3:
+                st.metric("Taxa de Acerto", f"{usuario['Taxa_Acerto']*100:.1f}%")
+            with col4:
+                st.metric("Máximo Drawdown", f"{usuario['Max_Drawdown']*100:.2f}%")
+            
+            st.markdown("**Melhores combinações da grade:**")
+            st.dataframe(resultados_bt.sort_values('Sharpe', ascending=False).head(10), use_container_width=True)
+            
+            fig_bt = go.Figure()
+            fig_bt.add_trace(go.Scatter(x=list(range(1, len(precos_array) + 1)), y=backtest['curvas'][:, indice_usuario],
+                                        mode='lines', name='Estratégia', line=dict(color='purple')))
+            fig_bt.add_trace(go.Scatter(x=list(range(1, len(precos_array) + 1)), y=precos_array / precos_array[0],
+                                        mode='lines', name='Comprar e manter', line=dict(color='orange', dash='dash')))
+            fig_bt.update_layout(title="Curva de Patrimônio (base 1)", xaxis_title="Dia", yaxis_title="Patrimônio")
+            st.plotly_chart(fig_bt, use_container_width=True)
+            
             # Gráfico de preços
             st.markdown("### 📈 Evolução dos Preços")
             dias = list(range(1, len(precos_array) + 1))
@@ -973,40 +1330,178 @@ def analise_investimentos():
         except Exception as e:
             st.error(f"Erro nos cálculos: {str(e)}")
     
+    elif tipo_investimento == "Opções":
+        st.markdown("### 🎲 Opções sobre Ações da B3")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("#### 📝 Ativo-Objeto")
+            ativo_objeto = st.selectbox(
+                "Ativo-objeto:",
+                ['PETR4.SA', 'VALE3.SA', 'ITUB4.SA', 'BBDC4.SA', 'BBAS3.SA', 'B3SA3.SA', 'ABEV3.SA', 'BOVA11.SA'],
+                format_func=lambda x: f"{x} - {nome_ativo(x)}"
+            )
+            fonte_volatilidade = st.radio("Preço e volatilidade:", ["Histórico de 1 ano", "Informados"], horizontal=True)
+            
+            if fonte_volatilidade == "Histórico de 1 ano":
+                with st.spinner("Buscando dados do ativo-objeto..."):
+                    dados_objeto, erro_objeto = buscar_dados_acao(ativo_objeto, '1y')
+                if erro_objeto:
+                    st.error(erro_objeto)
+                    return
+                # Só preço e volatilidade: o estado incremental em cache evita refazer a série a cada rerun
+                metricas_objeto = calcular_metricas_incrementais(ativo_objeto, dados_objeto, '1y')
+                preco_objeto = float(metricas_objeto['preco_atual'])
+                volatilidade = float(metricas_objeto['volatilidade'])
+                st.metric("Preço à Vista", f"R$ {preco_objeto:.2f}")
+                st.metric("Volatilidade Histórica", f"{volatilidade*100:.2f}%")
+            else:
+                preco_objeto = st.number_input("Preço à Vista (R$)", min_value=0.01, value=30.0, step=0.5)
+                volatilidade = st.number_input("Volatilidade (% ao ano)", min_value=1.0, max_value=300.0, value=35.0, step=1.0) / 100
+        
+        with col2:
+            st.markdown("#### ⚙️ Parâmetros da Cadeia")
+            taxa_juros = st.number_input("Taxa de Juros (% ao ano, DU/252)", min_value=0.0, max_value=50.0, value=10.75, step=0.25) / 100
+            dividend_yield = st.number_input("Dividend Yield (% ao ano)", min_value=0.0, max_value=30.0, value=0.0, step=0.5) / 100
+            faixa_strikes = st.slider("Strikes (% do preço à vista)", min_value=50, max_value=150, value=(80, 120))
+            numero_strikes = st.number_input("Número de Strikes", min_value=3, max_value=2000, value=21, step=1)
+            vencimentos_texto = st.text_input("Vencimentos (dias úteis, separados por vírgula)", value="21, 42, 63, 126, 252")
+            estilo = st.radio("Estilo de exercício:", ["Americana (binomial)", "Europeia (Black-Scholes)"])
+        
+        try:
+            vencimentos = sorted({int(x.strip()) for x in vencimentos_texto.split(',') if x.strip()})
+            strikes = np.round(np.linspace(faixa_strikes[0], faixa_strikes[1], int(numero_strikes)) / 100 * preco_objeto, 2)
+            cadeia = precificar_cadeia(
+                preco_objeto, strikes, vencimentos, taxa_juros, volatilidade, dividendos=dividend_yield,
+                americana=estilo.startswith("Americana")
+            )
+            
+            st.markdown("### 📊 Cadeia de Opções")
+            tipo_exibido = st.radio("Tipo:", ["call", "put"], horizontal=True, format_func=lambda x: x.capitalize())
+            cadeia_tipo = cadeia[cadeia['Tipo'] == tipo_exibido]
+            st.dataframe(
+                cadeia_tipo.pivot(index='Strike', columns='Dias_Uteis', values='Premio')
+                .rename(columns=lambda du: f"{du} DU").round(4),
+                use_container_width=True
+            )
+            
+            fig = go.Figure()
+            for du in vencimentos:
+                trecho = cadeia_tipo[cadeia_tipo['Dias_Uteis'] == du]
+                fig.add_trace(go.Scatter(x=trecho['Strike'], y=trecho['Premio'], mode='lines', name=f"{du} DU"))
+            fig.add_vline(x=preco_objeto, line_dash='dash', line_color='gray')
+            fig.update_layout(title=f"Prêmio por Strike ({tipo_exibido.capitalize()})", xaxis_title="Strike (R$)", yaxis_title="Prêmio (R$)")
+            st.plotly_chart(fig, use_container_width=True)
+            
+            # Gregas (Black-Scholes)
+            st.markdown("### 📐 Gregas")
+            grega = st.selectbox("Grega:", ['Delta', 'Gama', 'Vega', 'Theta', 'Rho'])
+            fig_grega = go.Figure()
+            for du in vencimentos:
+                trecho = cadeia_tipo[cadeia_tipo['Dias_Uteis'] == du]
+                fig_grega.add_trace(go.Scatter(x=trecho['Strike'], y=trecho[grega], mode='lines', name=f"{du} DU"))
+            fig_grega.update_layout(title=f"{grega} por Strike", xaxis_title="Strike (R$)", yaxis_title=grega)
+            st.plotly_chart(fig_grega, use_container_width=True)
+            st.caption("Vega e Rho por 1 ponto percentual; Theta por dia útil")
+            
+            # Volatilidade implícita
+            with st.expander("🔎 Volatilidade Implícita"):
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    strike_iv = st.number_input("Strike (R$)", min_value=0.01, value=float(round(preco_objeto, 2)), step=0.5)
+                with col2:
+                    dias_iv = st.number_input("Dias Úteis até o Vencimento", min_value=1, value=21, step=1)
+                with col3:
+                    tipo_iv = st.selectbox("Tipo da Opção", ["call", "put"], format_func=lambda x: x.capitalize())
+                with col4:
+                    premio_iv = st.number_input("Prêmio de Mercado (R$)", min_value=0.0, value=1.0, step=0.05)
+                
+                volatilidade_implicita = float(calcular_volatilidade_implicita(
+                    premio_iv, preco_objeto, strike_iv, dias_iv / 252, taxa_juros, tipo_iv, dividend_yield
+                ))
+                if np.isnan(volatilidade_implicita):
+                    st.warning("Prêmio fora dos limites de não arbitragem para esta opção")
+                else:
+                    st.metric(
+                        "Volatilidade Implícita", f"{volatilidade_implicita*100:.2f}%",
+                        delta=f"{(volatilidade_implicita - volatilidade)*100:+.2f} p.p. vs. volatilidade usada"
+                    )
+        
+        except Exception as e:
+            st.error(f"Erro nos cálculos: {str(e)}")
+    
     else:  # Correlação de Ativos
         st.markdown("### 🔗 Análise de Correlação entre Ativos")
         
         st.markdown("#### 📝 Dados dos Ativos")
-        st.markdown("Insira os preços históricos dos ativos (últimos 30 dias):")
+        fonte_precos = st.radio("Fonte dos preços:", ["Preços Informados", "Dados Reais da B3"], horizontal=True)
         
         col1, col2 = st.columns(2)
         
-        with col1:
-            ativo1_nome = st.text_input("Nome do Ativo 1", value="Ação A")
-            precos_ativo1 = st.text_input("Preços Ativo 1 (separados por vírgula)", 
-                                         value="100, 102, 101, 103, 105, 104, 106, 108, 107, 109, 110, 112, 111, 113, 115, 114, 116, 118, 117, 119, 120, 122, 121, 123, 125, 124, 126, 128, 127, 129, 130")
+        if fonte_precos == "Preços Informados":
+            st.markdown("Insira os preços históricos dos ativos (últimos 30 dias):")
+            
+            with col1:
+                ativo1_nome = st.text_input("Nome do Ativo 1", value="Ação A")
+                precos_ativo1 = st.text_input("Preços Ativo 1 (separados por vírgula)", 
+                                             value="100, 102, 101, 103, 105, 104, 106, 108, 107, 109, 110, 112, 111, 113, 115, 114, 116, 118, 117, 119, 120, 122, 121, 123, 125, 124, 126, 128, 127, 129, 130")
+                
+                ativo2_nome = st.text_input("Nome do Ativo 2", value="Ação B")
+                precos_ativo2 = st.text_input("Preços Ativo 2 (separados por vírgula)", 
+                                             value="50, 51, 50.5, 51.5, 52.5, 52, 53, 54, 53.5, 54.5, 55, 56, 55.5, 56.5, 57.5, 57, 58, 59, 58.5, 59.5, 60, 61, 60.5, 61.5, 62.5, 62, 63, 64, 63.5, 64.5, 65")
             
-            ativo2_nome = st.text_input("Nome do Ativo 2", value="Ação B")
-            precos_ativo2 = st.text_input("Preços Ativo 2 (separados por vírgula)", 
-                                         value="50, 51, 50.5, 51.5, 52.5, 52, 53, 54, 53.5, 54.5, 55, 56, 55.5, 56.5, 57.5, 57, 58, 59, 58.5, 59.5, 60, 61, 60.5, 61.5, 62.5, 62, 63, 64, 63.5, 64.5, 65")
+            with col2:
+                ativo3_nome = st.text_input("Nome do Ativo 3", value="Cripto C")
+                precos_ativo3 = st.text_input("Preços Ativo 3 (separados por vírgula)", 
+                                             value="1000, 1100, 1050, 1150, 1200, 1180, 1250, 1300, 1280, 1350, 1400, 1450, 1420, 1480, 1500, 1470, 1520, 1550, 1530, 1580, 1600, 1650, 1620, 1680, 1700, 1670, 1720, 1750, 1730, 1780, 1800")
+        else:
+            with col1:
+                ativo1_nome = st.text_input("Ticker do Ativo 1", value="PETR4.SA")
+                ativo2_nome = st.text_input("Ticker do Ativo 2", value="VALE3.SA")
+            
+            with col2:
+                ativo3_nome = st.text_input("Ticker do Ativo 3", value="ITUB4.SA")
+                periodo_correlacao = st.selectbox("Período:", ["3mo", "6mo", "1y", "2y"], index=2)
         
         with col2:
-            ativo3_nome = st.text_input("Nome do Ativo 3", value="Cripto C")
-            precos_ativo3 = st.text_input("Preços Ativo 3 (separados por vírgula)", 
-                                         value="1000, 1100, 1050, 1150, 1200, 1180, 1250, 1300, 1280, 1350, 1400, 1450, 1420, 1480, 1500, 1470, 1520, 1550, 1530, 1580, 1600, 1650, 1620, 1680, 1700, 1670, 1720, 1750, 1730, 1780, 1800")
-            
             st.markdown("#### 📊 Análise de Diversificação")
             st.markdown("**Objetivo:** Identificar ativos com baixa correlação para diversificação")
         
         # Cálculos
         try:
-            precos1 = np.array([float(x.strip()) for x in precos_ativo1.split(',')])
-            precos2 = np.array([float(x.strip()) for x in precos_ativo2.split(',')])
-            precos3 = np.array([float(x.strip()) for x in precos_ativo3.split(',')])
-            
-            # Matriz de correlação
-            precos_ativos = np.column_stack((precos1, precos2, precos3))
-            correlacao = calcular_correlacao_ativos(precos_ativos)
+            if fonte_precos == "Preços Informados":
+                precos1 = np.array([float(x.strip()) for x in precos_ativo1.split(',')])
+                precos2 = np.array([float(x.strip()) for x in precos_ativo2.split(',')])
+                precos3 = np.array([float(x.strip()) for x in precos_ativo3.split(',')])
+                
+                # Matriz de correlação
+                precos_ativos = np.column_stack((precos1, precos2, precos3))
+                correlacao = calcular_correlacao_ativos(precos_ativos)
+            else:
+                tickers_correlacao = [ativo1_nome, ativo2_nome, ativo3_nome]
+                if len(set(tickers_correlacao)) < 3:
+                    st.warning("Informe três tickers diferentes")
+                    return
+                
+                # Dataset alinhado no calendário da B3, com retornos e log-retornos já calculados
+                with st.spinner("Buscando dados dos ativos..."):
+                    dataset_correlacao, erros_dataset = construir_dataset_tickers(tickers_correlacao, periodo_correlacao)
+                for ticker, erro in erros_dataset.items():
+                    st.error(f"{ticker}: {erro}")
+                if erros_dataset:
+                    return
+                
+                dataset_correlacao = selecionar_tickers(dataset_correlacao, tickers_correlacao)
+                correlacao = calcular_correlacao_dataset(dataset_correlacao)
+                
+                st.markdown("### 📊 Métricas dos Ativos")
+                st.dataframe(calcular_metricas_dataset(dataset_correlacao).round(4), use_container_width=True)
+                
+                # Datas em que todos os ativos já têm preço
+                precos_ativos = dataset_correlacao['precos']
+                precos_ativos = precos_ativos[np.isfinite(precos_ativos).all(axis=1)]
+                precos1, precos2, precos3 = precos_ativos.T
             
             # Resultados
             st.markdown("### 📊 Matriz de Correlação")
@@ -1028,6 +1523,66 @@ def analise_investimentos():
             fig.update_layout(title="Mapa de Correlação entre Ativos")
             st.plotly_chart(fig, use_container_width=True)
             
+            # Correlação ao longo do tempo (a matriz estática esconde mudanças de regime)
+            st.markdown("### 📈 Correlação ao Longo do Tempo")
+            nomes = [ativo1_nome, ativo2_nome, ativo3_nome]
+            # Pelo menos duas datas para o controle deslizante (janela mínima de 3 retornos)
+            n_retornos = len(precos_ativos) - 1
+            if n_retornos < 5:
+                st.info("Informe pelo menos 6 preços para ver a correlação ao longo do tempo")
+            else:
+                col1, col2 = st.columns(2)
+                with col1:
+                    metodo_correlacao = st.radio("Método:", ["Janela Móvel", "EWMA"], horizontal=True)
+                with col2:
+                    if metodo_correlacao == "Janela Móvel":
+                        janela = st.slider("Janela (retornos)", min_value=3, max_value=n_retornos - 1,
+                                           value=min(10, n_retornos - 1))
+                        decaimento = 0.94
+                    else:
+                        decaimento = st.slider("Fator de Decaimento (λ)", min_value=0.80, max_value=0.99, value=0.94, step=0.01)
+                        janela = min(5, n_retornos - 1)
+                
+                correlacoes = calcular_correlacao_movel(
+                    precos_ativos, janela, 'movel' if metodo_correlacao == "Janela Móvel" else 'ewma', decaimento
+                )
+                primeira = janela - 1
+                data = st.slider("Data (retorno nº)", min_value=primeira + 1, max_value=len(correlacoes),
+                                 value=len(correlacoes))
+                
+                fig_movel = go.Figure(data=go.Heatmap(
+                    z=correlacoes[data - 1],
+                    x=nomes,
+                    y=nomes,
+                    colorscale='RdBu',
+                    zmid=0,
+                    zmin=-1,
+                    zmax=1
+                ))
+                fig_movel.update_layout(title=f"Correlação na data {data}")
+                st.plotly_chart(fig_movel, use_container_width=True)
+                
+                linhas, colunas = np.triu_indices(len(nomes), 1)
+                fig_pares = go.Figure()
+                for i, j in zip(linhas, colunas):
+                    fig_pares.add_trace(go.Scatter(
+                        x=np.arange(primeira + 1, len(correlacoes) + 1),
+                        y=correlacoes[primeira:, i, j],
+                        mode='lines',
+                        name=f"{nomes[i]} × {nomes[j]}"
+                    ))
+                fig_pares.add_hline(y=0.5, line_dash='dash', line_color='gray')
+                fig_pares.update_layout(title="Correlação de Cada Par", xaxis_title="Retorno nº", yaxis_title="Correlação")
+                st.plotly_chart(fig_pares, use_container_width=True)
+                
+                acima = (np.abs(correlacoes[primeira:, linhas, colunas]) >= 0.5).any(axis=1).mean()
+                if acima > 0:
+                    st.info(f"Em {acima*100:.0f}% das datas algum par teve correlação de 0,5 ou mais")
+            
+            salvar_cenario_interface('correlacao', {'ativos': {
+                ativo1_nome: precos1, ativo2_nome: precos2, ativo3_nome: precos3
+            }}, 'correlacao')
+            
             # Recomendações
             st.markdown("### 💡 Recomendações de Diversificação")
             
@@ -1064,17 +1619,106 @@ def analise_investimentos():
         except Exception as e:
             st.error(f"Erro nos cálculos: {str(e)}")
 
-# Navegação principal
-if opcao == "Juros Compostos":
-    juros_compostos()
-elif opcao == "Valor Presente Líquido (VPL)":
-    valor_presente_liquido()
-elif opcao == "Taxa Interna de Retorno (TIR)":
-    taxa_interna_retorno()
-elif opcao == "Sistema de Amortização":
-    sistema_amortizacao()
-elif opcao == "Análise de Investimentos":
-    analise_investimentos()
+# Função para cenários salvos
+def cenarios_salvos():
+    st.header("💾 Cenários Salvos")
+    st.markdown("Reabra análises salvas sem recalcular, compare cenários e reavalie todos após mudanças de juros")
+    
+    dono = dono_cenarios()
+    if MULTIUSUARIO and not st.user.get('is_logged_in'):
+        st.caption("Sem login, os cenários ficam disponíveis apenas nesta sessão.")
+    lista = listar_cenarios(dono=dono)
+    if lista.empty:
+        st.info("Nenhum cenário salvo. Use \"💾 Salvar cenário\" nas telas de VPL, amortização ou correlação.")
+        return
+    
+    rotulos = {h: f"{n} ({t}, {h[:8]})" for h, n, t in zip(lista['Hash'], lista['Nome'], lista['Tipo'])}
+    st.dataframe(lista.assign(Hash=lista['Hash'].str[:10], Origem=lista['Origem'].str[:10]), use_container_width=True)
+    
+    # Abrir um cenário
+    st.markdown("### 📂 Abrir Cenário")
+    escolhido = st.selectbox("Cenário:", list(rotulos), format_func=rotulos.get)
+    cenario = abrir_cenario(escolhido, dono)
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.markdown("**Entradas:**")
+        st.json(cenario['entradas'])
+        if st.button("🗑️ Remover cenário"):
+            remover_cenario(escolhido, dono)
+            st.rerun()
+    with col2:
+        st.markdown("**Resultado:**")
+        if isinstance(cenario['resultado'], pd.DataFrame):
+            st.dataframe(cenario['resultado'], use_container_width=True)
+        else:
+            st.metric(cenario['tipo'].upper(), f"{cenario['resultado']:,.4f}")
+    
+    # Comparar dois cenários
+    if len(rotulos) > 1:
+        st.markdown("### 🔍 Comparar Cenários")
+        col1, col2 = st.columns(2)
+        with col1:
+            cenario_a = st.selectbox("Cenário A:", list(rotulos), format_func=rotulos.get, key="cenario_a")
+        with col2:
+            cenario_b = st.selectbox("Cenário B:", list(rotulos), index=1, format_func=rotulos.get, key="cenario_b")
+        st.dataframe(comparar_cenarios(cenario_a, cenario_b, dono).astype(str), use_container_width=True)
+    
+    # Reavaliação em lote após mudança de juros
+    st.markdown("### 🔄 Reavaliar com Nova Taxa")
+    col1, col2 = st.columns(2)
+    with col1:
+        tipo_reavaliacao = st.selectbox("Tipo de cenário:", list(CAMPOS_TAXA))
+    with col2:
+        nova_taxa = st.number_input("Nova taxa (%)", min_value=0.0, value=10.0, step=0.25,
+                                    help="Mesma unidade da taxa salva no cenário") / 100
+    if st.button("Reavaliar todos"):
+        with st.spinner("Reavaliando cenários..."):
+            reavaliados = reavaliar_cenarios({CAMPOS_TAXA[tipo_reavaliacao]: nova_taxa}, tipos=[tipo_reavaliacao], dono=dono)
+        if reavaliados.empty:
+            st.info("Nenhum cenário a reavaliar.")
+        else:
+            st.success(f"{len(reavaliados)} cenário(s) reavaliado(s) e salvo(s)")
+            st.dataframe(reavaliados, use_container_width=True)
+
+# Navegação principal (perfilada com CALCULADORA_PERFILAMENTO=1 ou ?perfil=<CALCULADORA_PERFILAMENTO_TOKEN>)
+perfilando = perfilamento_ativo(st.query_params.to_dict())
+entradas_pagina = {'estado': st.session_state.to_dict(), 'parametros': st.query_params.to_dict()}
+with perfilar(opcao, entradas_pagina) if perfilando else nullcontext() as perfil:
+    if opcao == "Juros Compostos":
+        juros_compostos()
+    elif opcao == "Valor Presente Líquido (VPL)":
+        valor_presente_liquido()
+    elif opcao == "Taxa Interna de Retorno (TIR)":
+        taxa_interna_retorno()
+    elif opcao == "Sistema de Amortização":
+        sistema_amortizacao()
+    elif opcao == "Análise de Investimentos":
+        analise_investimentos()
+    elif opcao == "Cenários Salvos":
+        cenarios_salvos()
+
+# Painel de depuração com o perfil da página
+if perfilando:
+    with st.sidebar.expander("🐞 Perfil da Página", expanded=True):
+        if perfil['arquivo'] is None:
+            st.info("Outra sessão está sendo perfilada; esta execução não foi medida")
+        else:
+            st.caption(f"{perfil['pagina']} | {perfil['duracao']:.3f}s | entradas {perfil['hash']}")
+            st.markdown("**Tempo por origem:**")
+            st.dataframe(
+                perfil['bibliotecas'].assign(Fracao=perfil['bibliotecas']['Fracao']*100)
+                .rename(columns={'Tempo_Proprio': 'Tempo (s)', 'Fracao': '%'})
+                .round(4),
+                use_container_width=True
+            )
+            st.markdown("**Funções mais lentas (tempo acumulado):**")
+            st.dataframe(perfil['funcoes'].round(4), use_container_width=True)
+            with open(perfil['arquivo'], 'rb') as arquivo:
+                st.download_button(
+                    "⬇️ Baixar perfil (.prof)", arquivo.read(),
+                    file_name=os.path.basename(perfil['arquivo'])
+                )
+            st.caption(f"Salvo em {perfil['arquivo']}")
 
 # Footer
 st.markdown("---")
@@ -1095,11 +1739,14 @@ with st.expander("ℹ️ Informações sobre os métodos financeiros"):
     - **SAC:** Prestações decrescentes, amortização constante
     - **Price:** Prestações fixas, amortização crescente
     - **SAC Americano:** Juros mensais, principal no final
+    - **Amortização Extraordinária:** Aportes reduzindo prazo ou prestação, refinanciamento e TR/IPCA
+    - **CET:** Custo efetivo total com IOF, tarifas e seguro, comparando ofertas
     
     **Análise de Investimentos:**
     - **Ações:** Beta, Sharpe Ratio, volatilidade
     - **Fundos:** ROI bruto/líquido, comparação
-    - **Criptomoedas:** Volatilidade, drawdown, análise de risco
+    - **Criptomoedas:** Volatilidade, drawdown, VaR/CVaR, backtest de stop/take, análise de risco
+    - **Opções:** Black-Scholes, árvore binomial (exercício americano), gregas e volatilidade implícita
     - **Correlação:** Diversificação de portfólio
     """)
 
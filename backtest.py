@@ -0,0 +1,173 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from funcoes_financeiras import obter_serie_precos
+
+# Acima deste número de combinações a grade é dividida entre processos
+LIMITE_PARALELO = 20_000
+
+REGRAS_ENTRADA = ['momentum', 'reversao']
+
+def _extrair_precos(precos):
+    """
+    Aceita um array, uma Series ou um DataFrame do yfinance (retorno total ou Close)
+    """
+    if isinstance(precos, pd.DataFrame):
+        precos = obter_serie_precos(precos)
+    return np.asarray(precos, dtype=float)
+
+def calcular_sinais_entrada(precos, lookbacks, regra='momentum'):
+    """
+    Calcula a matriz (T, L) de sinais de compra para cada lookback.
+
+    momentum: preço acima do preço de lookback períodos atrás
+    reversao: preço abaixo da média móvel dos últimos lookback períodos
+    """
+    if regra not in REGRAS_ENTRADA:
+        raise ValueError(f"Regra de entrada desconhecida: {regra}")
+
+    precos = _extrair_precos(precos)
+    lookbacks = np.asarray(lookbacks, dtype=int)
+    t = np.arange(len(precos))[:, None]
+    valido = t >= lookbacks[None, :]
+    anterior = np.clip(t - lookbacks[None, :], 0, None)
+
+    if regra == 'momentum':
+        sinais = precos[:, None] > precos[anterior]
+    else:
+        acumulado = np.concatenate([[0.0], np.cumsum(precos)])
+        media = (acumulado[t] - acumulado[anterior]) / np.maximum(lookbacks[None, :], 1)
+        sinais = precos[:, None] < media
+
+    return sinais & valido
+
+def _simular_grade(precos, sinais, stops, takes, colunas_sinal, custo_operacao, periodos_por_ano,
+                   taxa_livre_risco, guardar_curvas):
+    """
+    Simula todas as combinações da grade ao mesmo tempo: o laço é só no tempo,
+    cada passo atualiza vetores com uma posição por combinação
+    """
+    n = len(stops)
+    posicionado = np.zeros(n, dtype=bool)
+    entrada = np.ones(n)
+    patrimonio = np.ones(n)
+    pico = np.ones(n)
+    pior_drawdown = np.zeros(n)
+    operacoes = np.zeros(n, dtype=int)
+    acertos = np.zeros(n, dtype=int)
+    soma = np.zeros(n)
+    soma_quadrados = np.zeros(n)
+    curvas = np.empty((len(precos), n), dtype=np.float32) if guardar_curvas else None
+    if guardar_curvas:
+        curvas[0] = 1.0
+
+    for t in range(1, len(precos)):
+        anterior = patrimonio
+        patrimonio = np.where(posicionado, patrimonio * (precos[t] / precos[t - 1]), patrimonio)
+
+        # Saídas por stop loss ou take profit
+        retorno_operacao = precos[t] / entrada - 1
+        sair = posicionado & ((retorno_operacao <= -stops) | (retorno_operacao >= takes))
+        operacoes += sair
+        acertos += sair & (retorno_operacao > 0)
+        patrimonio = np.where(sair, patrimonio * (1 - custo_operacao), patrimonio)
+        posicionado = posicionado & ~sair
+
+        # Entradas (não reentra na mesma barra em que saiu)
+        entrar = ~posicionado & ~sair & sinais[t, colunas_sinal]
+        entrada = np.where(entrar, precos[t], entrada)
+        patrimonio = np.where(entrar, patrimonio * (1 - custo_operacao), patrimonio)
+        posicionado = posicionado | entrar
+
+        retorno = patrimonio / anterior - 1
+        soma += retorno
+        soma_quadrados += retorno ** 2
+        pico = np.maximum(pico, patrimonio)
+        pior_drawdown = np.minimum(pior_drawdown, patrimonio / pico - 1)
+        if guardar_curvas:
+            curvas[t] = patrimonio
+
+    # Posições abertas no fim contam como encerradas no último preço
+    operacoes += posicionado
+    acertos += posicionado & (precos[-1] > entrada)
+
+    passos = max(len(precos) - 1, 1)
+    media = soma / passos
+    variancia = (soma_quadrados - passos * media ** 2) / max(passos - 1, 1)
+    volatilidade = np.sqrt(np.maximum(variancia, 0)) * np.sqrt(periodos_por_ano)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(volatilidade > 0, (media * periodos_por_ano - taxa_livre_risco) / volatilidade, 0.0)
+        taxa_acerto = np.where(operacoes > 0, acertos / operacoes, 0.0)
+
+    return {
+        'retorno_total': patrimonio - 1,
+        'operacoes': operacoes,
+        'taxa_acerto': taxa_acerto,
+        'max_drawdown': pior_drawdown,
+        'sharpe': sharpe,
+        'curvas': curvas
+    }
+
+def executar_backtest(precos, stops, takes, lookbacks, regra='momentum', custo_operacao=0.0,
+                      periodos_por_ano=252, taxa_livre_risco=0.06, guardar_curvas=True,
+                      max_processos=None):
+    """
+    Testa a estratégia comprada com stop loss / take profit sobre o histórico,
+    para toda a grade stops × takes × lookbacks de uma vez.
+
+    precos: array, Series ou DataFrame de buscar_dados_acao
+    stops, takes: limites como fração (0.1 = 10%)
+    regra: sinal de entrada ('momentum' ou 'reversao'), ou um array booleano (T,)
+
+    Retorna {'resultados': DataFrame com uma linha por combinação,
+             'curvas': matriz (T, G) de patrimônio ou None}
+    """
+    precos = _extrair_precos(precos)
+    lookbacks = np.asarray(lookbacks, dtype=int)
+
+    if isinstance(regra, str):
+        sinais = calcular_sinais_entrada(precos, lookbacks, regra)
+    else:
+        sinais = np.repeat(np.asarray(regra, dtype=bool)[:, None], len(lookbacks), axis=1)
+
+    grade_stop, grade_take, grade_lookback = np.meshgrid(
+        np.asarray(stops, dtype=float), np.asarray(takes, dtype=float),
+        np.arange(len(lookbacks)), indexing='ij'
+    )
+    grade_stop = grade_stop.ravel()
+    grade_take = grade_take.ravel()
+    grade_lookback = grade_lookback.ravel()
+    argumentos = (custo_operacao, periodos_por_ano, taxa_livre_risco, guardar_curvas)
+
+    if len(grade_stop) > LIMITE_PARALELO and max_processos != 1:
+        processos = max_processos or os.cpu_count() or 1
+        blocos = np.array_split(np.arange(len(grade_stop)), processos)
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            futuros = [
+                executor.submit(_simular_grade, precos, sinais, grade_stop[b], grade_take[b],
+                                grade_lookback[b], *argumentos)
+                for b in blocos
+            ]
+            partes = [f.result() for f in futuros]
+        saida = {
+            chave: (np.concatenate([p[chave] for p in partes], axis=-1)
+                    if partes[0][chave] is not None else None)
+            for chave in partes[0]
+        }
+    else:
+        saida = _simular_grade(precos, sinais, grade_stop, grade_take, grade_lookback, *argumentos)
+
+    resultados = pd.DataFrame({
+        'Stop_Loss': grade_stop,
+        'Take_Profit': grade_take,
+        'Lookback': lookbacks[grade_lookback],
+        'Retorno_Total': saida['retorno_total'],
+        'Operacoes': saida['operacoes'],
+        'Taxa_Acerto': saida['taxa_acerto'],
+        'Max_Drawdown': saida['max_drawdown'],
+        'Sharpe': saida['sharpe']
+    })
+    return {'resultados': resultados, 'curvas': saida['curvas']}
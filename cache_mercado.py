@@ -0,0 +1,233 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# Arquivo SQLite compartilhado por todos os processos/workers do Streamlit.
+# Fica num diretório privado do usuário (0700, arquivo 0600): os valores são
+# lidos com pickle, então ninguém além do dono do app pode escrever nele.
+DIRETORIO_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'calculadora')
+CAMINHO_CACHE = os.environ.get('CALCULADORA_CACHE_DB', os.path.join(DIRETORIO_CACHE, 'cache.sqlite'))
+
+# Tempo de validade padrão dos dados de mercado (segundos)
+TTL_PADRAO = float(os.environ.get('CALCULADORA_CACHE_TTL', 15 * 60))
+
+# Tempo máximo que um processo pode manter o bloqueio de uma chave (segundos)
+TEMPO_MAX_BLOQUEIO = 60
+
+# Espera máxima pelo bloqueio de outro processo antes de buscar direto (segundos)
+ESPERA_MAX_BLOQUEIO = 30
+
+# Entradas mais antigas que isto são apagadas do arquivo (segundos). Maior que
+# qualquer TTL de uso, para que ler_cache(aceitar_expirado=True) ainda sirva
+# dados antigos quando o provedor falha.
+IDADE_MAX_CACHE = float(os.environ.get('CALCULADORA_CACHE_IDADE_MAX', 7 * 24 * 60 * 60))
+
+# Intervalo mínimo entre duas limpezas de entradas antigas neste processo (segundos)
+INTERVALO_LIMPEZA = 10 * 60
+
+_local = threading.local()
+_travas = {}
+_trava_travas = threading.Lock()
+
+# Contadores de acertos/faltas de obter_ou_buscar neste processo
+_estatisticas = {'acertos': 0, 'faltas': 0}
+_trava_estatisticas = threading.Lock()
+
+_ultima_limpeza = 0.0
+
+def _conexao():
+    """
+    Retorna a conexão SQLite da thread atual, criando as tabelas se necessário
+    """
+    conexoes = getattr(_local, 'conexoes', None)
+    if conexoes is None:
+        conexoes = _local.conexoes = {}
+
+    con = conexoes.get(CAMINHO_CACHE)
+    if con is None:
+        diretorio = os.path.dirname(os.path.abspath(CAMINHO_CACHE))
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        # Cria o arquivo já com permissão só para o dono (chmod falha se o
+        # arquivo pertencer a outro usuário)
+        os.close(os.open(CAMINHO_CACHE, os.O_CREAT | os.O_RDWR, 0o600))
+        os.chmod(CAMINHO_CACHE, 0o600)
+        con = sqlite3.connect(CAMINHO_CACHE, timeout=30, isolation_level=None)
+        con.execute('PRAGMA journal_mode=WAL')
+        con.execute('CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor BLOB, criado REAL)')
+        con.execute('CREATE TABLE IF NOT EXISTS bloqueios (chave TEXT PRIMARY KEY, expira REAL)')
+        conexoes[CAMINHO_CACHE] = con
+    return con
+
+def _trava_da_chave(chave):
+    """
+    Retorna a trava local (por processo) associada a uma chave
+    """
+    with _trava_travas:
+        trava = _travas.get(chave)
+        if trava is None:
+            trava = _travas[chave] = threading.Lock()
+        return trava
+
+def ler_cache(chave, ttl=TTL_PADRAO, aceitar_expirado=False):
+    """
+    Lê um valor do cache compartilhado (None se ausente ou expirado)
+    """
+    try:
+        linha = _conexao().execute(
+            'SELECT valor, criado FROM cache WHERE chave = ?', (chave,)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+
+    if linha is None:
+        return None
+
+    valor, criado = linha
+    if not aceitar_expirado and time.time() - criado > ttl:
+        return None
+    try:
+        return pickle.loads(valor)
+    except Exception:
+        # Entrada corrompida ou gravada por outra versão do pandas/NumPy:
+        # descartada e tratada como ausente
+        try:
+            _conexao().execute('DELETE FROM cache WHERE chave = ?', (chave,))
+        except sqlite3.Error:
+            pass
+        return None
+
+def gravar_cache(chave, valor):
+    """
+    Grava um valor no cache compartilhado
+    """
+    try:
+        _conexao().execute(
+            'INSERT OR REPLACE INTO cache (chave, valor, criado) VALUES (?, ?, ?)',
+            (chave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), time.time())
+        )
+    except sqlite3.Error:
+        pass
+
+    global _ultima_limpeza
+    if time.time() - _ultima_limpeza > INTERVALO_LIMPEZA:
+        _ultima_limpeza = time.time()
+        limpar_expirados()
+
+def limpar_expirados(idade_maxima=IDADE_MAX_CACHE):
+    """
+    Remove as entradas gravadas há mais de idade_maxima segundos e os
+    bloqueios vencidos (chamada periodicamente por gravar_cache)
+    """
+    agora = time.time()
+    try:
+        con = _conexao()
+        removidas = con.execute('DELETE FROM cache WHERE criado < ?', (agora - idade_maxima,)).rowcount
+        con.execute('DELETE FROM bloqueios WHERE expira < ?', (agora,))
+        return removidas
+    except sqlite3.Error:
+        return 0
+
+def limpar_cache(prefixo=''):
+    """
+    Remove do cache todas as chaves que começam com o prefixo informado
+    """
+    try:
+        _conexao().execute('DELETE FROM cache WHERE chave LIKE ?', (prefixo + '%',))
+    except sqlite3.Error:
+        pass
+
+def _adquirir_bloqueio(chave):
+    """
+    Tenta adquirir o bloqueio entre processos de uma chave
+    """
+    agora = time.time()
+    try:
+        con = _conexao()
+        # Bloqueios abandonados (processo morto) expiram sozinhos
+        con.execute('DELETE FROM bloqueios WHERE chave = ? AND expira < ?', (chave, agora))
+        cursor = con.execute(
+            'INSERT OR IGNORE INTO bloqueios (chave, expira) VALUES (?, ?)',
+            (chave, agora + TEMPO_MAX_BLOQUEIO)
+        )
+        return cursor.rowcount == 1
+    except sqlite3.Error:
+        return True
+
+def _liberar_bloqueio(chave):
+    """
+    Libera o bloqueio entre processos de uma chave
+    """
+    try:
+        _conexao().execute('DELETE FROM bloqueios WHERE chave = ?', (chave,))
+    except sqlite3.Error:
+        pass
+
+def _contar(tipo):
+    with _trava_estatisticas:
+        _estatisticas[tipo] += 1
+
+def estatisticas_cache():
+    """
+    Acertos, faltas e taxa de acerto de obter_ou_buscar neste processo
+    """
+    with _trava_estatisticas:
+        acertos, faltas = _estatisticas['acertos'], _estatisticas['faltas']
+    total = acertos + faltas
+    return {'acertos': acertos, 'faltas': faltas, 'taxa_acerto': acertos / total if total else 0.0}
+
+def zerar_estatisticas_cache():
+    """
+    Zera os contadores de estatisticas_cache
+    """
+    with _trava_estatisticas:
+        _estatisticas.update(acertos=0, faltas=0)
+
+def obter_ou_buscar(chave, buscar, ttl=TTL_PADRAO, espera_maxima=ESPERA_MAX_BLOQUEIO):
+    """
+    Retorna o valor em cache ou executa buscar() uma única vez para todos os
+    processos e threads que pedirem a mesma chave ao mesmo tempo (single-flight).
+    Quem espera o bloqueio de outro processo por mais de espera_maxima segundos
+    busca direto. Valores None não são armazenados.
+    """
+    valor = ler_cache(chave, ttl)
+    if valor is not None:
+        _contar('acertos')
+        return valor
+
+    # Threads do mesmo processo esperam aqui
+    with _trava_da_chave(chave):
+        valor = ler_cache(chave, ttl)
+        if valor is not None:
+            _contar('acertos')
+            return valor
+
+        # Outros processos esperam o dono do bloqueio gravar o resultado, até
+        # espera_maxima; depois disso (dono travado ou morto) busca direto
+        limite = time.time() + espera_maxima
+        while not _adquirir_bloqueio(chave):
+            if time.time() > limite:
+                _contar('faltas')
+                valor = buscar()
+                if valor is not None:
+                    gravar_cache(chave, valor)
+                return valor
+            time.sleep(0.1)
+            valor = ler_cache(chave, ttl)
+            if valor is not None:
+                _contar('acertos')
+                return valor
+
+        try:
+            valor = ler_cache(chave, ttl)
+            if valor is not None:
+                _contar('acertos')
+            else:
+                _contar('faltas')
+                valor = buscar()
+                if valor is not None:
+                    gravar_cache(chave, valor)
+            return valor
+        finally:
+            _liberar_bloqueio(chave)
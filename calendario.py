@@ -0,0 +1,152 @@
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Intervalo coberto pela tabela pré-calculada
+ANO_INICIAL = 1990
+ANO_FINAL = 2100
+
+CONVENCOES = ['DU/252', 'ACT/365', '30/360']
+
+def _pascoa(ano):
+    """
+    Data da Páscoa (algoritmo de Meeus/Jones/Butcher)
+    """
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+def feriados_nacionais(ano):
+    """
+    Feriados nacionais que fecham a B3 e entram na contagem DU/252 (calendário ANBIMA)
+    """
+    pascoa = _pascoa(ano)
+    feriados = [
+        date(ano, 1, 1),                 # Confraternização Universal
+        pascoa - timedelta(days=48),     # Carnaval (segunda)
+        pascoa - timedelta(days=47),     # Carnaval (terça)
+        pascoa - timedelta(days=2),      # Sexta-feira Santa
+        date(ano, 4, 21),                # Tiradentes
+        date(ano, 5, 1),                 # Dia do Trabalho
+        pascoa + timedelta(days=60),     # Corpus Christi
+        date(ano, 9, 7),                 # Independência
+        date(ano, 10, 12),               # Nossa Senhora Aparecida
+        date(ano, 11, 2),                # Finados
+        date(ano, 11, 15),               # Proclamação da República
+        date(ano, 12, 25)                # Natal
+    ]
+    if ano >= 2024:
+        feriados.append(date(ano, 11, 20))  # Dia Nacional de Zumbi e da Consciência Negra
+    return sorted(feriados)
+
+@lru_cache(maxsize=1)
+def _tabela():
+    """
+    Pré-calcula, uma única vez por processo, a marcação de dias úteis e a soma
+    acumulada de dias úteis para todo o intervalo coberto
+    """
+    inicio = np.datetime64(f'{ANO_INICIAL}-01-01', 'D')
+    fim = np.datetime64(f'{ANO_FINAL + 1}-01-01', 'D')
+    dias = np.arange(inicio, fim)
+
+    feriados = np.array(
+        [f for ano in range(ANO_INICIAL, ANO_FINAL + 1) for f in feriados_nacionais(ano)],
+        dtype='datetime64[D]'
+    )
+    uteis = np.is_busday(dias, holidays=feriados)
+
+    # acumulado[i] = dias úteis antes do dia i
+    acumulado = np.concatenate([[0], np.cumsum(uteis)])
+    return inicio, uteis, acumulado
+
+def _posicoes(datas):
+    """
+    Converte datas (escalar ou array, str/datetime/Timestamp) em posições na tabela
+    """
+    escalar = np.ndim(datas) == 0
+    indice = pd.DatetimeIndex(pd.to_datetime([datas] if escalar else datas))
+    if indice.tz is not None:
+        indice = indice.tz_localize(None)
+
+    inicio, uteis, _ = _tabela()
+    posicoes = (indice.to_numpy().astype('datetime64[D]') - inicio).astype(int)
+    if (posicoes < 0).any() or (posicoes >= len(uteis)).any():
+        raise ValueError(f"Datas fora do calendário ({ANO_INICIAL}-{ANO_FINAL})")
+    return posicoes, escalar
+
+def _saida(valores, escalar):
+    return valores[0] if escalar else valores
+
+def eh_dia_util(datas):
+    """
+    Indica se cada data é dia útil na B3
+    """
+    posicoes, escalar = _posicoes(datas)
+    return _saida(_tabela()[1][posicoes], escalar)
+
+def contar_dias_uteis(inicio, fim):
+    """
+    Conta os dias úteis de inicio (inclusive) até fim (exclusive), convenção
+    ANBIMA. Vetorizado e O(1) por par de datas.
+    """
+    posicoes_inicio, escalar_inicio = _posicoes(inicio)
+    posicoes_fim, escalar_fim = _posicoes(fim)
+    acumulado = _tabela()[2]
+    return _saida(acumulado[posicoes_fim] - acumulado[posicoes_inicio], escalar_inicio and escalar_fim)
+
+def adicionar_dias_uteis(datas, quantidade):
+    """
+    Avança (ou recua, se negativo) a quantidade de dias úteis a partir de cada
+    data, sem contar a própria data (como WORKDAY das planilhas)
+    """
+    posicoes, escalar = _posicoes(datas)
+    inicio, _, acumulado = _tabela()
+    quantidade = np.asarray(quantidade)
+    # Avançando conta os úteis em (data, nova]; recuando, em [nova, data)
+    alvo = np.where(quantidade > 0, acumulado[posicoes + 1] + quantidade, acumulado[posicoes] + quantidade + 1)
+    novas = np.searchsorted(acumulado, alvo, side='left') - 1
+    return _saida(pd.DatetimeIndex(inicio + novas.astype('timedelta64[D]')), escalar)
+
+def proximo_dia_util(datas):
+    """
+    Rola cada data para o próximo dia útil (a própria data se já for útil)
+    """
+    posicoes, escalar = _posicoes(datas)
+    inicio, _, acumulado = _tabela()
+    novas = np.searchsorted(acumulado, acumulado[posicoes] + 1, side='left') - 1
+    return _saida(pd.DatetimeIndex(inicio + novas.astype('timedelta64[D]')), escalar)
+
+def calcular_fracao_ano(inicio, fim, convencao='DU/252'):
+    """
+    Fração de ano entre datas segundo a convenção de contagem de dias:
+    DU/252 (dias úteis), ACT/365 (dias corridos) ou 30/360 (europeu)
+    """
+    if convencao == 'DU/252':
+        return contar_dias_uteis(inicio, fim) / 252
+
+    posicoes_inicio, escalar_inicio = _posicoes(inicio)
+    posicoes_fim, escalar_fim = _posicoes(fim)
+    escalar = escalar_inicio and escalar_fim
+
+    if convencao == 'ACT/365':
+        return _saida((posicoes_fim - posicoes_inicio) / 365, escalar)
+
+    if convencao == '30/360':
+        base = _tabela()[0]
+        d1 = pd.DatetimeIndex(base + posicoes_inicio.astype('timedelta64[D]'))
+        d2 = pd.DatetimeIndex(base + posicoes_fim.astype('timedelta64[D]'))
+        dias = (360 * (d2.year - d1.year) + 30 * (d2.month - d1.month)
+                + np.minimum(d2.day, 30) - np.minimum(d1.day, 30))
+        return _saida(np.asarray(dias) / 360, escalar)
+
+    raise ValueError(f"Convenção desconhecida: {convencao}")
@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+
+from funcoes_financeiras import (
+    calcular_estatisticas_retornos, calcular_max_drawdown, inferir_periodos_por_ano, obter_serie_precos
+)
+
+# Rebalanceamentos por calendário; números são bandas de tolerância (0.05 = 5 p.p.)
+FREQUENCIAS = {'nenhum': None, 'mensal': 'M', 'trimestral': 'Q', 'semestral': '6M', 'anual': 'Y'}
+
+# Períodos equivalentes quando o índice não é de datas
+PERIODOS_FREQUENCIA = {'M': 21, 'Q': 63, '6M': 126, 'Y': 252}
+
+REGRAS_PESOS = ['igual', 'inverso_volatilidade']
+
+# Bloco de tempo examinado de uma vez na busca do próximo rompimento de banda
+BLOCO_BANDA = 252
+
+def _matriz_precos(precos):
+    """
+    Aceita um DataFrame de fechamentos (uma coluna por ativo), um dicionário
+    {ticker: DataFrame do yfinance} ou um array (T, N)
+    """
+    if isinstance(precos, dict):
+        precos = pd.DataFrame({ticker: obter_serie_precos(dados) for ticker, dados in precos.items()})
+    if isinstance(precos, pd.DataFrame):
+        precos = precos.sort_index().ffill().dropna()
+        return precos.to_numpy(dtype=float), precos.index, list(precos.columns)
+    precos = np.asarray(precos, dtype=float)
+    return precos, pd.RangeIndex(len(precos)), [f'Ativo_{i + 1}' for i in range(precos.shape[1])]
+
+def _datas_calendario(indice, frequencia):
+    """
+    Posições dos rebalanceamentos por calendário: primeiro pregão de cada período
+    """
+    codigo = FREQUENCIAS[frequencia]
+    if codigo is None:
+        return np.array([], dtype=int)
+    if isinstance(indice, pd.DatetimeIndex):
+        meses = indice.year * 12 + indice.month - 1
+        tamanho = {'M': 1, 'Q': 3, '6M': 6, 'Y': 12}[codigo]
+        blocos = np.asarray(meses // tamanho)
+    else:
+        blocos = np.arange(len(indice)) // PERIODOS_FREQUENCIA[codigo]
+    return np.flatnonzero(np.diff(blocos) != 0) + 1
+
+def _pesos_alvo(carteiras, retornos, t, janela_volatilidade):
+    """
+    Matriz (S, N) de pesos alvo na data t: pesos fixos ou calculados pela regra
+    com o histórico disponível até t
+    """
+    n = retornos.shape[1]
+    linhas = []
+    for pesos in carteiras:
+        if isinstance(pesos, str):
+            if pesos not in REGRAS_PESOS:
+                raise ValueError(f"Regra de pesos desconhecida: {pesos}")
+            historico = retornos[max(0, t - janela_volatilidade):t]
+            if pesos == 'inverso_volatilidade' and len(historico) > 1:
+                volatilidades = historico.std(axis=0, ddof=1)
+                pesos = np.where(volatilidades > 0, 1 / volatilidades, 0.0)
+            else:
+                pesos = np.ones(n)
+        pesos = np.asarray(pesos, dtype=float)
+        linhas.append(pesos / pesos.sum())
+    return np.vstack(linhas)
+
+def _simular_bloco(precos, retornos, carteiras, proximo_rebalanceamento, custos, capital_inicial,
+                   janela_volatilidade):
+    """
+    Simula S carteiras que rebalanceiam nas mesmas datas. Entre dois
+    rebalanceamentos as quantidades são fixas, então o patrimônio do trecho
+    inteiro sai de um único produto matricial precos[trecho] @ quantidades.T.
+    O laço é só nas datas de rebalanceamento, onde custos e IR são cobrados.
+    """
+    corretagem, corretagem_fixa, emolumentos, aliquota_ir = custos
+    t_total = len(precos)
+    s = len(carteiras)
+
+    patrimonio = np.empty((t_total, s))
+    custos_totais = np.zeros(s)
+    impostos = np.zeros(s)
+    giro = np.zeros(s)
+    rebalanceamentos = np.zeros(s, dtype=int)
+    prejuizo = np.zeros(s)
+
+    # Compra inicial
+    alvo = _pesos_alvo(carteiras, retornos, 0, janela_volatilidade)
+    compras = alvo * capital_inicial
+    custo = compras.sum(axis=1) * (corretagem + emolumentos) + corretagem_fixa * (compras > 0).sum(axis=1)
+    custos_totais += custo
+    quantidades = alvo * (capital_inicial - custo)[:, None] / precos[0]
+    custo_medio = np.tile(precos[0], (s, 1))
+
+    t = 0
+    while True:
+        r = min(proximo_rebalanceamento(t, quantidades, alvo), t_total - 1)
+        patrimonio[t:r + 1] = precos[t:r + 1] @ quantidades.T
+        if r >= t_total - 1:
+            break
+
+        # Rebalanceamento em r
+        posicao = quantidades * precos[r]
+        valor = posicao.sum(axis=1)
+        alvo = _pesos_alvo(carteiras, retornos, r, janela_volatilidade)
+        negociado = alvo * valor[:, None] - posicao
+        vendas = np.maximum(-negociado, 0)
+
+        # IR sobre o lucro realizado, compensando prejuízos anteriores
+        lucro = (vendas / precos[r] * (precos[r] - custo_medio)).sum(axis=1)
+        imposto = aliquota_ir * np.maximum(lucro - prejuizo, 0)
+        prejuizo = np.maximum(prejuizo - lucro, 0)
+
+        volume = np.abs(negociado)
+        custo = (volume.sum(axis=1) * (corretagem + emolumentos)
+                 + corretagem_fixa * (volume > 1e-9 * valor[:, None]).sum(axis=1) + imposto)
+
+        novas = alvo * (valor - custo)[:, None] / precos[r]
+        compradas = novas > quantidades
+        custo_medio = np.where(
+            compradas,
+            (quantidades * custo_medio + (novas - quantidades) * precos[r]) / np.where(compradas, novas, 1.0),
+            custo_medio
+        )
+
+        custos_totais += custo
+        impostos += imposto
+        giro += volume.sum(axis=1) / 2 / valor
+        rebalanceamentos += 1
+        quantidades = novas
+        t = r
+
+    return {
+        'patrimonio': patrimonio / capital_inicial,
+        'custos': custos_totais,
+        'impostos': impostos,
+        'giro': giro,
+        'rebalanceamentos': rebalanceamentos
+    }
+
+def _proximo_calendario(datas):
+    def proximo(t, quantidades, alvo):
+        posicao = np.searchsorted(datas, t, side='right')
+        return datas[posicao] if posicao < len(datas) else np.inf
+    return proximo
+
+def _proximo_banda(precos, banda):
+    """
+    Próxima data em que algum peso se afasta do alvo mais que a banda. Os pesos
+    de cada bloco de datas futuras são calculados de uma vez.
+    """
+    def proximo(t, quantidades, alvo):
+        inicio = t + 1
+        while inicio < len(precos):
+            fim = min(inicio + BLOCO_BANDA, len(precos))
+            posicao = precos[inicio:fim] * quantidades[0]
+            pesos = posicao / posicao.sum(axis=1, keepdims=True)
+            rompidos = np.flatnonzero((np.abs(pesos - alvo[0]) > banda).any(axis=1))
+            if len(rompidos):
+                return inicio + rompidos[0]
+            inicio = fim
+        return np.inf
+    return proximo
+
+def simular_carteiras(precos, carteiras, rebalanceamentos=('mensal',), capital_inicial=100_000.0,
+                      corretagem=0.0, corretagem_fixa=0.0, emolumentos=0.0003, aliquota_ir=0.15,
+                      periodos_por_ano=None, taxa_livre_risco=0.06, janela_volatilidade=63):
+    """
+    Simula a manutenção de carteiras ao longo do histórico com rebalanceamento
+    e custos de negociação, para todas as combinações carteira × rebalanceamento.
+
+    precos: DataFrame de fechamentos, dicionário {ticker: DataFrame} ou array (T, N)
+    carteiras: dicionário {nome: pesos (N,) ou regra de REGRAS_PESOS}
+    rebalanceamentos: nomes de FREQUENCIAS ('mensal', 'anual', ...) e/ou
+        bandas de tolerância (0.05 rebalanceia quando um peso se afasta 5 p.p. do alvo)
+    corretagem: fração do volume negociado; corretagem_fixa: R$ por ordem
+    emolumentos: taxas da B3 sobre o volume
+    aliquota_ir: IR sobre o lucro realizado nas vendas, com compensação de prejuízos
+
+    Os custos são calculados sobre as ordens antes de descontá-los do patrimônio.
+
+    Retorna {'resultados': DataFrame com uma linha por combinação,
+             'curvas': DataFrame (T, combinações) de patrimônio em base 1}
+    """
+    valores, indice, _ = _matriz_precos(precos)
+    if periodos_por_ano is None:
+        periodos_por_ano = inferir_periodos_por_ano(indice) if isinstance(indice, pd.DatetimeIndex) else 252
+
+    nomes = list(carteiras)
+    lista = [carteiras[nome] for nome in nomes]
+    retornos = valores[1:] / valores[:-1] - 1
+    custos = (corretagem, corretagem_fixa, emolumentos, aliquota_ir)
+    argumentos = (custos, capital_inicial, janela_volatilidade)
+
+    linhas = []
+    curvas = {}
+    for rebalanceamento in rebalanceamentos:
+        if isinstance(rebalanceamento, str):
+            if rebalanceamento not in FREQUENCIAS:
+                raise ValueError(f"Frequência desconhecida: {rebalanceamento}")
+            # Mesmas datas para todas as carteiras: simuladas juntas
+            proximo = _proximo_calendario(_datas_calendario(indice, rebalanceamento))
+            saidas = [(nomes, _simular_bloco(valores, retornos, lista, proximo, *argumentos))]
+            rotulo = rebalanceamento
+        else:
+            proximo = _proximo_banda(valores, float(rebalanceamento))
+            saidas = [([nome], _simular_bloco(valores, retornos, [pesos], proximo, *argumentos))
+                      for nome, pesos in zip(nomes, lista)]
+            rotulo = f'banda {float(rebalanceamento):.0%}'
+
+        for nomes_bloco, saida in saidas:
+            estatisticas = calcular_estatisticas_retornos(
+                saida['patrimonio'][1:] / saida['patrimonio'][:-1] - 1, periodos_por_ano, taxa_livre_risco
+            )
+            drawdowns = np.atleast_1d(calcular_max_drawdown(saida['patrimonio']))
+            anos = (len(valores) - 1) / periodos_por_ano
+            for j, nome in enumerate(nomes_bloco):
+                linhas.append({
+                    'Carteira': nome,
+                    'Rebalanceamento': rotulo,
+                    'Retorno_Total': saida['patrimonio'][-1, j] - 1,
+                    'Volatilidade': np.atleast_1d(estatisticas['volatilidade'])[j],
+                    'Sharpe': np.atleast_1d(estatisticas['sharpe_ratio'])[j],
+                    'Max_Drawdown': drawdowns[j],
+                    'Rebalanceamentos': saida['rebalanceamentos'][j],
+                    'Giro_Anual': saida['giro'][j] / anos if anos > 0 else 0.0,
+                    'Custos': saida['custos'][j],
+                    'Impostos': saida['impostos'][j]
+                })
+                curvas[f'{nome} | {rotulo}'] = saida['patrimonio'][:, j]
+
+    return {'resultados': pd.DataFrame(linhas), 'curvas': pd.DataFrame(curvas, index=indice)}
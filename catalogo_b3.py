@@ -0,0 +1,155 @@
+import csv
+import difflib
+import os
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+
+import pandas as pd
+
+# Catálogo distribuído com o projeto e cópia local atualizada (tem prioridade se existir).
+# O distribuído é um subconjunto selecionado dos ativos mais negociados (ações,
+# FIIs, BDRs e ETFs), não a lista completa da B3: para ela, gere a cópia local
+# com atualizar_catalogo a partir da lista de instrumentos listados.
+CAMINHO_CATALOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ativos_b3.csv')
+CAMINHO_CATALOGO_LOCAL = os.environ.get(
+    'CALCULADORA_CATALOGO_B3',
+    os.path.join(os.path.expanduser('~'), '.calculadora_ativos_b3.csv')
+)
+
+COLUNAS_CATALOGO = ['ticker', 'nome', 'tipo', 'setor', 'segmento']
+
+TIPOS_ATIVO = ['Ação', 'FII', 'BDR', 'ETF']
+
+def _normalizar(texto):
+    """
+    Maiúsculas e sem acentos, para a busca não depender da grafia
+    """
+    texto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).upper().strip()
+
+def _caminho_catalogo():
+    return CAMINHO_CATALOGO_LOCAL if os.path.exists(CAMINHO_CATALOGO_LOCAL) else CAMINHO_CATALOGO
+
+@lru_cache(maxsize=4)
+def _carregar(caminho):
+    """
+    Lê o catálogo e monta os índices de busca: tuplas ordenadas pelo ticker
+    (busca por prefixo com bisect) e as palavras dos nomes em ordem alfabética
+    com a posição do ativo. Só é chamado na primeira consulta.
+    """
+    with open(caminho, encoding='utf-8', newline='') as arquivo:
+        linhas = sorted(
+            (tuple(linha[c].strip() for c in COLUNAS_CATALOGO) for linha in csv.DictReader(arquivo)),
+            key=lambda linha: linha[0]
+        )
+    colunas = dict(zip(COLUNAS_CATALOGO, map(tuple, zip(*linhas)))) if linhas \
+        else {c: () for c in COLUNAS_CATALOGO}
+
+    palavras = sorted(
+        (palavra, i)
+        for i, nome in enumerate(colunas['nome'])
+        for palavra in set(_normalizar(nome).replace('-', ' ').split())
+    )
+    colunas['palavras'] = tuple(p for p, _ in palavras)
+    colunas['posicoes'] = tuple(i for _, i in palavras)
+    return colunas
+
+def carregar_catalogo():
+    """
+    Catálogo de ativos da B3 (ações, FIIs, BDRs e ETFs) em colunas
+    """
+    return _carregar(_caminho_catalogo())
+
+def _prefixo(chaves, prefixo):
+    """
+    Posições das chaves ordenadas que começam com o prefixo
+    """
+    inicio = bisect_left(chaves, prefixo)
+    fim = bisect_left(chaves, prefixo + '\uffff')
+    return range(inicio, fim)
+
+def obter_ativo(ticker):
+    """
+    Dados de um ativo pelo ticker (com ou sem .SA); None se não estiver no catálogo
+    """
+    catalogo = carregar_catalogo()
+    ticker = _normalizar(ticker).removesuffix('.SA')
+    i = bisect_left(catalogo['ticker'], ticker)
+    if i < len(catalogo['ticker']) and catalogo['ticker'][i] == ticker:
+        return {c: catalogo[c][i] for c in COLUNAS_CATALOGO}
+    return None
+
+def nome_ativo(ticker):
+    """
+    Nome do ativo para exibição; o próprio ticker se não estiver no catálogo
+    """
+    ativo = obter_ativo(ticker)
+    return ativo['nome'] if ativo else ticker
+
+def buscar_ativos(consulta, limite=20, tipos=None, setor=None):
+    """
+    Busca tickers por prefixo do ticker ou de qualquer palavra do nome
+    (sem diferenciar acentos e maiúsculas). Se houver poucos resultados,
+    completa com tickers e nomes parecidos (erros de digitação).
+
+    Retorna a lista de tickers (sem .SA), dos mais aos menos relevantes.
+    """
+    catalogo = carregar_catalogo()
+    termo = _normalizar(consulta).removesuffix('.SA')
+
+    def aceito(i):
+        return (tipos is None or catalogo['tipo'][i] in tipos) and (setor is None or catalogo['setor'][i] == setor)
+
+    if not termo:
+        return [catalogo['ticker'][i] for i in range(len(catalogo['ticker'])) if aceito(i)][:limite]
+
+    # Prefixo do ticker, prefixo de palavra do nome (todas as palavras da consulta)
+    candidatos = list(_prefixo(catalogo['ticker'], termo))
+    por_palavra = None
+    for palavra in termo.split():
+        encontrados = {catalogo['posicoes'][j] for j in _prefixo(catalogo['palavras'], palavra)}
+        por_palavra = encontrados if por_palavra is None else por_palavra & encontrados
+    candidatos += sorted(por_palavra - set(candidatos))
+
+    resultado = [catalogo['ticker'][i] for i in candidatos if aceito(i)]
+    if len(resultado) < limite:
+        parecidos = difflib.get_close_matches(termo, catalogo['ticker'], n=limite, cutoff=0.7)
+        parecidos += [
+            catalogo['ticker'][catalogo['posicoes'][bisect_left(catalogo['palavras'], p)]]
+            for p in difflib.get_close_matches(termo, catalogo['palavras'], n=limite, cutoff=0.75)
+        ]
+        resultado += [
+            t for t in dict.fromkeys(parecidos)
+            if t not in resultado and aceito(bisect_left(catalogo['ticker'], t))
+        ]
+    return resultado[:limite]
+
+def listar_ativos(tipo=None, setor=None):
+    """
+    DataFrame do catálogo (um ativo por linha), opcionalmente filtrado, para
+    agrupar por setor e segmento em telas de seleção
+    """
+    tabela = pd.DataFrame({c: carregar_catalogo()[c] for c in COLUNAS_CATALOGO})
+    if tipo is not None:
+        tabela = tabela[tabela['tipo'] == tipo]
+    if setor is not None:
+        tabela = tabela[tabela['setor'] == setor]
+    return tabela.reset_index(drop=True)
+
+def atualizar_catalogo(origem, destino=None):
+    """
+    Atualiza a cópia local do catálogo a partir de um CSV (arquivo ou URL)
+    com as colunas de COLUNAS_CATALOGO. Retorna o número de ativos.
+    """
+    tabela = pd.read_csv(origem, dtype=str)
+    faltando = set(COLUNAS_CATALOGO) - set(tabela.columns)
+    if faltando:
+        raise ValueError(f"Colunas ausentes no catálogo: {', '.join(sorted(faltando))}")
+
+    tabela = tabela[COLUNAS_CATALOGO].dropna(subset=['ticker']).fillna('')
+    tabela['ticker'] = tabela['ticker'].map(_normalizar).str.removesuffix('.SA')
+    tabela = tabela.drop_duplicates('ticker').sort_values('ticker')
+    tabela.to_csv(destino or CAMINHO_CATALOGO_LOCAL, index=False, encoding='utf-8')
+    _carregar.cache_clear()
+    return len(tabela)
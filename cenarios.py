@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from funcoes_financeiras import (
+    calcular_juros_compostos, calcular_vpl, calcular_tir, calcular_amortizacao_sac,
+    calcular_amortizacao_price, calcular_amortizacao_sac_american, calcular_correlacao_ativos
+)
+
+# Arquivo SQLite dos cenários salvos (persistente, ao contrário do cache de
+# mercado). Criado só para o dono do app (0600): os resultados são lidos com pickle.
+CAMINHO_CENARIOS = os.environ.get(
+    'CALCULADORA_CENARIOS_DB',
+    os.path.join(os.path.expanduser('~'), '.calculadora_cenarios.sqlite')
+)
+
+# Cada cenário pertence a um dono e só é visto por ele. Sem login, todos os
+# acessos da instalação usam o dono fixo DONO_PADRAO; com
+# CALCULADORA_MULTIUSUARIO=1 cada sessão sem login tem seu próprio dono.
+DONO_PADRAO = os.environ.get('CALCULADORA_CENARIOS_DONO', 'local')
+MULTIUSUARIO = os.environ.get('CALCULADORA_MULTIUSUARIO', '0') == '1'
+
+# Abaixo deste número de cenários a reavaliação é feita no próprio processo
+LIMITE_PARALELO = 32
+
+_local = threading.local()
+_executores = {}
+_trava_executor = threading.Lock()
+
+def _calcular_amortizacao(valor_principal, taxa_mensal, num_parcelas, sistema='SAC'):
+    funcoes = {
+        'SAC': calcular_amortizacao_sac,
+        'Price': calcular_amortizacao_price,
+        'SAC Americano': calcular_amortizacao_sac_american
+    }
+    return funcoes[sistema](valor_principal, taxa_mensal, int(num_parcelas))
+
+def _calcular_correlacao(ativos):
+    nomes = list(ativos)
+    correlacao = calcular_correlacao_ativos(np.column_stack([np.asarray(ativos[n], dtype=float) for n in nomes]))
+    return pd.DataFrame(correlacao, index=nomes, columns=nomes)
+
+# Tipo de cenário -> cálculo a partir das entradas (dicionário de argumentos nomeados)
+CALCULOS = {
+    'juros_compostos': calcular_juros_compostos,
+    'vpl': calcular_vpl,
+    'tir': calcular_tir,
+    'amortizacao': _calcular_amortizacao,
+    'correlacao': _calcular_correlacao
+}
+
+# Campo de taxa de cada tipo, usado na reavaliação após mudança de juros
+CAMPOS_TAXA = {'vpl': 'taxa', 'juros_compostos': 'taxa', 'amortizacao': 'taxa_mensal'}
+
+def _conexao():
+    """
+    Retorna a conexão SQLite da thread atual, criando a tabela se necessário
+    """
+    conexoes = getattr(_local, 'conexoes', None)
+    if conexoes is None:
+        conexoes = _local.conexoes = {}
+
+    con = conexoes.get(CAMINHO_CENARIOS)
+    if con is None:
+        diretorio = os.path.dirname(os.path.abspath(CAMINHO_CENARIOS))
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        os.close(os.open(CAMINHO_CENARIOS, os.O_CREAT | os.O_RDWR, 0o600))
+        os.chmod(CAMINHO_CENARIOS, 0o600)
+        con = sqlite3.connect(CAMINHO_CENARIOS, timeout=30, isolation_level=None)
+        con.execute('PRAGMA journal_mode=WAL')
+        colunas = [c[1] for c in con.execute('PRAGMA table_info(cenarios)')]
+        if colunas and 'dono' not in colunas:
+            # Arquivo anterior aos donos: os cenários ficam com o dono fixo da
+            # instalação, o mesmo usado pelo app sem login
+            con.execute('ALTER TABLE cenarios RENAME TO cenarios_sem_dono')
+        con.execute(
+            'CREATE TABLE IF NOT EXISTS cenarios (dono TEXT, hash TEXT, nome TEXT, tipo TEXT, '
+            'entradas TEXT, resultado BLOB, origem TEXT, criado REAL, PRIMARY KEY (dono, hash))'
+        )
+        if colunas and 'dono' not in colunas:
+            con.execute('INSERT INTO cenarios SELECT ?, * FROM cenarios_sem_dono', (DONO_PADRAO,))
+            con.execute('DROP TABLE cenarios_sem_dono')
+        conexoes[CAMINHO_CENARIOS] = con
+    return con
+
+def _normalizar(valor):
+    """
+    Converte tipos do NumPy/pandas em tipos JSON equivalentes
+    """
+    if isinstance(valor, dict):
+        return {str(k): _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple, np.ndarray, pd.Series)):
+        return [_normalizar(v) for v in list(valor)]
+    if isinstance(valor, np.integer):
+        return int(valor)
+    if isinstance(valor, (float, np.floating)):
+        # Inteiros representados como float têm o mesmo hash que o inteiro
+        return int(valor) if float(valor).is_integer() else float(valor)
+    return valor
+
+def hash_entradas(tipo, entradas):
+    """
+    Hash canônico de um cenário: JSON com chaves ordenadas e números normalizados
+    """
+    texto = json.dumps({'tipo': tipo, 'entradas': _normalizar(entradas)}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+def _calcular(tipo, entradas):
+    if tipo not in CALCULOS:
+        raise ValueError(f"Tipo de cenário desconhecido: {tipo}")
+    return CALCULOS[tipo](**entradas)
+
+def _linha_para_cenario(linha):
+    _, hash_, nome, tipo, entradas, resultado, origem, criado = linha
+    return {
+        'hash': hash_,
+        'nome': nome,
+        'tipo': tipo,
+        'entradas': json.loads(entradas),
+        'resultado': pickle.loads(resultado),
+        'origem': origem,
+        'criado': criado
+    }
+
+def abrir_cenario(hash_, dono=DONO_PADRAO):
+    """
+    Lê um cenário salvo do dono (None se não existir)
+    """
+    linha = _conexao().execute('SELECT * FROM cenarios WHERE dono = ? AND hash = ?', (dono, hash_)).fetchone()
+    return _linha_para_cenario(linha) if linha else None
+
+def avaliar_cenario(tipo, entradas, dono=DONO_PADRAO):
+    """
+    Resultado de um cenário: lido do armazenamento se o dono já salvou as
+    mesmas entradas, senão calculado (sem salvar)
+    """
+    salvo = abrir_cenario(hash_entradas(tipo, entradas), dono)
+    return salvo['resultado'] if salvo else _calcular(tipo, entradas)
+
+def salvar_cenario(nome, tipo, entradas, resultado=None, origem=None, dono=DONO_PADRAO):
+    """
+    Salva as entradas e o resultado de um cenário do dono. Se as mesmas
+    entradas já estiverem salvas, só o nome é atualizado e o resultado não é
+    recalculado. Retorna o cenário salvo.
+    """
+    entradas = _normalizar(entradas)
+    hash_ = hash_entradas(tipo, entradas)
+    con = _conexao()
+
+    if con.execute('SELECT 1 FROM cenarios WHERE dono = ? AND hash = ?', (dono, hash_)).fetchone():
+        con.execute('UPDATE cenarios SET nome = ? WHERE dono = ? AND hash = ?', (nome, dono, hash_))
+    else:
+        if resultado is None:
+            resultado = _calcular(tipo, entradas)
+        con.execute(
+            'INSERT INTO cenarios VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (dono, hash_, nome, tipo, json.dumps(entradas, sort_keys=True),
+             pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL), origem, time.time())
+        )
+    return abrir_cenario(hash_, dono)
+
+def remover_cenario(hash_, dono=DONO_PADRAO):
+    """
+    Remove um cenário salvo (só os do próprio dono)
+    """
+    _conexao().execute('DELETE FROM cenarios WHERE dono = ? AND hash = ?', (dono, hash_))
+
+def resumir_resultado(tipo, resultado):
+    """
+    Número que resume o resultado de um cenário (para listas e comparações)
+    """
+    if tipo == 'amortizacao':
+        return float(resultado['Juros'].sum())
+    if tipo == 'correlacao':
+        valores = resultado.to_numpy()
+        return float(valores[~np.eye(len(valores), dtype=bool)].mean()) if len(valores) > 1 else 1.0
+    return float(resultado)
+
+def listar_cenarios(tipo=None, dono=DONO_PADRAO):
+    """
+    DataFrame dos cenários salvos do dono, do mais recente para o mais antigo
+    """
+    consulta = 'SELECT * FROM cenarios WHERE dono = ?' + (' AND tipo = ?' if tipo else '') + ' ORDER BY criado DESC'
+    cenarios = [_linha_para_cenario(l) for l in _conexao().execute(consulta, (dono, tipo) if tipo else (dono,))]
+    return pd.DataFrame([
+        {
+            'Hash': c['hash'],
+            'Nome': c['nome'],
+            'Tipo': c['tipo'],
+            'Resumo': resumir_resultado(c['tipo'], c['resultado']),
+            'Origem': c['origem'],
+            'Criado': pd.Timestamp(c['criado'], unit='s')
+        }
+        for c in cenarios
+    ], columns=['Hash', 'Nome', 'Tipo', 'Resumo', 'Origem', 'Criado'])
+
+def comparar_cenarios(hash_a, hash_b, dono=DONO_PADRAO):
+    """
+    Diferenças entre dois cenários do dono: entradas que mudaram e o resumo dos resultados
+    """
+    a, b = abrir_cenario(hash_a, dono), abrir_cenario(hash_b, dono)
+    if a is None or b is None:
+        raise ValueError("Cenário não encontrado")
+
+    linhas = [
+        {'Campo': campo, 'A': a['entradas'].get(campo), 'B': b['entradas'].get(campo)}
+        for campo in sorted(set(a['entradas']) | set(b['entradas']))
+        if a['entradas'].get(campo) != b['entradas'].get(campo)
+    ]
+    linhas.append({
+        'Campo': 'Resultado (resumo)',
+        'A': resumir_resultado(a['tipo'], a['resultado']),
+        'B': resumir_resultado(b['tipo'], b['resultado'])
+    })
+    return pd.DataFrame(linhas)
+
+def _executor(max_processos=None):
+    """
+    Pool de processos do módulo com max_processos processos (padrão: um por
+    CPU), criado na primeira reavaliação grande e reaproveitado pelas
+    seguintes (não é refeito a cada rerun da interface)
+    """
+    with _trava_executor:
+        executor = _executores.get(max_processos)
+        if executor is None:
+            executor = _executores[max_processos] = ProcessPoolExecutor(max_workers=max_processos)
+        return executor
+
+def reavaliar_cenarios(alteracoes, tipos=None, max_processos=None, dono=DONO_PADRAO):
+    """
+    Recalcula todos os cenários salvos do dono que tenham alguma das entradas
+    alteradas (por exemplo {'taxa': nova_taxa} após uma mudança da Selic).
+    A partir de LIMITE_PARALELO cenários o cálculo é dividido entre
+    max_processos processos (padrão: um por CPU; 1 força o cálculo serial).
+    Cada reavaliação é salva como um novo cenário com origem no cenário original.
+
+    Retorna um DataFrame com o resumo anterior e o novo de cada cenário.
+    """
+    originais = [
+        _linha_para_cenario(l) for l in _conexao().execute('SELECT * FROM cenarios WHERE dono = ?', (dono,))
+        if tipos is None or l[3] in tipos
+    ]
+    pendentes = []
+    for cenario in originais:
+        campos = set(alteracoes) & set(cenario['entradas'])
+        if campos:
+            entradas = dict(cenario['entradas'], **{c: alteracoes[c] for c in campos})
+            if hash_entradas(cenario['tipo'], entradas) != cenario['hash']:
+                pendentes.append((cenario, entradas))
+
+    if not pendentes:
+        return pd.DataFrame(columns=['Nome', 'Tipo', 'Hash_Original', 'Hash_Novo', 'Resumo_Anterior', 'Resumo_Novo'])
+
+    argumentos = ([c['tipo'] for c, _ in pendentes], [e for _, e in pendentes])
+    if max_processos == 1 or len(pendentes) < LIMITE_PARALELO:
+        resultados = list(map(_calcular, *argumentos))
+    else:
+        processos = max_processos or os.cpu_count() or 1
+        tamanho_lote = max(len(pendentes) // (4 * processos), 1)
+        resultados = list(_executor(max_processos).map(_calcular, *argumentos, chunksize=tamanho_lote))
+
+    linhas = []
+    for (cenario, entradas), resultado in zip(pendentes, resultados):
+        novo = salvar_cenario(cenario['nome'], cenario['tipo'], entradas, resultado, origem=cenario['hash'], dono=dono)
+        linhas.append({
+            'Nome': cenario['nome'],
+            'Tipo': cenario['tipo'],
+            'Hash_Original': cenario['hash'],
+            'Hash_Novo': novo['hash'],
+            'Resumo_Anterior': resumir_resultado(cenario['tipo'], cenario['resultado']),
+            'Resumo_Novo': resumir_resultado(novo['tipo'], novo['resultado'])
+        })
+    return pd.DataFrame(linhas)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from calendario import proximo_dia_util
+from funcoes_financeiras import calcular_cronogramas_lote, calcular_tir_lote
+
+# IOF sobre operações de crédito de pessoa física
+ALIQUOTA_IOF_DIARIA = 0.000082
+ALIQUOTA_IOF_ADICIONAL = 0.0038
+DIAS_MAX_IOF = 365
+
+COLUNAS_OFERTA = ['Banco', 'Valor', 'Taxa_Mensal', 'Parcelas', 'Sistema', 'Tarifas', 'Seguro_Mensal']
+
+def calcular_dias_vencimentos(num_parcelas, data_contratacao=None):
+    """
+    Dias corridos entre a contratação e o vencimento de cada parcela mensal
+    (vencimentos em dia não útil passam para o próximo dia útil)
+    """
+    if data_contratacao is None:
+        data_contratacao = pd.Timestamp.today().normalize()
+    data_contratacao = pd.Timestamp(data_contratacao)
+    vencimentos = proximo_dia_util([data_contratacao + pd.DateOffset(months=k) for k in range(1, num_parcelas + 1)])
+    return np.asarray((vencimentos - data_contratacao).days)
+
+def calcular_iof(amortizacoes, dias, valor_financiado):
+    """
+    Calcula o IOF de financiamentos: alíquota diária sobre cada amortização pelo
+    prazo até o seu vencimento (limitado a 365 dias) mais a alíquota adicional
+    sobre o valor financiado. amortizacoes pode ser (N,) ou (M, N).
+    """
+    dias_iof = np.minimum(dias, DIAS_MAX_IOF)
+    iof_diario = (np.asarray(amortizacoes) * dias_iof * ALIQUOTA_IOF_DIARIA).sum(axis=-1)
+    return iof_diario + np.asarray(valor_financiado) * ALIQUOTA_IOF_ADICIONAL
+
+def calcular_cet_ofertas(ofertas, data_contratacao=None, financiar_iof=True):
+    """
+    Calcula o Custo Efetivo Total de várias ofertas de crédito de uma vez e as
+    ordena do menor para o maior CET.
+
+    ofertas: DataFrame (ou lista de dicionários) com as colunas Banco, Valor
+    (liberado ao cliente), Taxa_Mensal, Parcelas, Sistema ('SAC' ou 'Price'),
+    Tarifas (financiadas) e Seguro_Mensal (R$ por parcela).
+
+    O IOF é calculado sobre o cronograma real de cada oferta com contagem de
+    dias corridos e, se financiado, somado ao valor financiado. O CET é a TIR
+    mensal do fluxo liberado x pago, resolvida para todas as ofertas juntas.
+    """
+    ofertas = pd.DataFrame(ofertas).reset_index(drop=True)
+    for coluna, padrao in [('Tarifas', 0.0), ('Seguro_Mensal', 0.0), ('Sistema', 'Price')]:
+        ofertas[coluna] = ofertas[coluna].fillna(padrao) if coluna in ofertas else padrao
+
+    valores = ofertas['Valor'].to_numpy(dtype=float)
+    taxas = ofertas['Taxa_Mensal'].to_numpy(dtype=float)
+    prazos = ofertas['Parcelas'].to_numpy(dtype=int)
+    sistemas = ofertas['Sistema'].to_numpy()
+    dias = calcular_dias_vencimentos(int(prazos.max()), data_contratacao)
+
+    # O cronograma é linear no principal: basta calcular com principal 1
+    unitario = calcular_cronogramas_lote(1.0, taxas, prazos, sistemas)
+    aliquota_iof = calcular_iof(unitario['Amortizacao'], dias, 1.0)
+
+    base = valores + ofertas['Tarifas'].to_numpy(dtype=float)
+    if financiar_iof:
+        financiado = base / (1 - aliquota_iof)
+        liberado = valores
+    else:
+        financiado = base
+        liberado = valores - aliquota_iof * base
+    iof = aliquota_iof * financiado
+
+    periodos = np.arange(1, len(dias) + 1)[None, :]
+    ativo = periodos <= prazos[:, None]
+    prestacoes = unitario['Prestacao'] * financiado[:, None]
+    pagamentos = prestacoes + np.where(ativo, ofertas['Seguro_Mensal'].to_numpy(dtype=float)[:, None], 0.0)
+
+    fluxos = np.concatenate([liberado[:, None], -pagamentos], axis=1)
+    cet_mensal = calcular_tir_lote(fluxos, chute=0.02)
+
+    resultado = ofertas.assign(
+        IOF=iof,
+        Valor_Financiado=financiado,
+        Primeira_Prestacao=pagamentos[:, 0],
+        Total_Pago=pagamentos.sum(axis=1),
+        CET_Mensal=cet_mensal,
+        CET_Anual=(1 + cet_mensal) ** 12 - 1
+    )
+    resultado = resultado.sort_values('CET_Anual').reset_index(drop=True)
+    resultado.insert(0, 'Ranking', np.arange(1, len(resultado) + 1))
+    return resultado
@@ -0,0 +1,145 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from calendario import contar_dias_uteis, proximo_dia_util
+
+INTERPOLACOES = ['flat_forward', 'cubica']
+
+def _spline_natural(x, y, pontos):
+    """
+    Spline cúbica natural (segunda derivada nula nas pontas) avaliada nos pontos,
+    que devem estar dentro de [x[0], x[-1]]
+    """
+    n = len(x)
+    if n < 3:
+        return np.interp(pontos, x, y)
+
+    h = np.diff(x)
+    inclinacoes = np.diff(y) / h
+    sistema = np.zeros((n - 2, n - 2))
+    np.fill_diagonal(sistema, 2 * (h[:-1] + h[1:]))
+    np.fill_diagonal(sistema[1:], h[1:-1])
+    np.fill_diagonal(sistema[:, 1:], h[1:-1])
+    segundas = np.concatenate([[0.0], np.linalg.solve(sistema, 6 * np.diff(inclinacoes)), [0.0]])
+
+    i = np.clip(np.searchsorted(x, pontos, side='right') - 1, 0, n - 2)
+    a = (x[i + 1] - pontos) / h[i]
+    b = (pontos - x[i]) / h[i]
+    return (a * y[i] + b * y[i + 1]
+            + ((a ** 3 - a) * segundas[i] + (b ** 3 - b) * segundas[i + 1]) * h[i] ** 2 / 6)
+
+@lru_cache(maxsize=32)
+def _grade(vertices, taxas, interpolacao):
+    """
+    Log dos fatores de desconto em todos os dias úteis de 0 ao último vértice,
+    calculados uma vez por curva e reaproveitados em todas as consultas
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    taxas = np.asarray(taxas, dtype=float)
+    dias = np.arange(int(vertices[-1]) + 1, dtype=float)
+
+    if interpolacao == 'flat_forward':
+        # Forward constante entre vértices = log do fator linear no prazo
+        log_vertices = -vertices / 252 * np.log1p(taxas)
+        log_fatores = np.interp(dias, np.concatenate([[0.0], vertices]), np.concatenate([[0.0], log_vertices]))
+    elif interpolacao == 'cubica':
+        # Spline nas taxas; antes do primeiro vértice a taxa é constante
+        taxas_grade = _spline_natural(vertices, taxas, np.clip(dias, vertices[0], vertices[-1]))
+        log_fatores = -dias / 252 * np.log1p(taxas_grade)
+    else:
+        raise ValueError(f"Interpolação desconhecida: {interpolacao}")
+
+    log_fatores.setflags(write=False)
+    return log_fatores
+
+def construir_curva(vertices, taxas, data_base=None, interpolacao='flat_forward'):
+    """
+    Constrói uma curva zero (ex.: a curva de DI futuro) a partir de vértices.
+
+    vertices: prazos em dias úteis ou datas de vencimento (contadas a partir da data base)
+    taxas: taxas zero anuais na convenção exponencial DU/252
+    interpolacao: 'flat_forward' (forward constante entre vértices) ou 'cubica'
+        (spline cúbica natural nas taxas)
+
+    Após o último vértice a curva segue com o último forward.
+    """
+    data_base = pd.Timestamp.today().normalize() if data_base is None else pd.Timestamp(data_base)
+    vertices = np.asarray(vertices)
+    if not np.issubdtype(vertices.dtype, np.number):
+        vertices = contar_dias_uteis(np.repeat(data_base, len(vertices)), vertices)
+    vertices = np.asarray(vertices, dtype=int)
+    taxas = np.asarray(taxas, dtype=float)
+
+    ordem = np.argsort(vertices)
+    vertices, taxas = vertices[ordem], taxas[ordem]
+    if vertices[0] <= 0 or np.any(np.diff(vertices) == 0):
+        raise ValueError("Os vértices devem ter prazos positivos e distintos")
+
+    log_fatores = _grade(tuple(vertices.tolist()), tuple(taxas.tolist()), interpolacao)
+    return {
+        'data_base': data_base,
+        'vertices': vertices,
+        'taxas': taxas,
+        'interpolacao': interpolacao,
+        'log_fatores': log_fatores,
+        'inclinacao_final': log_fatores[-1] - log_fatores[-2]
+    }
+
+def eh_curva(objeto):
+    return isinstance(objeto, dict) and 'log_fatores' in objeto
+
+def dias_uteis_curva(curva, prazos):
+    """
+    Converte prazos (dias úteis ou datas) em dias úteis a partir da data base da curva
+    """
+    prazos = np.asarray(prazos)
+    if np.issubdtype(prazos.dtype, np.number):
+        return prazos.astype(float)
+    datas = np.atleast_1d(prazos)
+    dias = np.asarray(contar_dias_uteis(np.repeat(curva['data_base'], len(datas)), datas), dtype=float)
+    return dias.reshape(prazos.shape)
+
+def fatores_desconto(curva, prazos):
+    """
+    Fatores de desconto para um array de prazos (dias úteis, inclusive
+    fracionários, ou datas). Cada consulta é uma leitura na grade pré-calculada.
+    """
+    dias = dias_uteis_curva(curva, prazos)
+    grade = curva['log_fatores']
+    ultimo = len(grade) - 1
+
+    base = np.clip(np.floor(dias), 0, ultimo).astype(int)
+    proximo = np.minimum(base + 1, ultimo)
+    fracao = np.clip(dias, 0, ultimo) - base
+    log_fatores = grade[base] + fracao * (grade[proximo] - grade[base])
+    log_fatores = log_fatores + np.maximum(dias - ultimo, 0) * curva['inclinacao_final']
+    return np.exp(log_fatores)
+
+def taxas_zero(curva, prazos):
+    """
+    Taxas zero anuais (DU/252) nos prazos
+    """
+    dias = dias_uteis_curva(curva, prazos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        taxas = fatores_desconto(curva, dias) ** (-252 / dias) - 1
+    return np.where(dias > 0, taxas, curva['taxas'][0])
+
+def taxas_forward(curva, inicio, fim):
+    """
+    Taxas forward anuais (DU/252) entre os prazos inicio e fim
+    """
+    dias_inicio = dias_uteis_curva(curva, inicio)
+    dias_fim = dias_uteis_curva(curva, fim)
+    razao = fatores_desconto(curva, dias_inicio) / fatores_desconto(curva, dias_fim)
+    return razao ** (252 / (dias_fim - dias_inicio)) - 1
+
+def taxas_forward_mensais(curva, num_parcelas):
+    """
+    Taxa efetiva de cada mês de um financiamento pós-fixado contratado na data
+    base da curva (vencimentos mensais, rolados para o próximo dia útil)
+    """
+    vencimentos = proximo_dia_util([curva['data_base'] + pd.DateOffset(months=k) for k in range(1, num_parcelas + 1)])
+    fatores = np.concatenate([[1.0], fatores_desconto(curva, vencimentos)])
+    return fatores[:-1] / fatores[1:] - 1
@@ -0,0 +1,139 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from calendario import eh_dia_util
+
+# Toda série sintética começa na mesma data: um período é só um recorte do
+# histórico completo, e o mesmo ticker tem os mesmos preços em qualquer período
+DATA_ORIGEM = pd.Timestamp('2000-01-03')
+DATA_FINAL = pd.Timestamp('2024-12-30')
+
+# Períodos aceitos pelo yfinance
+PERIODOS = {
+    '1d': pd.DateOffset(days=1), '5d': pd.DateOffset(days=7), '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3), '6mo': pd.DateOffset(months=6), '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5), '10y': pd.DateOffset(years=10),
+    'max': None
+}
+
+# Regimes de mercado (retorno médio e volatilidade diários, duração média em pregões)
+REGIMES_PADRAO = [
+    {'nome': 'alta', 'drift': 0.0006, 'volatilidade': 0.012, 'duracao': 120},
+    {'nome': 'lateral', 'drift': 0.0, 'volatilidade': 0.015, 'duracao': 60},
+    {'nome': 'crise', 'drift': -0.0015, 'volatilidade': 0.030, 'duracao': 30}
+]
+
+COLUNAS_OHLCV = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'Dividends', 'Stock Splits']
+
+INDICE_MERCADO = '^BVSP'
+
+def _semente(*partes):
+    """
+    Semente estável entre processos (hash() do Python muda a cada execução)
+    """
+    return zlib.crc32(':'.join(str(p) for p in partes).encode())
+
+def _pregoes(fim):
+    datas = pd.date_range(DATA_ORIGEM, fim, freq='D')
+    return datas[eh_dia_util(datas)]
+
+def _sequencia_regimes(rng, tamanho, regimes):
+    """
+    Regime de cada pregão: cadeia de Markov com durações geométricas, sorteada
+    trecho a trecho
+    """
+    estados = np.empty(tamanho, dtype=int)
+    posicao = 0
+    estado = 0
+    while posicao < tamanho:
+        duracao = rng.geometric(1 / regimes[estado]['duracao'])
+        estados[posicao:posicao + duracao] = estado
+        posicao += duracao
+        estado = rng.choice([e for e in range(len(regimes)) if e != estado]) if len(regimes) > 1 else 0
+    return estados
+
+def gerar_mercado_sintetico(tickers, periodo='1y', semente=0, correlacao=0.4, regimes=None, fim=DATA_FINAL):
+    """
+    Gera históricos OHLCV determinísticos no formato do yfinance
+    (history(auto_adjust=False)) para vários tickers de uma vez.
+
+    Os retornos seguem um modelo de um fator: um choque de mercado comum
+    (correlação entre ativos igual a 'correlacao') mais um choque próprio de
+    cada ticker, com retorno médio e volatilidade dados pelo regime vigente.
+    O regime e o fator dependem só da semente; os parâmetros e choques de cada
+    ticker, da semente e do nome, então o mesmo ticker gerado sozinho ou junto
+    com outros tem os mesmos preços. INDICE_MERCADO recebe só o fator.
+
+    Retorna {ticker: DataFrame} com índice diário (pregões da B3, fuso de São Paulo)
+    """
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período desconhecido: {periodo}")
+    regimes = regimes or REGIMES_PADRAO
+    datas = _pregoes(pd.Timestamp(fim))
+    t = len(datas)
+
+    # Fator de mercado e regimes, comuns a todos os tickers
+    rng = np.random.default_rng(_semente(semente, 'mercado'))
+    estados = _sequencia_regimes(rng, t, regimes)
+    drift = np.array([r['drift'] for r in regimes])[estados]
+    volatilidade = np.array([r['volatilidade'] for r in regimes])[estados]
+    fator = rng.standard_normal(t)
+
+    inicio = datas[0] if PERIODOS[periodo] is None else pd.Timestamp(fim) - PERIODOS[periodo]
+    recorte = datas > inicio
+    indice = datas[recorte].tz_localize('America/Sao_Paulo')
+
+    historicos = {}
+    for ticker in tickers:
+        rng = np.random.default_rng(_semente(semente, ticker))
+        if ticker == INDICE_MERCADO:
+            escala, rendimento, preco_inicial, volume_base = 1.0, 0.0, 10_000.0, 5e6
+            choques = fator
+        else:
+            escala = rng.uniform(0.7, 1.5)
+            rendimento = rng.choice([0.0, rng.uniform(0.02, 0.10)], p=[0.3, 0.7])
+            preco_inicial = rng.uniform(5, 80)
+            volume_base = rng.uniform(1e6, 3e7)
+            choques = np.sqrt(correlacao) * fator + np.sqrt(1 - correlacao) * rng.standard_normal(t)
+
+        retornos = drift + escala * volatilidade * choques
+        retornos[0] = 0.0
+        retorno_total = preco_inicial * np.exp(np.cumsum(retornos))
+
+        # Proventos trimestrais: o fechamento cai pelo valor pago na data ex
+        fracoes = np.zeros(t)
+        if rendimento > 0:
+            fracoes[rng.integers(1, 63)::63] = rendimento / 4
+        acumulado = np.cumprod(1 - fracoes)
+        fechamento = retorno_total * acumulado
+        proventos = np.concatenate([[0.0], fechamento[:-1] * np.exp(retornos[1:])]) * fracoes
+        ajustado = retorno_total * acumulado[-1]
+
+        # Abertura com gap sobre o fechamento anterior; máxima e mínima envolvem os dois
+        ruido = escala * volatilidade
+        anterior = np.concatenate([[fechamento[0]], fechamento[:-1] * (1 - fracoes[1:])])
+        abertura = anterior * np.exp(0.25 * ruido * rng.standard_normal(t))
+        maxima = np.maximum(abertura, fechamento) * np.exp(0.5 * ruido * np.abs(rng.standard_normal(t)))
+        minima = np.minimum(abertura, fechamento) * np.exp(-0.5 * ruido * np.abs(rng.standard_normal(t)))
+        volume = volume_base * np.exp(0.3 * rng.standard_normal(t)) * (1 + 20 * np.abs(retornos))
+
+        historicos[ticker] = pd.DataFrame({
+            'Open': abertura[recorte],
+            'High': maxima[recorte],
+            'Low': minima[recorte],
+            'Close': fechamento[recorte],
+            'Adj Close': ajustado[recorte],
+            'Volume': volume[recorte].astype(np.int64),
+            'Dividends': proventos[recorte],
+            'Stock Splits': 0.0
+        }, index=pd.DatetimeIndex(indice, name='Date'), columns=COLUNAS_OHLCV)
+
+    return historicos
+
+def gerar_historico_sintetico(ticker, periodo='1y', semente=0):
+    """
+    Provedor sintético da camada de busca: mesmo contrato de _baixar_historico
+    """
+    return gerar_mercado_sintetico([ticker], periodo, semente)[ticker]
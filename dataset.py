@@ -0,0 +1,179 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache_mercado import obter_ou_buscar
+from calendario import eh_dia_util
+from funcoes_financeiras import (
+    buscar_dados_acao, calcular_estatisticas_retornos, chave_provedor, inferir_periodos_por_ano, obter_serie_precos
+)
+
+# Séries derivadas guardadas no dataset, todas no formato (T, N)
+CAMPOS_DATASET = ['precos', 'mascara', 'retornos', 'log_retornos', 'indice_acumulado', 'picos']
+
+def _tabela_fechamentos(precos):
+    """
+    Aceita um DataFrame de fechamentos (uma coluna por ticker) ou um dicionário
+    {ticker: DataFrame do yfinance}, do qual usa o índice de retorno total
+    """
+    if isinstance(precos, dict):
+        precos = pd.DataFrame({ticker: obter_serie_precos(dados) for ticker, dados in precos.items()})
+    precos = pd.DataFrame(precos).sort_index()
+    if isinstance(precos.index, pd.DatetimeIndex) and precos.index.tz is not None:
+        precos.index = precos.index.tz_localize(None)
+    precos.index = precos.index.normalize() if isinstance(precos.index, pd.DatetimeIndex) else precos.index
+    return precos[~precos.index.duplicated(keep='last')]
+
+def construir_dataset(precos, preenchimento='ffill', calendario='b3'):
+    """
+    Alinha os tickers num calendário comum e pré-calcula, uma única vez, as
+    séries derivadas usadas pelas métricas.
+
+    precos: DataFrame de fechamentos ou dicionário {ticker: DataFrame}
+    preenchimento: 'ffill' repete o último preço nas lacunas; 'mascara' as
+        mantém como NaN (a mascara indica os preços observados)
+    calendario: 'b3' usa os dias úteis da B3; 'uniao' usa todas as datas presentes
+
+    Retorna um dicionário com datas, tickers e as matrizes de CAMPOS_DATASET.
+    """
+    fechamentos = _tabela_fechamentos(precos)
+
+    if calendario == 'b3' and isinstance(fechamentos.index, pd.DatetimeIndex):
+        datas = pd.date_range(fechamentos.index.min(), fechamentos.index.max(), freq='D')
+        datas = datas[eh_dia_util(datas)]
+        fechamentos = fechamentos.reindex(datas)
+
+    mascara = fechamentos.notna().to_numpy()
+    if preenchimento == 'ffill':
+        fechamentos = fechamentos.ffill()
+
+    valores = fechamentos.to_numpy(dtype=float)
+    anteriores = np.vstack([np.full((1, valores.shape[1]), np.nan), valores[:-1]])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        retornos = valores / anteriores - 1
+        log_retornos = np.log(valores / anteriores)
+
+    # Índice acumulado (base 1 no primeiro preço válido) e máximos acumulados
+    primeiros = pd.DataFrame(valores).bfill().to_numpy()[0]
+    indice_acumulado = valores / primeiros
+    picos = np.fmax.accumulate(valores, axis=0)
+
+    return {
+        'datas': fechamentos.index,
+        'tickers': list(fechamentos.columns),
+        'precos': valores,
+        'mascara': mascara,
+        'retornos': retornos,
+        'log_retornos': log_retornos,
+        'indice_acumulado': indice_acumulado,
+        'picos': picos
+    }
+
+def construir_dataset_tickers(tickers, periodo='1y', preenchimento='ffill'):
+    """
+    Busca os tickers (pelo cache compartilhado) e constrói o dataset uma vez
+    para todas as sessões. Retorna (dataset, erros por ticker), com os
+    tickers em ordem alfabética (ver selecionar_tickers).
+
+    Só datasets completos vão para o cache: se algum ticker falhar, o dataset
+    parcial é devolvido com os erros e a próxima chamada busca de novo.
+    """
+    tickers = sorted(tickers)
+    erros = {}
+    parcial = {}
+
+    def montar():
+        dados = {}
+        for ticker in tickers:
+            historico, erro = buscar_dados_acao(ticker, periodo)
+            if erro:
+                erros[ticker] = erro
+            else:
+                dados[ticker] = historico
+        dataset = construir_dataset(dados, preenchimento) if dados else None
+        if erros:
+            parcial['dataset'] = dataset
+            return None
+        return dataset
+
+    dataset = obter_ou_buscar(chave_provedor(f"dataset:{','.join(tickers)}:{periodo}:{preenchimento}"), montar)
+    return (dataset if dataset is not None else parcial.get('dataset')), erros
+
+def salvar_dataset(dataset, caminho):
+    """
+    Grava o dataset em formato colunar: um arquivo .npy por campo, em ordem de
+    coluna (cada ticker contíguo em disco), mais um JSON com datas e tickers
+    """
+    os.makedirs(caminho, exist_ok=True)
+    for campo in CAMPOS_DATASET:
+        np.save(os.path.join(caminho, f'{campo}.npy'), np.asfortranarray(dataset[campo]))
+
+    with open(os.path.join(caminho, 'indice.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump({
+            'datas': [str(d) for d in dataset['datas']],
+            'tickers': dataset['tickers']
+        }, arquivo)
+
+def carregar_dataset(caminho, mapear_memoria=True):
+    """
+    Lê um dataset gravado por salvar_dataset. Com mapear_memoria, as matrizes
+    são mapeadas do disco e só as colunas usadas são lidas.
+    """
+    with open(os.path.join(caminho, 'indice.json'), encoding='utf-8') as arquivo:
+        indice = json.load(arquivo)
+
+    dataset = {
+        'datas': pd.DatetimeIndex(indice['datas']),
+        'tickers': indice['tickers']
+    }
+    for campo in CAMPOS_DATASET:
+        dataset[campo] = np.load(os.path.join(caminho, f'{campo}.npy'), mmap_mode='r' if mapear_memoria else None)
+    return dataset
+
+def selecionar_tickers(dataset, tickers):
+    """
+    Recorta o dataset para um subconjunto de tickers
+    """
+    colunas = [dataset['tickers'].index(t) for t in tickers]
+    recorte = {'datas': dataset['datas'], 'tickers': list(tickers)}
+    for campo in CAMPOS_DATASET:
+        recorte[campo] = np.asarray(dataset[campo][:, colunas])
+    return recorte
+
+def calcular_metricas_dataset(dataset, taxa_livre_risco=0.06):
+    """
+    Calcula as métricas de calcular_metricas_acao para todos os tickers a
+    partir das séries já derivadas do dataset, sem recalculá-las
+    """
+    estatisticas = calcular_estatisticas_retornos(
+        dataset['retornos'][1:], inferir_periodos_por_ano(dataset['datas']), taxa_livre_risco
+    )
+
+    precos = np.asarray(dataset['precos'])
+    with np.errstate(invalid='ignore'):
+        max_drawdown = np.nanmin((precos - dataset['picos']) / dataset['picos'], axis=0)
+
+    primeiros = pd.DataFrame(precos).bfill().to_numpy()[0]
+    ultimos = pd.DataFrame(precos).ffill().to_numpy()[-1]
+
+    return pd.DataFrame({
+        'preco_inicial': primeiros,
+        'preco_atual': ultimos,
+        'retorno_periodo': ultimos / primeiros - 1,
+        'volatilidade': estatisticas['volatilidade'],
+        'retorno_medio': estatisticas['retorno_medio'],
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': estatisticas['sharpe_ratio']
+    }, index=dataset['tickers'])
+
+def calcular_correlacao_dataset(dataset):
+    """
+    Matriz de correlação dos log-retornos já calculados, usando as datas em que
+    todos os tickers têm retorno
+    """
+    log_retornos = np.asarray(dataset['log_retornos'])
+    validas = np.isfinite(log_retornos).all(axis=1)
+    return np.corrcoef(log_retornos[validas].T)
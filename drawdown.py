@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+COLUNAS_EPISODIOS = [
+    'Ativo', 'Pico', 'Vale', 'Recuperacao', 'Profundidade', 'Duracao', 'Queda', 'Recuperacao_Pregoes'
+]
+
+def _como_tabela(precos):
+    """
+    Converte preços (T,) ou (T, N) em DataFrame, indicando se era uma única série
+    """
+    if isinstance(precos, pd.Series):
+        return precos.to_frame(precos.name if precos.name is not None else 'Ativo'), True
+    if isinstance(precos, pd.DataFrame):
+        return precos, False
+    precos = np.asarray(precos, dtype=float)
+    if precos.ndim == 1:
+        return pd.DataFrame({'Ativo': precos}), True
+    return pd.DataFrame(precos), False
+
+def calcular_submerso(precos):
+    """
+    Série "underwater": queda de cada data em relação ao pico anterior (0 no
+    pico, negativa abaixo dele). Aceita vetor (T,) ou matriz (T, N); valores
+    ausentes no início de uma coluna ficam NaN.
+    """
+    precos = np.asarray(precos, dtype=float)
+    picos = np.fmax.accumulate(precos, axis=0)
+    return precos / picos - 1
+
+def _episodios(submerso):
+    """
+    Localiza todos os episódios de drawdown de uma matriz (T, N) numa única
+    passada pelos dados, percorridos coluna a coluna.
+
+    Retorna arrays com a coluna, o início (primeira data abaixo do pico), o
+    vale, o fim (data de recuperação, T se não recuperou) e a profundidade.
+    """
+    t, n = submerso.shape
+    abaixo = np.nan_to_num(submerso, nan=0.0) < 0
+
+    # Bordas dos trechos abaixo do pico, com a matriz achatada por coluna
+    bordas = np.diff(np.pad(abaixo, ((1, 1), (0, 0))).astype(np.int8), axis=0).T
+    colunas, inicios = np.nonzero(bordas == 1)
+    _, fins = np.nonzero(bordas == -1)
+    if len(inicios) == 0:
+        vazio = np.array([], dtype=int)
+        return vazio, vazio, vazio, vazio, np.array([], dtype=float)
+
+    # Mínimo de cada episódio: reduceat sobre [início, fim) intercalado com os intervalos entre episódios
+    plano = np.append(np.nan_to_num(submerso.T.ravel(), nan=0.0), 0.0)
+    limites = np.column_stack([colunas * t + inicios, colunas * t + fins]).ravel()
+    profundidades = np.minimum.reduceat(plano, limites)[::2]
+
+    # Primeira data em que o episódio atinge o mínimo
+    marcas = np.zeros(len(plano), dtype=int)
+    np.add.at(marcas, limites[::2], 1)
+    episodio = np.cumsum(marcas) - 1
+    posicoes = np.arange(len(plano))
+    no_vale = (episodio >= 0) & (plano == profundidades[np.maximum(episodio, 0)])
+    vales = np.minimum.reduceat(np.where(no_vale, posicoes, len(plano)), limites)[::2] - colunas * t
+
+    return colunas, inicios, vales, fins, profundidades
+
+def analisar_drawdowns(precos, periodos_por_ano=252, taxa_livre_risco=0.06, profundidade_minima=0.0):
+    """
+    Analisa todos os episódios de drawdown de uma série de preços ou de uma
+    matriz (T, N) com um ativo por coluna, de uma vez.
+
+    Cada episódio vai do pico (última data no máximo anterior) até a
+    recuperação (primeira data de volta ao pico; NaT se não recuperou), com
+    a data e a profundidade do vale. As durações são contadas em períodos.
+    Episódios mais rasos que profundidade_minima (ex.: 0.05) ficam de fora
+    da tabela de episódios, mas não das métricas.
+
+    Retorna {'submerso': série underwater (mesmo formato da entrada),
+             'episodios': DataFrame com um episódio por linha,
+             'metricas': DataFrame por ativo com Max_Drawdown, Duracao_Maxima,
+                 Episodios, Tempo_Submerso, Calmar, Sortino e Ulcer}
+    """
+    tabela, serie = _como_tabela(precos)
+    valores = tabela.to_numpy(dtype=float)
+    t = len(valores)
+    submerso = calcular_submerso(valores)
+    ativos = np.asarray(tabela.columns)
+    datas = np.asarray(tabela.index)
+
+    colunas, inicios, vales, fins, profundidades = _episodios(submerso)
+    recuperado = fins < t
+    duracoes = np.where(recuperado, fins, t - 1) - (inicios - 1)
+    episodios = pd.DataFrame({
+        'Ativo': ativos[colunas],
+        'Pico': datas[inicios - 1],
+        'Vale': datas[vales],
+        'Recuperacao': pd.Series(datas[np.minimum(fins, t - 1)]).where(recuperado).to_numpy(),
+        'Profundidade': profundidades,
+        'Duracao': duracoes,
+        'Queda': vales - (inicios - 1),
+        'Recuperacao_Pregoes': np.where(recuperado, fins - vales, np.nan)
+    }, columns=COLUNAS_EPISODIOS)
+
+    # Métricas por ativo
+    validos = ~np.isnan(valores)
+    quantidade = validos.sum(axis=0)
+    primeiros = valores[validos.argmax(axis=0), np.arange(valores.shape[1])]
+    ultimos = pd.DataFrame(valores).ffill().to_numpy()[-1]
+    max_drawdown = np.nanmin(submerso, axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        anual = (ultimos / primeiros) ** (periodos_por_ano / (quantidade - 1)) - 1
+        calmar = np.where(max_drawdown < 0, anual / -max_drawdown, np.nan)
+
+        retornos = valores[1:] / valores[:-1] - 1
+        excesso = retornos - taxa_livre_risco / periodos_por_ano
+        negativos = np.sqrt(np.nanmean(np.minimum(excesso, 0) ** 2, axis=0))
+        sortino = np.nanmean(excesso, axis=0) * periodos_por_ano / (negativos * np.sqrt(periodos_por_ano))
+        sortino = np.where(negativos > 0, sortino, np.nan)
+
+    duracao_maxima = np.zeros(len(ativos), dtype=int)
+    np.maximum.at(duracao_maxima, colunas, duracoes)
+    metricas = pd.DataFrame({
+        'Max_Drawdown': max_drawdown,
+        'Duracao_Maxima': duracao_maxima,
+        'Episodios': np.bincount(colunas, minlength=len(ativos)),
+        'Tempo_Submerso': np.nansum(submerso < 0, axis=0) / quantidade,
+        'Calmar': calmar,
+        'Sortino': sortino,
+        'Ulcer': np.sqrt(np.nanmean(submerso ** 2, axis=0))
+    }, index=pd.Index(ativos, name='Ativo'))
+
+    if profundidade_minima > 0:
+        episodios = episodios[episodios['Profundidade'] <= -profundidade_minima].reset_index(drop=True)
+
+    submerso = pd.DataFrame(submerso, index=tabela.index, columns=tabela.columns)
+    return {
+        'submerso': submerso.iloc[:, 0] if serie else submerso,
+        'episodios': episodios,
+        'metricas': metricas
+    }
@@ -0,0 +1,237 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fatores import regredir_fatores
+from funcoes_financeiras import calcular_cronogramas_lote, calcular_tir_lote, calcular_vpl, obter_serie_precos
+from risco import calcular_var_cvar
+
+# Acima deste número de cenários eles são divididos entre processos
+LIMITE_PARALELO = 64
+
+# Choques: juros em pontos da taxa anual (0.03 = +300bp), ações como variação
+# do Ibovespa (-0.20 = -20%) e volatilidade como multiplicador
+CENARIOS_PADRAO = [
+    {'nome': 'Selic +300bp', 'juros': 0.03, 'acoes': 0.0, 'volatilidade': 1.0},
+    {'nome': 'Ibovespa -20%', 'juros': 0.0, 'acoes': -0.20, 'volatilidade': 1.5},
+    {'nome': 'Selic +300bp e Ibovespa -20%', 'juros': 0.03, 'acoes': -0.20, 'volatilidade': 1.5},
+    {'nome': 'Crise severa', 'juros': 0.05, 'acoes': -0.35, 'volatilidade': 2.5},
+    {'nome': 'Afrouxamento', 'juros': -0.02, 'acoes': 0.10, 'volatilidade': 0.8}
+]
+
+def gerar_cenarios_grade(juros, acoes, volatilidades=(1.0,)):
+    """
+    Todas as combinações de choques de juros, ações e volatilidade
+    """
+    grade_juros, grade_acoes, grade_vol = np.meshgrid(juros, acoes, volatilidades, indexing='ij')
+    return [
+        {'nome': f'Juros {j * 1e4:+.0f}bp | Ações {a:+.0%} | Vol x{v:g}', 'juros': j, 'acoes': a, 'volatilidade': v}
+        for j, a, v in zip(grade_juros.ravel(), grade_acoes.ravel(), grade_vol.ravel())
+    ]
+
+def _preparar_analises(financiamentos, projetos, carteira):
+    """
+    Converte as análises em arrays uma única vez, antes de distribuir os cenários
+    """
+    analises = {}
+
+    if financiamentos:
+        tabela = pd.DataFrame(financiamentos)
+        analises['financiamentos'] = {
+            'nomes': tabela['nome'].tolist(),
+            'principais': tabela['valor_principal'].to_numpy(dtype=float),
+            'taxas': tabela['taxa_mensal'].to_numpy(dtype=float),
+            'prazos': tabela['num_parcelas'].to_numpy(dtype=int),
+            'sistemas': tabela.get('sistema', pd.Series('Price', index=tabela.index)).to_numpy(),
+            # Só os pós-fixados repassam o choque de juros às prestações
+            'pos_fixados': tabela.get('pos_fixado', pd.Series(True, index=tabela.index)).to_numpy(dtype=bool)
+        }
+
+    if projetos:
+        tamanho = max(len(p['fluxos']) for p in projetos)
+        fluxos = np.zeros((len(projetos), tamanho))
+        for i, projeto in enumerate(projetos):
+            fluxos[i, :len(projeto['fluxos'])] = projeto['fluxos']
+        analises['projetos'] = {
+            'nomes': [p['nome'] for p in projetos],
+            'fluxos': [np.asarray(p['fluxos'], dtype=float) for p in projetos],
+            'taxas': np.array([p['taxa'] for p in projetos], dtype=float),
+            'periodos_por_ano': np.array([p.get('periodos_por_ano', 1) for p in projetos], dtype=float)
+        }
+        # Os choques mudam só a taxa de desconto: a TIR (anual equivalente) é a
+        # mesma em todos os cenários
+        analises['projetos']['tir_anual'] = (
+            (1 + calcular_tir_lote(fluxos)) ** analises['projetos']['periodos_por_ano'] - 1
+        )
+
+    if carteira is not None:
+        precos = carteira['precos']
+        if isinstance(precos, dict):
+            precos = pd.DataFrame({ticker: obter_serie_precos(dados) for ticker, dados in precos.items()})
+        retornos = pd.DataFrame(precos).sort_index().ffill().pct_change().dropna()
+        pesos = np.asarray(carteira['pesos'], dtype=float)
+        pesos = pesos / pesos.sum()
+
+        # Sensibilidade de cada ativo ao Ibovespa (1 se o mercado não for informado)
+        betas = np.ones(len(pesos))
+        if carteira.get('mercado') is not None:
+            mercado = obter_serie_precos(carteira['mercado']) if isinstance(carteira['mercado'], pd.DataFrame) \
+                else carteira['mercado']
+            regressao = regredir_fatores(retornos, mercado.pct_change().dropna().rename('Mercado'))
+            betas = regressao['Beta_Mercado'].to_numpy()
+
+        analises['carteira'] = {
+            'retornos': retornos.to_numpy() @ pesos,
+            'beta': float(pesos @ betas),
+            'valor': float(carteira.get('valor', 100_000.0))
+        }
+
+    return analises
+
+def _avaliar_bloco(analises, juros, acoes, volatilidades):
+    """
+    Avalia um bloco de S cenários de uma vez: cada análise é calculada para
+    todos os cenários × itens numa única operação vetorizada
+    """
+    s = len(juros)
+    resultado = {}
+
+    if 'financiamentos' in analises:
+        f = analises['financiamentos']
+        m = len(f['principais'])
+        # Choque na taxa anual equivalente, convertido de volta para mensal
+        taxas_anuais = (1 + f['taxas'][None, :]) ** 12 - 1 + juros[:, None] * f['pos_fixados'][None, :]
+        taxas = (1 + np.maximum(taxas_anuais, -0.99)) ** (1 / 12) - 1
+        cronogramas = calcular_cronogramas_lote(
+            np.tile(f['principais'], s), taxas.ravel(), np.tile(f['prazos'], s), np.tile(f['sistemas'], s)
+        )
+        resultado['juros_financiamentos'] = cronogramas['Juros'].sum(axis=1).reshape(s, m)
+        resultado['prestacao_inicial'] = cronogramas['Prestacao'][:, 0].reshape(s, m)
+
+    if 'projetos' in analises:
+        p = analises['projetos']
+        # Mesmo tratamento dos financiamentos: choque na taxa anual equivalente,
+        # convertido de volta para a periodicidade dos fluxos
+        k = p['periodos_por_ano'][None, :]
+        taxas_anuais = np.maximum((1 + p['taxas'][None, :]) ** k - 1 + juros[:, None], -0.99)
+        taxas = (1 + taxas_anuais) ** (1 / k) - 1
+        resultado['vpl_projetos'] = np.array([
+            [calcular_vpl(fluxos, taxa) for fluxos, taxa in zip(p['fluxos'], linha)] for linha in taxas
+        ]).reshape(s, len(p['fluxos']))
+        resultado['taxas_anuais_projetos'] = taxas_anuais
+
+    if 'carteira' in analises:
+        c = analises['carteira']
+        valores = c['valor'] * (1 + c['beta'] * acoes)
+        # Volatilidade estressada: desvios em torno da média multiplicados
+        media = c['retornos'].mean()
+        retornos = media + (c['retornos'][:, None] - media) * volatilidades[None, :]
+        var = calcular_var_cvar(retornos, niveis=(0.95,), horizontes=(1,), metodo='historico')['var'][0, 0]
+        resultado['valor_carteira'] = valores
+        resultado['var_carteira'] = var * valores
+
+    return resultado
+
+def executar_estresse(cenarios=None, financiamentos=(), projetos=(), carteira=None, max_processos=None):
+    """
+    Aplica choques de juros, ações e volatilidade a todas as análises de uma vez.
+
+    cenarios: lista de dicionários {'nome', 'juros', 'acoes', 'volatilidade'}
+        (padrão CENARIOS_PADRAO; ver gerar_cenarios_grade)
+    financiamentos: lista de {'nome', 'valor_principal', 'taxa_mensal',
+        'num_parcelas', 'sistema', 'pos_fixado'}
+    projetos: lista de {'nome', 'fluxos', 'taxa', 'periodos_por_ano'}: taxa de
+        desconto por período dos fluxos e número de períodos por ano (padrão
+        1, fluxos anuais; 12 para mensais). O choque de juros é aplicado à
+        taxa anual equivalente, como nos financiamentos; o VPL vem de
+        calcular_vpl e a TIR (calcular_tir_lote) é comparada à taxa estressada,
+        ambas anuais equivalentes
+    carteira: {'precos': DataFrame (T, N) ou {ticker: DataFrame}, 'pesos',
+        'valor' (R$), 'mercado': série do Ibovespa para os betas (opcional)}
+
+    Os cenários são divididos em blocos entre processos e cada bloco é
+    vetorizado. Retorna {'impacto': DataFrame consolidado por cenário,
+    'detalhes': DataFrame por cenário e item, com base, estressado e impacto
+    (e, nos projetos, a TIR e a taxa anual estressada)}.
+    """
+    cenarios = pd.DataFrame(CENARIOS_PADRAO if cenarios is None else cenarios)
+    for coluna in ['juros', 'acoes']:
+        cenarios[coluna] = cenarios[coluna].fillna(0.0) if coluna in cenarios else 0.0
+    cenarios['volatilidade'] = cenarios['volatilidade'].fillna(1.0) if 'volatilidade' in cenarios else 1.0
+
+    analises = _preparar_analises(list(financiamentos), list(projetos), carteira)
+    juros = np.concatenate([[0.0], cenarios['juros'].to_numpy(dtype=float)])
+    acoes = np.concatenate([[0.0], cenarios['acoes'].to_numpy(dtype=float)])
+    volatilidades = np.concatenate([[1.0], cenarios['volatilidade'].to_numpy(dtype=float)])
+
+    if len(juros) > LIMITE_PARALELO and max_processos != 1:
+        processos = max_processos or os.cpu_count() or 1
+        blocos = np.array_split(np.arange(len(juros)), processos)
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            futuros = [
+                executor.submit(_avaliar_bloco, analises, juros[b], acoes[b], volatilidades[b])
+                for b in blocos
+            ]
+            partes = [f.result() for f in futuros]
+        saida = {chave: np.concatenate([p[chave] for p in partes]) for chave in partes[0]}
+    else:
+        saida = _avaliar_bloco(analises, juros, acoes, volatilidades)
+
+    # Linha 0 é o cenário base (sem choques)
+    impacto = pd.DataFrame({
+        'Cenario': cenarios['nome'].to_numpy() if 'nome' in cenarios else np.arange(1, len(cenarios) + 1),
+        'Choque_Juros': cenarios['juros'].to_numpy(),
+        'Choque_Acoes': cenarios['acoes'].to_numpy(),
+        'Choque_Volatilidade': cenarios['volatilidade'].to_numpy()
+    })
+    total = np.zeros(len(cenarios))
+    detalhes = []
+
+    def registrar(analise, nomes, valores, sinal, extras=None):
+        base, estressado = valores[0], valores[1:]
+        for j, nome in enumerate(nomes):
+            detalhe = pd.DataFrame({
+                'Cenario': impacto['Cenario'],
+                'Analise': analise,
+                'Item': nome,
+                'Base': base[j],
+                'Estressado': estressado[:, j],
+                'Impacto': sinal * (estressado[:, j] - base[j])
+            })
+            for coluna, valores_extra in (extras or {}).items():
+                valores_extra = np.asarray(valores_extra)
+                detalhe[coluna] = valores_extra[j] if valores_extra.ndim == 1 else valores_extra[:, j]
+            detalhes.append(detalhe)
+
+    if 'juros_financiamentos' in saida:
+        juros_extra = (saida['juros_financiamentos'][1:] - saida['juros_financiamentos'][0]).sum(axis=1)
+        impacto['Juros_Financiamentos'] = juros_extra
+        impacto['Prestacao_Inicial'] = (saida['prestacao_inicial'][1:] - saida['prestacao_inicial'][0]).sum(axis=1)
+        total -= juros_extra
+        registrar('Financiamento', analises['financiamentos']['nomes'], saida['juros_financiamentos'], -1)
+
+    if 'vpl_projetos' in saida:
+        variacao = (saida['vpl_projetos'][1:] - saida['vpl_projetos'][0]).sum(axis=1)
+        impacto['VPL_Projetos'] = variacao
+        impacto['Projetos_Inviaveis'] = (saida['vpl_projetos'][1:] < 0).sum(axis=1)
+        total += variacao
+        registrar('Projeto', analises['projetos']['nomes'], saida['vpl_projetos'], 1,
+                  {'TIR_Anual': analises['projetos']['tir_anual'],
+                   'Taxa_Anual_Estressada': saida['taxas_anuais_projetos'][1:]})
+        # Folga da TIR sobre a taxa mínima estressada, ao ano (negativa: projeto abaixo da taxa)
+        folgas = analises['projetos']['tir_anual'][None, :] - saida['taxas_anuais_projetos'][1:]
+        impacto['Projetos_TIR_Abaixo'] = (folgas < 0).sum(axis=1)
+        impacto['Folga_TIR_Minima'] = np.nanmin(folgas, axis=1)
+
+    if 'valor_carteira' in saida:
+        variacao = saida['valor_carteira'][1:] - saida['valor_carteira'][0]
+        impacto['Carteira'] = variacao
+        impacto['VaR_Carteira'] = saida['var_carteira'][1:]
+        total += variacao
+        registrar('Carteira', ['Carteira'], saida['valor_carteira'][:, None], 1)
+
+    impacto['Impacto_Total'] = total
+    detalhes = pd.concat(detalhes, ignore_index=True) if detalhes else pd.DataFrame()
+    return {'impacto': impacto, 'detalhes': detalhes}
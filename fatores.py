@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+# Janelas com X'X acima deste número de condição (fator constante, sem
+# variância na janela) não têm regressão definida
+LIMITE_CONDICIONAMENTO = 1e10
+
+def _preparar(retornos_ativos, fatores):
+    """
+    Converte as entradas em matrizes Y (T, N) e X (T, K) com os nomes das colunas,
+    mantendo só as datas sem NaN em nenhuma série
+    """
+    nomes_ativos = list(retornos_ativos.columns) if isinstance(retornos_ativos, pd.DataFrame) else None
+    nomes_fatores = list(fatores.columns) if isinstance(fatores, pd.DataFrame) else None
+    if isinstance(retornos_ativos, pd.Series):
+        nomes_ativos = [retornos_ativos.name or 'Ativo']
+    if isinstance(fatores, pd.Series):
+        nomes_fatores = [fatores.name or 'Mercado']
+
+    # Alinha por data quando as entradas são do pandas
+    if isinstance(retornos_ativos, (pd.Series, pd.DataFrame)) and isinstance(fatores, (pd.Series, pd.DataFrame)):
+        retornos_ativos, fatores = pd.DataFrame(retornos_ativos).align(pd.DataFrame(fatores), join='inner', axis=0)
+
+    y = np.asarray(retornos_ativos, dtype=float)
+    x = np.asarray(fatores, dtype=float)
+    y = y[:, None] if y.ndim == 1 else y
+    x = x[:, None] if x.ndim == 1 else x
+
+    nomes_ativos = nomes_ativos or [f'Ativo_{i + 1}' for i in range(y.shape[1])]
+    nomes_fatores = nomes_fatores or [f'Fator_{k + 1}' for k in range(x.shape[1])]
+
+    validas = np.isfinite(y).all(axis=1) & np.isfinite(x).all(axis=1)
+    return y[validas], x[validas], nomes_ativos, nomes_fatores
+
+def regredir_fatores(retornos_ativos, fatores, periodos_por_ano=252):
+    """
+    Regride todos os ativos (T, N) contra um ou mais fatores (T, K) com uma
+    única solução de mínimos quadrados.
+
+    Retorna um DataFrame com uma linha por ativo: Alfa (por período),
+    Alfa_Anual, Beta_<fator>, R2, Vol_Residual (anualizada) e estatísticas t.
+    """
+    y, x, nomes_ativos, nomes_fatores = _preparar(retornos_ativos, fatores)
+    t, k = x.shape
+    xc = np.column_stack([np.ones(t), x])
+
+    coeficientes, _, _, _ = np.linalg.lstsq(xc, y, rcond=None)
+    residuos = y - xc @ coeficientes
+
+    graus_liberdade = max(t - k - 1, 1)
+    variancia_residual = (residuos ** 2).sum(axis=0) / graus_liberdade
+    erros_padrao = np.sqrt(np.outer(np.diag(np.linalg.pinv(xc.T @ xc)), variancia_residual))
+    soma_total = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estatisticas_t = coeficientes / erros_padrao
+        r2 = np.where(soma_total > 0, 1 - (residuos ** 2).sum(axis=0) / soma_total, 0.0)
+
+    resultado = {
+        'Alfa': coeficientes[0],
+        'Alfa_Anual': coeficientes[0] * periodos_por_ano
+    }
+    for j, nome in enumerate(nomes_fatores, start=1):
+        resultado[f'Beta_{nome}'] = coeficientes[j]
+    resultado['R2'] = r2
+    resultado['Vol_Residual'] = np.sqrt(variancia_residual * periodos_por_ano)
+    resultado['t_Alfa'] = estatisticas_t[0]
+    for j, nome in enumerate(nomes_fatores, start=1):
+        resultado[f't_{nome}'] = estatisticas_t[j]
+
+    return pd.DataFrame(resultado, index=nomes_ativos)
+
+def regredir_fatores_janela(retornos_ativos, fatores, janela=60, periodos_por_ano=252):
+    """
+    Regressão em janelas móveis. Em vez de refazer a regressão em cada janela,
+    mantém somas acumuladas de X'X, X'Y e Y'Y: cada janela é a diferença de
+    duas somas, e todos os sistemas (K+1)x(K+1) são resolvidos de uma vez.
+
+    Retorna um dicionário de arrays com uma entrada por fim de janela (W = T - janela + 1):
+    alfa (W, N), betas (W, K, N), r2 (W, N), vol_residual (W, N), t_alfa (W, N),
+    t_betas (W, K, N), além de ativos e fatores (nomes). Janelas em que os
+    fatores não têm variância (X'X singular) ficam com NaN.
+    """
+    y, x, nomes_ativos, nomes_fatores = _preparar(retornos_ativos, fatores)
+    t, k = x.shape
+    if t < janela:
+        raise ValueError("Histórico menor que a janela")
+
+    xc = np.column_stack([np.ones(t), x])
+    zeros = lambda forma: np.zeros((1,) + forma)
+    soma_xx = np.concatenate([zeros((k + 1, k + 1)), np.cumsum(xc[:, :, None] * xc[:, None, :], axis=0)])
+    soma_xy = np.concatenate([zeros((k + 1, y.shape[1])), np.cumsum(xc[:, :, None] * y[:, None, :], axis=0)])
+    soma_yy = np.concatenate([zeros((y.shape[1],)), np.cumsum(y ** 2, axis=0)])
+
+    xx = soma_xx[janela:] - soma_xx[:-janela]
+    xy = soma_xy[janela:] - soma_xy[:-janela]
+    yy = soma_yy[janela:] - soma_yy[:-janela]
+
+    # Janelas singulares são resolvidas com a identidade e marcadas como NaN no final
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        singulares = ~(np.linalg.cond(xx) < LIMITE_CONDICIONAMENTO)
+    xx = np.where(singulares[:, None, None], np.eye(k + 1), xx)
+
+    coeficientes = np.linalg.solve(xx, xy)
+    soma_residual = np.maximum(yy - (coeficientes * xy).sum(axis=1), 0)
+    soma_total = yy - xy[:, 0, :] ** 2 / janela
+
+    graus_liberdade = max(janela - k - 1, 1)
+    variancia_residual = soma_residual / graus_liberdade
+    diagonal = np.diagonal(np.linalg.inv(xx), axis1=1, axis2=2)
+    erros_padrao = np.sqrt(diagonal[:, :, None] * variancia_residual[:, None, :])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estatisticas_t = coeficientes / erros_padrao
+        r2 = np.where(soma_total > 0, 1 - soma_residual / soma_total, 0.0)
+
+    for valores in (coeficientes, estatisticas_t, r2, variancia_residual):
+        valores[singulares] = np.nan
+
+    return {
+        'alfa': coeficientes[:, 0, :],
+        'betas': coeficientes[:, 1:, :],
+        'r2': r2,
+        'vol_residual': np.sqrt(variancia_residual * periodos_por_ano),
+        't_alfa': estatisticas_t[:, 0, :],
+        't_betas': estatisticas_t[:, 1:, :],
+        'ativos': nomes_ativos,
+        'fatores': nomes_fatores
+    }
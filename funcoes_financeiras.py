@@ -1,16 +1,137 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import numpy_financial as npf
 import pandas as pd
+from cache_mercado import obter_ou_buscar, ler_cache, gravar_cache
+from calendario import calcular_fracao_ano, contar_dias_uteis
+from catalogo_b3 import listar_ativos
+from curva import eh_curva, fatores_desconto
+from drawdown import analisar_drawdowns
+
+# Parâmetros da busca de dados de mercado (configuráveis por variável de ambiente)
+TIMEOUT_BUSCA = float(os.environ.get('CALCULADORA_TIMEOUT_BUSCA', 15))
+TENTATIVAS_BUSCA = int(os.environ.get('CALCULADORA_TENTATIVAS_BUSCA', 3))
+BACKOFF_BUSCA = float(os.environ.get('CALCULADORA_BACKOFF_BUSCA', 0.5))
+
+# Provedor dos históricos: 'yfinance' ou 'sintetico' (dados gerados localmente, sem rede)
+PROVEDORES_DADOS = ['yfinance', 'sintetico']
+PROVEDOR_DADOS = os.environ.get('CALCULADORA_PROVEDOR_DADOS', 'yfinance')
+SEMENTE_SINTETICA = int(os.environ.get('CALCULADORA_SEMENTE_SINTETICA', 0))
+
+# Pools separados: um para os downloads e outro para as buscas disparadas pela interface
+_executor_downloads = ThreadPoolExecutor(max_workers=8, thread_name_prefix='download')
+_executor_buscas = ThreadPoolExecutor(max_workers=8, thread_name_prefix='busca')
 
 def calcular_juros_compostos(capital, taxa, tempo):
+    # Com uma curva de juros (curva.construir_curva), tempo é em anos de 252 dias úteis
+    if eh_curva(taxa):
+        return capital / fatores_desconto(taxa, np.asarray(tempo, dtype=float) * 252)
     return capital * (1 + taxa) ** tempo
 
 def calcular_vpl(fluxos, taxa):
+    # Com uma curva de juros, os períodos dos fluxos são anos de 252 dias úteis
+    if eh_curva(taxa):
+        return np.sum(np.asarray(fluxos, dtype=float) * fatores_desconto(taxa, np.arange(len(fluxos)) * 252))
     return npf.npv(taxa, fluxos)
 
 def calcular_tir(fluxos):
     return npf.irr(fluxos)
 
+def calcular_juros_compostos_datas(capital, taxa_anual, data_inicial, data_final, convencao='DU/252'):
+    """
+    Calcula o montante entre duas datas com taxa anual e a convenção de
+    contagem de dias informada (DU/252, ACT/365 ou 30/360). taxa_anual pode
+    ser uma curva: o montante cresce pelos forwards entre as datas.
+    """
+    if eh_curva(taxa_anual):
+        return capital * fatores_desconto(taxa_anual, data_inicial) / fatores_desconto(taxa_anual, data_final)
+    return calcular_juros_compostos(capital, taxa_anual, calcular_fracao_ano(data_inicial, data_final, convencao))
+
+def calcular_vpl_datas(fluxos, datas, taxa_anual, convencao='DU/252'):
+    """
+    Calcula o VPL de fluxos com datas, descontados à taxa anual pela fração de
+    ano (na convenção informada) entre a primeira data e a data de cada fluxo.
+    Com uma curva, os fluxos são descontados até a data base da curva.
+    """
+    if eh_curva(taxa_anual):
+        return np.sum(np.asarray(fluxos, dtype=float) * fatores_desconto(taxa_anual, pd.DatetimeIndex(datas)))
+    fracoes = calcular_fracao_ano(np.repeat(np.asarray(datas)[:1], len(datas)), datas, convencao)
+    return np.sum(np.asarray(fluxos, dtype=float) / (1 + taxa_anual) ** fracoes)
+
+def calcular_xirr(fluxos, datas, convencao='DU/252'):
+    """
+    Calcula a TIR anual de fluxos com datas (XIRR) na convenção informada
+    """
+    fracoes = calcular_fracao_ano(np.repeat(np.asarray(datas)[:1], len(datas)), datas, convencao)
+    return calcular_tir_lote([fluxos], chute=0.1, periodos=fracoes)[0]
+
+def calcular_tir_lote(fluxos, chute=0.01, tolerancia=1e-10, max_iter=100, periodos=None):
+    """
+    Calcula a TIR de vários fluxos de caixa de uma vez. fluxos é uma matriz
+    (M, T) com um fluxo por linha (completar com zeros). periodos são os
+    instantes de cada fluxo (padrão 0, 1, ..., T-1; podem ser frações de ano).
+    Usa Newton vetorizado e, para as linhas que não convergirem, bisseção.
+    Retorna um array (M,), com NaN onde não houver TIR.
+    """
+    fluxos = np.atleast_2d(np.asarray(fluxos, dtype=float))
+    if periodos is None:
+        periodos = np.arange(fluxos.shape[1])
+    periodos = np.broadcast_to(np.asarray(periodos, dtype=float), fluxos.shape)
+    taxas = np.full(len(fluxos), float(chute))
+    convergiu = np.zeros(len(fluxos), dtype=bool)
+    
+    with np.errstate(all='ignore'):
+        for _ in range(max_iter):
+            descontos = (1 + taxas)[:, None] ** -periodos
+            vpl = (fluxos * descontos).sum(axis=1)
+            derivada = (-periodos * fluxos * descontos).sum(axis=1) / (1 + taxas)
+            passo = np.where(convergiu, 0.0, vpl / derivada)
+            novas = taxas - passo
+            # Não deixa a taxa cruzar -100%
+            novas = np.where(novas <= -1, (taxas - 1) / 2, novas)
+            convergiu |= np.abs(passo) < tolerancia
+            taxas = novas
+            if convergiu.all():
+                break
+        
+        pendentes = ~convergiu | ~np.isfinite(taxas)
+        if pendentes.any():
+            taxas[pendentes] = _bissecao_tir(fluxos[pendentes], periodos[pendentes], tolerancia)
+    
+    return taxas
+
+def resolver_bissecao(funcao, inferior, superior, tolerancia=1e-12, max_iter=200):
+    """
+    Bisseção vetorizada: encontra, elemento a elemento, a raiz de uma função
+    monótona no intervalo [inferior, superior]. NaN onde não há troca de sinal.
+    """
+    baixo, alto = np.broadcast_arrays(np.asarray(inferior, dtype=float), np.asarray(superior, dtype=float))
+    baixo, alto = baixo.copy(), alto.copy()
+    valor_baixo = funcao(baixo)
+    sem_raiz = np.sign(valor_baixo) == np.sign(funcao(alto))
+    
+    for _ in range(max_iter):
+        meio = (baixo + alto) / 2
+        valor_meio = funcao(meio)
+        mesmo_sinal = np.sign(valor_meio) == np.sign(valor_baixo)
+        baixo = np.where(mesmo_sinal, meio, baixo)
+        valor_baixo = np.where(mesmo_sinal, valor_meio, valor_baixo)
+        alto = np.where(mesmo_sinal, alto, meio)
+        if np.all(alto - baixo < tolerancia):
+            break
+    
+    return np.where(sem_raiz, np.nan, (baixo + alto) / 2)
+
+def _bissecao_tir(fluxos, periodos, tolerancia, inferior=-0.9999, superior=10.0):
+    """
+    Bisseção vetorizada da TIR no intervalo [inferior, superior]
+    """
+    vpl = lambda taxas: (fluxos * (1 + taxas)[:, None] ** -periodos).sum(axis=1)
+    return resolver_bissecao(vpl, np.full(len(fluxos), inferior), np.full(len(fluxos), superior), tolerancia)
+
 def calcular_amortizacao_sac(valor_principal, taxa_mensal, num_parcelas):
     """
     Calcula a amortização pelo sistema SAC (Sistema de Amortização Constante)
@@ -88,6 +209,51 @@ def calcular_amortizacao_sac_american(valor_principal, taxa_mensal, num_parcelas
     
     return pd.DataFrame(tabela)
 
+def calcular_cronogramas_lote(valores_principais, taxas_mensais, num_parcelas, sistemas='SAC'):
+    """
+    Calcula de uma vez os cronogramas de vários financiamentos (SAC, Price ou
+    SAC Americano), em forma fechada. Retorna um dicionário de matrizes (M, N),
+    N = maior número de parcelas, com zeros após o fim de cada financiamento:
+    Prestacao, Amortizacao, Juros e Saldo_Devedor.
+    """
+    principais, taxas, prazos, sistemas = np.broadcast_arrays(
+        np.asarray(valores_principais, dtype=float), np.asarray(taxas_mensais, dtype=float),
+        np.asarray(num_parcelas, dtype=int), np.asarray(sistemas)
+    )
+    principais, taxas, prazos, sistemas = (np.atleast_1d(a) for a in (principais, taxas, prazos, sistemas))
+    
+    periodos = np.arange(1, prazos.max() + 1)[None, :]
+    ativo = periodos <= prazos[:, None]
+    p, i, n = principais[:, None], taxas[:, None], prazos[:, None]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # SAC
+        saldo_sac = p - p / n * periodos
+        
+        # Price (taxa zero vira amortização linear)
+        fator = (1 + i) ** periodos
+        prestacao_price = np.where(i > 0, p * i / (1 - (1 + i) ** -n), p / n)
+        saldo_price = np.where(i > 0, p * fator - prestacao_price * (fator - 1) / i, saldo_sac)
+    
+    # SAC Americano: principal inteiro na última parcela
+    saldo_americano = np.where(periodos < n, p, 0.0)
+    
+    eh_sac = (sistemas == 'SAC')[:, None]
+    eh_price = (sistemas == 'Price')[:, None]
+    saldos = np.where(eh_sac, saldo_sac, np.where(eh_price, saldo_price, saldo_americano))
+    saldos = np.where(ativo, np.maximum(saldos, 0), 0.0)
+    
+    anteriores = np.concatenate([principais[:, None], saldos[:, :-1]], axis=1)
+    juros = np.where(ativo, anteriores * i, 0.0)
+    amortizacao = np.where(ativo, anteriores - saldos, 0.0)
+    
+    return {
+        'Prestacao': juros + amortizacao,
+        'Amortizacao': amortizacao,
+        'Juros': juros,
+        'Saldo_Devedor': saldos
+    }
+
 def calcular_retorno_acao(preco_inicial, preco_final, dividendos=0):
     """
     Calcula o retorno total de uma ação
@@ -97,37 +263,139 @@ def calcular_retorno_acao(preco_inicial, preco_final, dividendos=0):
     retorno_total = retorno_capital + retorno_dividendos
     return retorno_total
 
-def calcular_volatilidade(retornos):
+# Períodos por ano usados na anualização (cripto negocia todos os dias)
+PERIODOS_POR_ANO = {
+    'diario': 252,
+    'diario_cripto': 365,
+    'semanal': 52,
+    'mensal': 12,
+    'anual': 1
+}
+
+def inferir_periodos_por_ano(indice, cripto=False):
+    """
+    Infere a periodicidade (períodos por ano) a partir do espaçamento mediano
+    de um índice de datas. Sem datas, assume pregões diários.
+    """
+    if not isinstance(indice, pd.DatetimeIndex) or len(indice) < 2:
+        return PERIODOS_POR_ANO['diario_cripto'] if cripto else PERIODOS_POR_ANO['diario']
+    
+    dias = np.median(np.diff(indice.to_numpy()) / np.timedelta64(1, 'D'))
+    if dias <= 4:
+        return PERIODOS_POR_ANO['diario_cripto'] if cripto else PERIODOS_POR_ANO['diario']
+    if dias <= 10:
+        return PERIODOS_POR_ANO['semanal']
+    if dias <= 45:
+        return PERIODOS_POR_ANO['mensal']
+    return PERIODOS_POR_ANO['anual']
+
+def calcular_estatisticas_retornos(retornos, periodos_por_ano=252, taxa_livre_risco=0.06):
+    """
+    Núcleo vetorizado das métricas de risco e retorno. Aceita retornos em (T,)
+    ou (T, N), um ativo por coluna, ignora NaN e anualiza pela periodicidade.
+    A taxa livre de risco é anual.
+    """
+    retornos = np.asarray(retornos, dtype=float)
+    n = np.sum(~np.isnan(retornos), axis=0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.nanmean(retornos, axis=0)
+        desvio = np.sqrt(np.nansum((retornos - media) ** 2, axis=0) / (n - 1))
+    desvio = np.where(n > 1, desvio, 0.0)
+    
+    retorno_medio = media * periodos_por_ano
+    volatilidade = desvio * np.sqrt(periodos_por_ano)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(volatilidade > 0, (retorno_medio - taxa_livre_risco) / volatilidade, 0.0)
+    
+    return {
+        'media_periodo': media,
+        'desvio_periodo': desvio,
+        'retorno_medio': retorno_medio,
+        'volatilidade': volatilidade,
+        'sharpe_ratio': sharpe
+    }
+
+# Imposto de renda retido na fonte sobre JCP (dividendos são isentos)
+ALIQUOTA_JCP = 0.15
+
+def calcular_indice_retorno_total(dados, jcp=None, aliquota_jcp=ALIQUOTA_JCP, jcp_incluso_em_dividendos=True,
+                                  ajustar_desdobramentos=False):
+    """
+    Calcula o índice de retorno total de uma ação (proventos reinvestidos na
+    data ex), em base igual ao primeiro fechamento.
+
+    dados: DataFrame do yfinance com Close, Dividends e Stock Splits
+    jcp: Series opcional com o JCP bruto por ação na data ex; o IR é descontado.
+        Se jcp_incluso_em_dividendos, esse JCP já está somado em Dividends
+        (como informa o yfinance) e só o imposto é abatido. Sem ela, o JCP
+        contido em Dividends entra bruto (caso do histórico baixado pelo app).
+    ajustar_desdobramentos: aplica os fatores de Stock Splits a preços e
+        proventos (para séries brutas; o yfinance já entrega preços ajustados)
+    """
+    fechamentos = dados['Close'].to_numpy(dtype=float)
+    proventos = dados['Dividends'].to_numpy(dtype=float) if 'Dividends' in dados else np.zeros(len(dados))
+    
+    if jcp is not None:
+        jcp = jcp.reindex(dados.index, fill_value=0.0).to_numpy(dtype=float)
+        if jcp_incluso_em_dividendos:
+            proventos = proventos - jcp * aliquota_jcp
+        else:
+            proventos = proventos + jcp * (1 - aliquota_jcp)
+    
+    if ajustar_desdobramentos and 'Stock Splits' in dados:
+        razoes = dados['Stock Splits'].to_numpy(dtype=float)
+        razoes = np.where(razoes > 0, razoes, 1.0)
+        # Fator de cada data = produto dos desdobramentos posteriores a ela
+        fatores = np.concatenate([np.cumprod(razoes[::-1])[::-1][1:], [1.0]])
+        fechamentos = fechamentos / fatores
+        proventos = proventos / fatores
+    
+    fatores_diarios = (fechamentos[1:] + proventos[1:]) / fechamentos[:-1]
+    indice = fechamentos[0] * np.concatenate([[1.0], np.cumprod(fatores_diarios)])
+    return pd.Series(indice, index=dados.index, name='Retorno_Total')
+
+def obter_serie_precos(dados):
+    """
+    Série usada pelas métricas: o índice de retorno total quando disponível,
+    senão o fechamento
+    """
+    if 'Retorno_Total' in dados:
+        return dados['Retorno_Total']
+    return dados['Close']
+
+def calcular_volatilidade(retornos, periodos_por_ano=1):
     """
-    Calcula a volatilidade (desvio padrão) dos retornos
+    Calcula a volatilidade (desvio padrão) dos retornos, anualizada pela
+    periodicidade informada (1 = sem anualização)
     """
-    return np.std(retornos)
+    return calcular_estatisticas_retornos(retornos, periodos_por_ano)['volatilidade']
 
 def calcular_beta(retornos_acao, retornos_mercado):
     """
     Calcula o Beta de uma ação em relação ao mercado
     """
     covariancia = np.cov(retornos_acao, retornos_mercado)[0, 1]
-    variancia_mercado = np.var(retornos_mercado)
+    variancia_mercado = np.var(retornos_mercado, ddof=1)
     return covariancia / variancia_mercado
 
-def calcular_sharpe_ratio(retornos, taxa_livre_risco=0.06):
+def calcular_sharpe_ratio(retornos, taxa_livre_risco=0.06, periodos_por_ano=252):
     """
-    Calcula o Sharpe Ratio (retorno ajustado ao risco)
+    Calcula o Sharpe Ratio anualizado (retorno ajustado ao risco) a partir de
+    retornos periódicos e de uma taxa livre de risco anual
     """
-    retorno_medio = np.mean(retornos)
-    volatilidade = np.std(retornos)
-    if volatilidade == 0:
-        return 0
-    return (retorno_medio - taxa_livre_risco) / volatilidade
+    return calcular_estatisticas_retornos(retornos, periodos_por_ano, taxa_livre_risco)['sharpe_ratio']
 
 def calcular_max_drawdown(precos):
     """
-    Calcula o máximo drawdown (maior queda) de uma série de preços
+    Calcula o máximo drawdown (maior queda) de uma série de preços,
+    ou de uma matriz (T, N) com um ativo por coluna
     """
-    picos = np.maximum.accumulate(precos)
+    precos = np.asarray(precos, dtype=float)
+    picos = np.maximum.accumulate(precos, axis=0)
     drawdowns = (precos - picos) / picos
-    return np.min(drawdowns)
+    return np.min(drawdowns, axis=0)
 
 def calcular_roi_fundo(valor_inicial, valor_final, taxas=0):
     """
@@ -137,12 +405,12 @@ def calcular_roi_fundo(valor_inicial, valor_final, taxas=0):
     roi_liquido = roi_bruto - taxas
     return roi_bruto, roi_liquido
 
-def calcular_volatilidade_cripto(precos, periodo=30):
+def calcular_volatilidade_cripto(precos, periodos_por_ano=365):
     """
-    Calcula a volatilidade de uma criptomoeda
+    Calcula a volatilidade anualizada de uma criptomoeda (mercado aberto 365 dias)
     """
-    retornos = np.diff(np.log(precos))
-    return np.std(retornos) * np.sqrt(periodo)
+    retornos = np.diff(np.log(precos), axis=0)
+    return calcular_volatilidade(retornos, periodos_por_ano)
 
 def calcular_correlacao_ativos(precos_ativos):
     """
@@ -159,49 +427,102 @@ def calcular_alocacao_otima(retornos_ativos, risco_alvo=0.1):
     # Alocação igual (1/N)
     return np.ones(n_ativos) / n_ativos
 
-def obter_lista_acoes_b3():
-    """
-    Retorna uma lista das principais ações da B3
-    """
-    acoes_b3 = {
-        'PETR4.SA': 'Petrobras PN',
-        'VALE3.SA': 'Vale ON',
-        'ITUB4.SA': 'Itaú PN',
-        'BBDC4.SA': 'Bradesco PN',
-        'ABEV3.SA': 'Ambev ON',
-        'WEGE3.SA': 'WEG ON',
-        'RENT3.SA': 'Localiza ON',
-        'LREN3.SA': 'Lojas Renner ON',
-        'MGLU3.SA': 'Magazine Luiza ON',
-        'JBSS3.SA': 'JBS ON',
-        'SUZB3.SA': 'Suzano ON',
-        'GGBR4.SA': 'Gerdau PN',
-        'USIM5.SA': 'Usiminas PN',
-        'CSAN3.SA': 'Cosan ON',
-        'RAIL3.SA': 'Rumo ON',
-        'CCRO3.SA': 'CCR ON',
-        'EMBR3.SA': 'Embraer ON',
-        'GOLL4.SA': 'Gol PN',
-        'CVCB3.SA': 'CVC ON',
-        'HAPV3.SA': 'Hapvida ON'
-    }
-    return acoes_b3
+def obter_lista_acoes_b3(tipos=None):
+    """
+    Retorna os ativos do catálogo da B3 ({ticker.SA: nome}), opcionalmente
+    só dos tipos informados ('Ação', 'FII', 'BDR', 'ETF')
+    """
+    catalogo = listar_ativos()
+    if tipos is not None:
+        catalogo = catalogo[catalogo['tipo'].isin(tipos)]
+    return dict(zip(catalogo['ticker'] + '.SA', catalogo['nome']))
 
-def buscar_dados_acao(ticker, periodo='1y'):
+def chave_provedor(chave):
+    """
+    Separa no cache os dados de provedores diferentes do yfinance
+    """
+    return chave if PROVEDOR_DADOS == 'yfinance' else f'{PROVEDOR_DADOS}:{chave}'
+
+def _baixar_historico(ticker, periodo, timeout=TIMEOUT_BUSCA):
+    """
+    Baixa o histórico de um ticker no provedor configurado (None se vier vazio).
+    O timeout vale para a própria requisição HTTP.
+
+    Limitação: o yfinance soma o JCP aos dividendos sem separá-lo, e nenhum
+    provedor informa a série de JCP, então o Retorno_Total gravado aqui trata
+    o JCP como provento bruto (sem o IR retido). Para o valor líquido, chame
+    calcular_indice_retorno_total com a série de JCP da empresa.
+    """
+    if PROVEDOR_DADOS not in PROVEDORES_DADOS:
+        raise ValueError(f"Provedor de dados desconhecido: {PROVEDOR_DADOS}")
+    
+    # Preços sem ajuste de proventos: o retorno total é calculado aqui, uma vez
+    # por ticker, e fica no cache junto com os preços
+    if PROVEDOR_DADOS == 'sintetico':
+        from dados_sinteticos import gerar_historico_sintetico
+        dados = gerar_historico_sintetico(ticker, periodo, SEMENTE_SINTETICA)
+    else:
+        import yfinance as yf
+        dados = yf.Ticker(ticker).history(period=periodo, auto_adjust=False, timeout=timeout)
+    if dados.empty:
+        return None
+    dados['Retorno_Total'] = calcular_indice_retorno_total(dados)
+    return dados
+
+def _baixar_com_retentativas(ticker, periodo, timeout=TIMEOUT_BUSCA, tentativas=TENTATIVAS_BUSCA,
+                             backoff=BACKOFF_BUSCA):
+    """
+    Baixa o histórico repetindo em caso de erro, com espera exponencial entre
+    tentativas. Todas as tentativas dividem o mesmo prazo (cada requisição
+    recebe o tempo restante), então o download sempre termina em até timeout
+    segundos e libera o worker e o bloqueio da chave.
+    """
+    prazo = time.monotonic() + timeout
+    for tentativa in range(tentativas):
+        try:
+            return _baixar_historico(ticker, periodo, max(prazo - time.monotonic(), 0.1))
+        except Exception:
+            espera = backoff * 2 ** tentativa
+            if tentativa == tentativas - 1 or time.monotonic() + espera >= prazo:
+                raise
+            time.sleep(espera)
+
+def _buscar_historico(ticker, periodo, timeout=TIMEOUT_BUSCA):
+    """
+    Busca o histórico pelo cache compartilhado com limite de tempo. Se o provedor
+    demorar ou falhar, usa o último dado em cache, mesmo que expirado.
+
+    O limite vale também dentro do worker (timeout da requisição e espera
+    máxima pelo bloqueio da chave): um download abandonado aqui termina logo
+    depois, em vez de ocupar o pool e o bloqueio indefinidamente.
+    """
+    chave = chave_provedor(f'historico:{ticker}:{periodo}')
+    futuro = _executor_downloads.submit(
+        obter_ou_buscar, chave, lambda: _baixar_com_retentativas(ticker, periodo, timeout),
+        espera_maxima=timeout
+    )
+    try:
+        return futuro.result(timeout=timeout)
+    except Exception as e:
+        dados = ler_cache(chave, aceitar_expirado=True)
+        if dados is not None:
+            return dados
+        if isinstance(e, TimeoutError):
+            raise TimeoutError(f"tempo limite de {timeout:g}s excedido") from e
+        raise
+
+def buscar_dados_acao(ticker, periodo='1y', timeout=TIMEOUT_BUSCA):
     """
     Busca dados históricos de uma ação usando yfinance
     """
     try:
-        import yfinance as yf
-        
         # Adiciona .SA para ações brasileiras se não estiver presente
         if not ticker.endswith('.SA'):
             ticker = ticker + '.SA'
         
-        acao = yf.Ticker(ticker)
-        dados = acao.history(period=periodo)
+        dados = _buscar_historico(ticker, periodo, timeout)
         
-        if dados.empty:
+        if dados is None:
             return None, "Nenhum dado encontrado para este ticker"
         
         return dados, None
@@ -216,54 +537,194 @@ def calcular_metricas_acao(dados):
     if dados is None or dados.empty:
         return None
     
-    # Retornos diários
-    retornos = dados['Close'].pct_change().dropna()
+    # Retornos diários com proventos reinvestidos
+    serie = obter_serie_precos(dados)
+    retornos = serie.pct_change().dropna()
     
     # Métricas básicas
     preco_atual = dados['Close'].iloc[-1]
     preco_inicial = dados['Close'].iloc[0]
-    retorno_periodo = (preco_atual - preco_inicial) / preco_inicial
+    retorno_periodo = serie.iloc[-1] / serie.iloc[0] - 1
     
-    # Volatilidade anualizada
-    volatilidade = retornos.std() * np.sqrt(252)
+    # Volatilidade, retorno médio e Sharpe anualizados (taxa livre de risco de 6% ao ano)
+    periodos_por_ano = inferir_periodos_por_ano(dados.index)
+    estatisticas = calcular_estatisticas_retornos(retornos.to_numpy(), periodos_por_ano, taxa_livre_risco=0.06)
     
-    # Retorno médio anualizado
-    retorno_medio = retornos.mean() * 252
+    # Retorno do período anualizado pelos dias úteis efetivos (DU/252)
+    dias_uteis = contar_dias_uteis(dados.index[0], dados.index[-1])
+    retorno_anualizado = (1 + retorno_periodo) ** (252 / dias_uteis) - 1 if dias_uteis > 0 else 0.0
     
-    # Máximo drawdown
-    picos = dados['Close'].expanding().max()
-    drawdowns = (dados['Close'] - picos) / picos
-    max_drawdown = drawdowns.min()
-    
-    # Sharpe Ratio (assumindo taxa livre de risco de 6% ao ano)
-    taxa_livre_risco = 0.06
-    sharpe_ratio = (retorno_medio - taxa_livre_risco) / volatilidade if volatilidade > 0 else 0
+    # Episódios de drawdown e série underwater (já pronta para o gráfico)
+    drawdowns = analisar_drawdowns(serie.rename('Ativo'), periodos_por_ano, taxa_livre_risco=0.06)
+    indicadores = drawdowns['metricas'].iloc[0]
     
     return {
         'preco_atual': preco_atual,
         'preco_inicial': preco_inicial,
         'retorno_periodo': retorno_periodo,
+        'retorno_anualizado': retorno_anualizado,
+        'volatilidade': float(estatisticas['volatilidade']),
+        'retorno_medio': float(estatisticas['retorno_medio']),
+        'max_drawdown': float(indicadores['Max_Drawdown']),
+        'sharpe_ratio': float(estatisticas['sharpe_ratio']),
+        'calmar': float(indicadores['Calmar']),
+        'sortino': float(indicadores['Sortino']),
+        'ulcer': float(indicadores['Ulcer']),
+        'retornos': retornos,
+        'submerso': drawdowns['submerso'],
+        'drawdowns': drawdowns['episodios'].drop(columns='Ativo')
+    }
+
+def iniciar_estado_metricas(dados):
+    """
+    Cria o estado incremental das métricas de uma ação a partir do histórico.
+    O estado resume as barras "fechadas" (todas menos a última) com contadores,
+    média e soma dos quadrados dos desvios (Welford), pico e pior drawdown, e
+    pode ser gravado no cache junto dos preços. A última barra fica à parte e
+    só entra no cálculo das métricas, para que a revisão intradiária dela não
+    exija refazer o estado.
+    """
+    if dados is None or dados.empty:
+        return None
+    
+    niveis = obter_serie_precos(dados).to_numpy(dtype=float)
+    fechados = niveis[:max(len(niveis) - 1, 1)]
+    retornos = fechados[1:] / fechados[:-1] - 1
+    picos = np.maximum.accumulate(fechados)
+    
+    media = retornos.mean() if len(retornos) else 0.0
+    return {
+        'n': len(retornos),
+        'media': float(media),
+        'm2': float(((retornos - media) ** 2).sum()),
+        'preco_inicial': float(dados['Close'].iloc[0]),
+        'nivel_inicial': float(niveis[0]),
+        'nivel_fechado': float(fechados[-1]),
+        'pico': float(picos[-1]),
+        'max_drawdown': float(((fechados - picos) / picos).min()),
+        'data_inicial': dados.index[0],
+        'data_fechada': dados.index[len(fechados) - 1],
+        # Última barra (ainda aberta)
+        'preco_atual': float(dados['Close'].iloc[-1]),
+        'nivel_atual': float(niveis[-1]),
+        'ultima_data': dados.index[-1]
+    }
+
+def _incorporar_nivel(estado, nivel):
+    """
+    Incorpora uma barra fechada ao estado em O(1)
+    """
+    retorno = nivel / estado['nivel_fechado'] - 1
+    
+    # Atualização de Welford da média e da variância
+    estado['n'] += 1
+    delta = retorno - estado['media']
+    estado['media'] += delta / estado['n']
+    estado['m2'] += delta * (retorno - estado['media'])
+    
+    estado['pico'] = max(estado['pico'], nivel)
+    estado['max_drawdown'] = min(estado['max_drawdown'], (nivel - estado['pico']) / estado['pico'])
+    estado['nivel_fechado'] = float(nivel)
+    return estado
+
+def atualizar_estado_metricas(estado, dados):
+    """
+    Incorpora ao estado as barras de dados posteriores à última fechada, em
+    O(1) por barra nova (a posição é localizada por busca binária no índice).
+
+    O estado vale para uma janela com início fixo: se dados começar em outra
+    data (ex.: período '1y' deslizando um pregão) ou o histórico já visto
+    tiver sido reajustado, ele é reconstruído a partir de dados.
+    """
+    if estado is None or dados.index[0] != estado['data_inicial']:
+        return iniciar_estado_metricas(dados)
+    
+    posicao = dados.index.searchsorted(estado['data_fechada'])
+    if posicao >= len(dados) or dados.index[posicao] != estado['data_fechada']:
+        return iniciar_estado_metricas(dados)
+    
+    niveis = obter_serie_precos(dados.iloc[posicao:]).to_numpy(dtype=float)
+    if not np.isclose(niveis[0], estado['nivel_fechado'], rtol=1e-9):
+        return iniciar_estado_metricas(dados)
+    
+    estado = dict(estado)
+    for nivel in niveis[1:-1]:
+        _incorporar_nivel(estado, nivel)
+    if len(niveis) > 1:
+        estado['data_fechada'] = dados.index[-2]
+    
+    estado['preco_atual'] = float(dados['Close'].iloc[-1])
+    estado['nivel_atual'] = float(niveis[-1])
+    estado['ultima_data'] = dados.index[-1]
+    return estado
+
+def metricas_do_estado(estado, taxa_livre_risco=0.06, periodos_por_ano=252):
+    """
+    Calcula as métricas de calcular_metricas_acao a partir do estado incremental
+    (sem a série de retornos), incluindo a última barra
+    """
+    if estado is None:
+        return None
+    
+    if estado['ultima_data'] > estado['data_fechada']:
+        estado = _incorporar_nivel(dict(estado), estado['nivel_atual'])
+    
+    desvio = np.sqrt(estado['m2'] / (estado['n'] - 1)) if estado['n'] > 1 else 0.0
+    volatilidade = desvio * np.sqrt(periodos_por_ano)
+    retorno_medio = estado['media'] * periodos_por_ano
+    sharpe_ratio = (retorno_medio - taxa_livre_risco) / volatilidade if volatilidade > 0 else 0
+    
+    return {
+        'preco_atual': estado['preco_atual'],
+        'preco_inicial': estado['preco_inicial'],
+        'retorno_periodo': estado['nivel_atual'] / estado['nivel_inicial'] - 1,
         'volatilidade': volatilidade,
         'retorno_medio': retorno_medio,
-        'max_drawdown': max_drawdown,
-        'sharpe_ratio': sharpe_ratio,
-        'retornos': retornos
+        'max_drawdown': estado['max_drawdown'],
+        'sharpe_ratio': sharpe_ratio
     }
 
-def buscar_dados_mercado(periodo='1y'):
+def calcular_metricas_incrementais(ticker, dados, periodo='1y', taxa_livre_risco=0.06):
+    """
+    Atualiza o estado de métricas do ticker guardado no cache com as barras
+    novas de dados e retorna as métricas (as mesmas de calcular_metricas_acao
+    sobre dados, sem as séries). Atualizações intradiárias e barras novas
+    custam O(1); uma janela que deslizou é reconstruída uma vez.
+    """
+    if dados is None or dados.empty:
+        return None
+    
+    chave = chave_provedor(f'metricas:{ticker}:{periodo}')
+    estado = ler_cache(chave, aceitar_expirado=True)
+    if estado is not None and 'data_fechada' not in estado:
+        estado = None
+    
+    estado = atualizar_estado_metricas(estado, dados)
+    gravar_cache(chave, estado)
+    # Periodicidade inferida só das últimas barras, para não percorrer o índice
+    return metricas_do_estado(estado, taxa_livre_risco, inferir_periodos_por_ano(dados.index[-20:]))
+
+def buscar_dados_mercado(periodo='1y', timeout=TIMEOUT_BUSCA):
     """
     Busca dados do índice Bovespa (^BVSP) como referência do mercado
     """
     try:
-        import yfinance as yf
+        dados = _buscar_historico('^BVSP', periodo, timeout)
         
-        mercado = yf.Ticker('^BVSP')
-        dados = mercado.history(period=periodo)
-        
-        if dados.empty:
+        if dados is None:
             return None, "Nenhum dado encontrado para o mercado"
         
         return dados, None
         
     except Exception as e:
-        return None, f"Erro ao buscar dados do mercado: {str(e)}" 
\ No newline at end of file
+        return None, f"Erro ao buscar dados do mercado: {str(e)}" 
+
+def iniciar_busca_dados(ticker, periodo='1y', timeout=TIMEOUT_BUSCA):
+    """
+    Dispara em paralelo as buscas da ação e do Ibovespa. Retorna dois futures
+    cujo result() devolve (dados, erro), para que a interface exiba cada parte
+    assim que ficar pronta.
+    """
+    futuro_acao = _executor_buscas.submit(buscar_dados_acao, ticker, periodo, timeout)
+    futuro_mercado = _executor_buscas.submit(buscar_dados_mercado, periodo, timeout)
+    return futuro_acao, futuro_mercado
\ No newline at end of file
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from funcoes_financeiras import calcular_juros_compostos, resolver_bissecao
+
+SISTEMAS_META = ['SAC', 'Price', 'SAC Americano']
+
+def _saida(valores):
+    return valores.item() if np.ndim(valores) == 0 else valores
+
+def calcular_valor_futuro(capital, taxa, tempo, aporte=0.0):
+    """
+    Montante com capital inicial e aportes ao fim de cada período
+    """
+    capital, taxa, tempo, aporte = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (capital, taxa, tempo, aporte)))
+    crescimento = calcular_juros_compostos(1.0, taxa, tempo)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fator_aportes = np.where(taxa != 0, (crescimento - 1) / np.where(taxa != 0, taxa, 1.0), tempo)
+    return _saida(capital * crescimento + aporte * fator_aportes)
+
+def calcular_taxa_necessaria(capital, montante, tempo, aporte=0.0):
+    """
+    Taxa por período necessária para chegar ao montante. Sem aportes a solução
+    é fechada; com aportes, bisseção vetorizada. Aceita arrays (broadcast).
+    Sem capital inicial nem aportes não há taxa possível (ValueError).
+    """
+    capital, montante, tempo, aporte = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (capital, montante, tempo, aporte))
+    )
+    if np.any((capital <= 0) & (aporte <= 0)):
+        raise ValueError("Informe um capital inicial ou um aporte positivo para calcular a taxa")
+    if not np.any(aporte):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return _saida((montante / capital) ** (1 / tempo) - 1)
+
+    taxa = resolver_bissecao(lambda i: calcular_valor_futuro(capital, i, tempo, aporte) - montante, -0.9999, 10.0)
+    return _saida(taxa)
+
+def calcular_tempo_necessario(capital, montante, taxa, aporte=0.0):
+    """
+    Número de períodos (fracionário) para chegar ao montante, em forma fechada:
+    (1 + i)^n = (montante + aporte/i) / (capital + aporte/i). NaN se inatingível.
+    """
+    capital, montante, taxa, aporte = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (capital, montante, taxa, aporte))
+    )
+    with np.errstate(invalid='ignore', divide='ignore'):
+        divisor = np.where(taxa != 0, taxa, 1.0)
+        crescimento = (montante + aporte / divisor) / (capital + aporte / divisor)
+        tempo = np.where(
+            taxa != 0,
+            np.log(crescimento) / np.log1p(taxa),
+            (montante - capital) / aporte
+        )
+    return _saida(np.where(np.isfinite(tempo) & (tempo >= 0), tempo, np.nan))
+
+def calcular_aporte_necessario(montante, taxa, tempo, capital=0.0):
+    """
+    Aporte por período (ao fim de cada período) necessário para chegar ao
+    montante, em forma fechada
+    """
+    montante, taxa, tempo, capital = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (montante, taxa, tempo, capital))
+    )
+    crescimento = calcular_juros_compostos(1.0, taxa, tempo)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fator_aportes = np.where(taxa != 0, (crescimento - 1) / np.where(taxa != 0, taxa, 1.0), tempo)
+        aporte = (montante - capital * crescimento) / fator_aportes
+    return _saida(np.maximum(aporte, 0.0))
+
+def _prestacao_maxima_unitaria(taxas, prazos, sistemas):
+    """
+    Maior prestação de um financiamento de principal 1: a primeira no SAC, a
+    fixa no Price e a última (juros + principal) no SAC Americano
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        price = np.where(taxas > 0, taxas / (1 - (1 + taxas) ** -prazos), 1 / prazos)
+    return np.select(
+        [sistemas == 'SAC', sistemas == 'Price', sistemas == 'SAC Americano'],
+        [1 / prazos + taxas, price, 1 + taxas],
+        np.nan
+    )
+
+def calcular_principal_maximo(prestacao_maxima, taxa_mensal, num_parcelas, sistema='Price'):
+    """
+    Maior valor financiável sem que nenhuma prestação passe da prestação
+    máxima. Os cronogramas são lineares no principal, então basta dividir pela
+    maior prestação de um financiamento de principal 1.
+    """
+    prestacoes, taxas, prazos, sistemas = np.broadcast_arrays(
+        np.asarray(prestacao_maxima, dtype=float), np.asarray(taxa_mensal, dtype=float),
+        np.asarray(num_parcelas, dtype=float), np.asarray(sistema)
+    )
+    return _saida(prestacoes / _prestacao_maxima_unitaria(taxas, prazos, sistemas))
+
+def calcular_taxa_maxima(valor_principal, prestacao_maxima, num_parcelas, sistema='Price'):
+    """
+    Maior taxa mensal que mantém as prestações dentro da prestação máxima.
+    Fechada no SAC e no SAC Americano; bisseção vetorizada no Price.
+    NaN se nem a taxa zero cabe na prestação.
+    """
+    valores, prestacoes, prazos, sistemas = np.broadcast_arrays(
+        np.asarray(valor_principal, dtype=float), np.asarray(prestacao_maxima, dtype=float),
+        np.asarray(num_parcelas, dtype=float), np.asarray(sistema)
+    )
+    razao = prestacoes / valores
+    price = resolver_bissecao(
+        lambda i: _prestacao_maxima_unitaria(i, prazos, np.full(prazos.shape, 'Price')) - razao,
+        0.0, 10.0
+    )
+    taxa = np.select(
+        [sistemas == 'SAC', sistemas == 'Price', sistemas == 'SAC Americano'],
+        [razao - 1 / prazos, price, razao - 1],
+        np.nan
+    )
+    return _saida(np.where(taxa >= 0, taxa, np.nan))
+
+def calcular_prazo_minimo(valor_principal, prestacao_maxima, taxa_mensal, sistema='Price'):
+    """
+    Menor número de parcelas com prestações dentro da prestação máxima, em
+    forma fechada (arredondado para cima). NaN se nenhum prazo é suficiente
+    (juros do primeiro mês maiores ou iguais à prestação).
+    """
+    valores, prestacoes, taxas, sistemas = np.broadcast_arrays(
+        np.asarray(valor_principal, dtype=float), np.asarray(prestacao_maxima, dtype=float),
+        np.asarray(taxa_mensal, dtype=float), np.asarray(sistema)
+    )
+    juros = valores * taxas
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sac = valores / (prestacoes - juros)
+        price = np.where(taxas > 0, -np.log1p(-juros / prestacoes) / np.log1p(taxas), valores / prestacoes)
+        americano = np.where(prestacoes >= valores + juros, 1.0, np.nan)
+    prazo = np.select([sistemas == 'SAC', sistemas == 'Price', sistemas == 'SAC Americano'],
+                      [sac, price, americano], np.nan)
+    prazo = np.where((prestacoes > juros) & np.isfinite(prazo), np.ceil(prazo - 1e-9), np.nan)
+    return _saida(prazo)
+
+def gerar_tabela_acessibilidade(prestacao_maxima, taxas_mensais, prazos, sistema='Price'):
+    """
+    Tabela de valor máximo financiável para uma prestação: uma linha por taxa
+    mensal e uma coluna por prazo, calculada numa única chamada
+    """
+    taxas = np.asarray(taxas_mensais, dtype=float)
+    prazos = np.asarray(prazos, dtype=int)
+    principais = calcular_principal_maximo(prestacao_maxima, taxas[:, None], prazos[None, :], sistema)
+    return pd.DataFrame(principais, index=pd.Index(taxas, name='Taxa_Mensal'),
+                        columns=pd.Index(prazos, name='Parcelas'))
@@ -0,0 +1,169 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Linhas por bloco: a memória usada depende só deste tamanho, não do histórico
+TAMANHO_BLOCO = 65_536
+
+def ler_blocos(fonte, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Gera blocos de preços (k,) ou (k, N) a partir de:
+    - caminho de um .npy (aberto com memmap, sem carregar o arquivo)
+    - caminho de um CSV (lido em partes, índice na primeira coluna)
+    - array, memmap, Series ou DataFrame (fatiados)
+    - qualquer iterável de blocos (ex.: um gerador de barras)
+    """
+    if isinstance(fonte, (str, os.PathLike)):
+        if str(fonte).endswith('.npy'):
+            fonte = np.load(fonte, mmap_mode='r')
+        else:
+            fonte = pd.read_csv(fonte, index_col=0, chunksize=tamanho_bloco)
+    if isinstance(fonte, (pd.Series, pd.DataFrame)):
+        fonte = fonte.to_numpy()
+
+    if isinstance(fonte, np.ndarray):
+        for inicio in range(0, len(fonte), tamanho_bloco):
+            yield np.asarray(fonte[inicio:inicio + tamanho_bloco], dtype=float)
+    else:
+        for bloco in fonte:
+            yield np.asarray(bloco, dtype=float)
+
+def iniciar_estado_blocos():
+    """
+    Estado vazio do processamento em blocos. Guarda apenas vetores (N,) e a
+    matriz (N, N) de produtos cruzados, nunca a série.
+    """
+    return {'n_ativos': None, 'vetor': None}
+
+def _combinar_momentos(n_a, media_a, m2_a, n_b, media_b, m2_b):
+    """
+    Combina média e soma dos quadrados dos desvios de duas partes (Chan et al.)
+    """
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = np.where(n_b > 0, media_b - media_a, 0.0)
+        peso = np.where(n > 0, n_b / n, 0.0)
+    media = media_a + delta * peso
+    m2 = m2_a + m2_b + delta ** 2 * n_a * peso
+    return n, media, m2
+
+def atualizar_estado_blocos(estado, bloco):
+    """
+    Incorpora um bloco de preços (k,) ou (k, N) ao estado. O último preço do
+    bloco anterior é usado para o primeiro retorno deste.
+    """
+    bloco = np.asarray(bloco, dtype=float)
+    if len(bloco) == 0:
+        return estado
+    if estado['n_ativos'] is None:
+        n_ativos = 1 if bloco.ndim == 1 else bloco.shape[1]
+        zeros = np.zeros(n_ativos)
+        estado = {
+            'n_ativos': n_ativos,
+            'vetor': bloco.ndim == 1,
+            # Retornos simples (volatilidade, retorno médio, Sharpe): Welford por ativo
+            'n': zeros.copy(), 'media': zeros.copy(), 'm2': zeros.copy(),
+            # Log-retornos das datas sem NaN (correlação): médias e produtos cruzados
+            'n_log': 0, 'media_log': zeros.copy(), 'comomentos': np.zeros((n_ativos, n_ativos)),
+            # Níveis e drawdown ('anterior' é a última linha do bloco, mesmo com
+            # NaN, para que os retornos não dependam de onde os blocos são cortados)
+            'nivel_inicial': np.full(n_ativos, np.nan), 'ultimo': np.full(n_ativos, np.nan),
+            'anterior': np.full(n_ativos, np.nan),
+            'pico': np.full(n_ativos, np.nan), 'max_drawdown': zeros.copy()
+        }
+    else:
+        estado = dict(estado)
+
+    precos = bloco.reshape(len(bloco), -1)
+    # Primeiro e último preço válido de cada ativo no bloco (NaN se não houver)
+    validos = ~np.isnan(precos)
+    colunas = np.arange(precos.shape[1])
+    algum = validos.any(axis=0)
+    primeiros = np.where(algum, precos[validos.argmax(axis=0), colunas], np.nan)
+    ultimos = np.where(algum, precos[len(precos) - 1 - validos[::-1].argmax(axis=0), colunas], np.nan)
+    estado['nivel_inicial'] = np.where(np.isnan(estado['nivel_inicial']), primeiros, estado['nivel_inicial'])
+
+    # Retornos, incluindo o que liga o bloco anterior a este
+    niveis = np.vstack([estado['anterior'], precos])
+    retornos = niveis[1:] / niveis[:-1] - 1
+    validos = ~np.isnan(retornos)
+    n_b = validos.sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        media_b = np.where(n_b > 0, np.nansum(retornos, axis=0) / np.maximum(n_b, 1), 0.0)
+    m2_b = np.nansum((retornos - media_b) ** 2, axis=0)
+    estado['n'], estado['media'], estado['m2'] = _combinar_momentos(
+        estado['n'], estado['media'], estado['m2'], n_b, media_b, m2_b
+    )
+
+    log_retornos = np.log(niveis[1:] / niveis[:-1])
+    log_retornos = log_retornos[~np.isnan(log_retornos).any(axis=1)]
+    if len(log_retornos):
+        media_log = log_retornos.mean(axis=0)
+        centrados = log_retornos - media_log
+        n_a, n_b_log = estado['n_log'], len(log_retornos)
+        delta = media_log - estado['media_log']
+        estado['n_log'] = n_a + n_b_log
+        estado['media_log'] = estado['media_log'] + delta * n_b_log / estado['n_log']
+        estado['comomentos'] = (estado['comomentos'] + centrados.T @ centrados
+                                + np.outer(delta, delta) * n_a * n_b_log / estado['n_log'])
+
+    # Pico corrente e pior queda
+    picos = np.fmax.accumulate(np.vstack([estado['pico'], precos]), axis=0)[1:]
+    with np.errstate(invalid='ignore'):
+        estado['max_drawdown'] = np.fmin(estado['max_drawdown'], np.fmin.reduce((precos - picos) / picos, axis=0))
+    estado['pico'] = picos[-1]
+    estado['ultimo'] = np.where(algum, ultimos, estado['ultimo'])
+    estado['anterior'] = precos[-1]
+    return estado
+
+def metricas_do_estado_blocos(estado, periodos_por_ano=252, taxa_livre_risco=0.06):
+    """
+    Métricas finais do estado: as mesmas de calcular_metricas_acao,
+    calcular_max_drawdown e calcular_correlacao_ativos sobre a série inteira
+    (a menos de arredondamento). Escalares para uma série, vetores (N,) e
+    matriz (N, N) para várias.
+    """
+    if estado['n_ativos'] is None:
+        return None
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        desvio = np.where(estado['n'] > 1, np.sqrt(estado['m2'] / (estado['n'] - 1)), 0.0)
+        volatilidade = desvio * np.sqrt(periodos_por_ano)
+        retorno_medio = estado['media'] * periodos_por_ano
+        sharpe = np.where(volatilidade > 0, (retorno_medio - taxa_livre_risco) / volatilidade, 0.0)
+
+        desvios_log = np.sqrt(np.diag(estado['comomentos']))
+        correlacao = estado['comomentos'] / np.outer(desvios_log, desvios_log)
+
+    metricas = {
+        'preco_inicial': estado['nivel_inicial'],
+        'preco_atual': estado['ultimo'],
+        'retorno_periodo': estado['ultimo'] / estado['nivel_inicial'] - 1,
+        'volatilidade': volatilidade,
+        'retorno_medio': retorno_medio,
+        'max_drawdown': estado['max_drawdown'],
+        'sharpe_ratio': sharpe,
+        'observacoes': estado['n'].astype(int)
+    }
+    if estado['vetor']:
+        metricas = {chave: valor[0].item() for chave, valor in metricas.items()}
+    else:
+        metricas['correlacao'] = correlacao
+    return metricas
+
+def calcular_metricas_em_blocos(fonte, tamanho_bloco=TAMANHO_BLOCO, periodos_por_ano=252, taxa_livre_risco=0.06):
+    """
+    Calcula retorno, volatilidade, Sharpe, máximo drawdown e (para várias
+    séries) a correlação dos log-retornos percorrendo a fonte uma única vez,
+    bloco a bloco (ver ler_blocos), com memória independente do tamanho do
+    histórico. Útil para barras de minuto ou ticks de cripto.
+
+    Valores NaN são ignorados nas métricas de cada ativo (os retornos que
+    envolvem um NaN são descartados); na correlação, as datas com algum NaN
+    são descartadas. O resultado não depende do tamanho do bloco.
+    """
+    estado = iniciar_estado_blocos()
+    for bloco in ler_blocos(fonte, tamanho_bloco):
+        estado = atualizar_estado_blocos(estado, bloco)
+    return metricas_do_estado_blocos(estado, periodos_por_ano, taxa_livre_risco)
@@ -0,0 +1,235 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from calendario import contar_dias_uteis
+
+TIPOS_OPCAO = ['call', 'put']
+
+# Coeficientes de Chebyshev de erfc (Numerical Recipes, 3ª ed., erfccheb):
+# erro relativo abaixo de 1e-13 em toda a reta
+_COEFICIENTES_ERFC = np.array([
+    -1.3026537197817094, 6.4196979235649026e-1, 1.9476473204185836e-2, -9.561514786808631e-3,
+    -9.46595344482036e-4, 3.66839497852761e-4, 4.2523324806907e-5, -2.0278578112534e-5,
+    -1.624290004647e-6, 1.303655835580e-6, 1.5626441722e-8, -8.5238095915e-8,
+    6.529054439e-9, 5.059343495e-9, -9.91364156e-10, -2.27365122e-10,
+    9.6467911e-11, 2.394038e-12, -6.886027e-12, 8.94487e-13,
+    3.13092e-13, -1.12708e-13, 3.81e-16, 7.106e-15,
+    -1.523e-15, -9.4e-17, 1.21e-16, -2.8e-17
+])
+
+def _erfc(x):
+    """
+    erfc vetorizado sobre arrays float (o NumPy não tem erf e o SciPy não é
+    dependência do projeto): série de Chebyshev em t = 2 / (2 + |x|),
+    avaliada pela recorrência de Clenshaw
+    """
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x)
+    t = 2 / (2 + z)
+    ty = 4 * t - 2
+    d = np.zeros_like(z)
+    dd = np.zeros_like(z)
+    for coeficiente in _COEFICIENTES_ERFC[:0:-1]:
+        d, dd = ty * d - dd + coeficiente, d
+    resultado = t * np.exp(-z * z + 0.5 * (_COEFICIENTES_ERFC[0] + ty * d) - dd)
+    return np.where(x >= 0, resultado, 2 - resultado)
+
+def _cdf_normal(x):
+    return 0.5 * _erfc(-np.asarray(x, dtype=float) / math.sqrt(2))
+
+def _pdf_normal(x):
+    return np.exp(-0.5 * np.asarray(x, dtype=float) ** 2) / math.sqrt(2 * math.pi)
+
+def _sinal(tipo):
+    """
+    +1 para call e -1 para put (aceita array de tipos)
+    """
+    tipo = np.asarray(tipo)
+    if not np.isin(tipo, TIPOS_OPCAO).all():
+        raise ValueError(f"Tipo de opção desconhecido: {tipo}")
+    return np.where(tipo == 'call', 1.0, -1.0)
+
+def _parametros(preco, strike, prazo, taxa, volatilidade, dividendos):
+    """
+    Converte as taxas anuais efetivas (convenção DU/252 da B3) em contínuas e
+    alinha todos os argumentos por broadcasting
+    """
+    return np.broadcast_arrays(
+        np.asarray(preco, dtype=float), np.asarray(strike, dtype=float), np.asarray(prazo, dtype=float),
+        np.log1p(np.asarray(taxa, dtype=float)), np.asarray(volatilidade, dtype=float),
+        np.log1p(np.asarray(dividendos, dtype=float))
+    )
+
+def _d1_d2(s, k, t, r, sigma, q):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raiz = sigma * np.sqrt(t)
+        d1 = (np.log(s / k) + (r - q + 0.5 * sigma ** 2) * t) / raiz
+    return d1, d1 - raiz
+
+def precificar_black_scholes(preco, strike, prazo, taxa, volatilidade, tipo='call', dividendos=0.0):
+    """
+    Prêmio de opções europeias por Black-Scholes (Merton, com dividend yield).
+
+    Todos os argumentos aceitam arrays e são combinados por broadcasting, então
+    uma cadeia inteira (strikes × vencimentos) é precificada numa única chamada.
+    prazo: em anos (dias úteis / 252)
+    taxa, dividendos: anuais efetivos (ex.: Selic 0.1075)
+    volatilidade: anual (ex.: a de calcular_metricas_acao)
+    """
+    s, k, t, r, sigma, q = _parametros(preco, strike, prazo, taxa, volatilidade, dividendos)
+    sinal = _sinal(tipo)
+    d1, d2 = _d1_d2(s, k, t, r, sigma, q)
+    premio = sinal * (s * np.exp(-q * t) * _cdf_normal(sinal * d1) - k * np.exp(-r * t) * _cdf_normal(sinal * d2))
+
+    # No vencimento (ou sem volatilidade) vale o payoff do termo
+    intrinseco = np.maximum(sinal * (s * np.exp(-q * t) - k * np.exp(-r * t)), 0.0)
+    return np.where((t > 0) & (sigma > 0), premio, intrinseco)
+
+def calcular_gregas(preco, strike, prazo, taxa, volatilidade, tipo='call', dividendos=0.0):
+    """
+    Gregas de Black-Scholes: delta, gama, vega (por 1 ponto percentual de
+    volatilidade), theta (por dia útil) e rho (por 1 ponto percentual de juros)
+    """
+    s, k, t, r, sigma, q = _parametros(preco, strike, prazo, taxa, volatilidade, dividendos)
+    sinal = _sinal(tipo)
+    d1, d2 = _d1_d2(s, k, t, r, sigma, q)
+    desconto_q, desconto_r = np.exp(-q * t), np.exp(-r * t)
+    densidade = _pdf_normal(d1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gama = desconto_q * densidade / (s * sigma * np.sqrt(t))
+        theta = (-s * desconto_q * densidade * sigma / (2 * np.sqrt(t))
+                 - sinal * r * k * desconto_r * _cdf_normal(sinal * d2)
+                 + sinal * q * s * desconto_q * _cdf_normal(sinal * d1))
+    return {
+        'delta': sinal * desconto_q * _cdf_normal(sinal * d1),
+        'gama': gama,
+        'vega': s * desconto_q * densidade * np.sqrt(t) / 100,
+        'theta': theta / 252,
+        'rho': sinal * k * t * desconto_r * _cdf_normal(sinal * d2) / 100
+    }
+
+def precificar_binomial(preco, strike, prazo, taxa, volatilidade, tipo='call', dividendos=0.0,
+                        americana=True, passos=200):
+    """
+    Prêmio por árvore binomial de Cox-Ross-Rubinstein, com exercício antecipado
+    (americana, como a maioria das opções de ações na B3) ou só no vencimento.
+
+    As opções são avaliadas juntas: a árvore é percorrida de trás para frente
+    uma vez, com cada nível calculado para todas as opções ao mesmo tempo.
+    """
+    s, k, t, r, sigma, q, sinal = np.broadcast_arrays(
+        *_parametros(preco, strike, prazo, taxa, volatilidade, dividendos), _sinal(tipo)
+    )
+    formato = s.shape
+    s, k, t, r, sigma, q, sinal = (x.ravel() for x in (s, k, t, r, sigma, q, sinal))
+
+    dt = np.maximum(t, 1e-12) / passos
+    subida = np.exp(np.maximum(sigma, 1e-12) * np.sqrt(dt))
+    descida = 1 / subida
+    probabilidade = np.clip((np.exp((r - q) * dt) - descida) / (subida - descida), 0.0, 1.0)
+    desconto = np.exp(-r * dt)
+
+    # Preços no vencimento: s * u^(passos - j) * d^j
+    j = np.arange(passos + 1)
+    precos = s[:, None] * subida[:, None] ** (passos - 2 * j)[None, :]
+    valores = np.maximum(sinal[:, None] * (precos - k[:, None]), 0.0)
+
+    for passo in range(passos - 1, -1, -1):
+        valores = desconto[:, None] * (probabilidade[:, None] * valores[:, :-1]
+                                       + (1 - probabilidade[:, None]) * valores[:, 1:])
+        if americana:
+            precos = precos[:, :-1] * descida[:, None]
+            valores = np.maximum(valores, sinal[:, None] * (precos - k[:, None]))
+
+    return valores[:, 0].reshape(formato)
+
+def calcular_volatilidade_implicita(premio, preco, strike, prazo, taxa, tipo='call', dividendos=0.0,
+                                    tolerancia=1e-8, max_iteracoes=100):
+    """
+    Volatilidade implícita de um lote de opções europeias: Newton-Raphson com
+    salvaguarda por bisseção, todas as opções iteradas juntas.
+    Retorna NaN quando o prêmio está fora dos limites de não arbitragem.
+    """
+    premio, s, k, t, r, q = np.broadcast_arrays(
+        np.asarray(premio, dtype=float), *_parametros(preco, strike, prazo, taxa, 0.0, dividendos)[:4],
+        np.log1p(np.asarray(dividendos, dtype=float))
+    )
+    tipo = np.broadcast_to(np.asarray(tipo), premio.shape)
+    sinal = _sinal(tipo)
+    taxa_efetiva, dividendos_efetivos = np.expm1(r), np.expm1(q)
+
+    # Limites de não arbitragem: entre o valor intrínseco descontado e o teto
+    minimo = np.maximum(sinal * (s * np.exp(-q * t) - k * np.exp(-r * t)), 0.0)
+    maximo = np.where(sinal > 0, s * np.exp(-q * t), k * np.exp(-r * t))
+    valido = (premio > minimo) & (premio < maximo) & (t > 0)
+
+    inferior = np.full(premio.shape, 1e-6)
+    superior = np.full(premio.shape, 5.0)
+    sigma = np.full(premio.shape, 0.3)
+    for _ in range(max_iteracoes):
+        calculado = precificar_black_scholes(s, k, t, taxa_efetiva, sigma, tipo, dividendos_efetivos)
+        diferenca = calculado - premio
+        if np.all(np.abs(diferenca[valido]) < tolerancia):
+            break
+        superior = np.where(diferenca > 0, sigma, superior)
+        inferior = np.where(diferenca <= 0, sigma, inferior)
+
+        # Só a vega entra no passo de Newton: calculada direto, sem as demais gregas
+        d1, _ = _d1_d2(s, k, t, r, sigma, q)
+        vega = s * np.exp(-q * t) * _pdf_normal(d1) * np.sqrt(t)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = sigma - diferenca / vega
+        fora = ~np.isfinite(newton) | (newton <= inferior) | (newton >= superior)
+        sigma = np.where(fora, (inferior + superior) / 2, newton)
+
+    return np.where(valido, sigma, np.nan)
+
+def precificar_cadeia(preco, strikes, vencimentos, taxa, volatilidade, tipos=('call', 'put'), dividendos=0.0,
+                      data_base=None, americana=False, passos=200):
+    """
+    Precifica uma cadeia de opções (todos os strikes × vencimentos × tipos)
+    numa única chamada vetorizada.
+
+    vencimentos: prazos em dias úteis ou datas (contadas a partir de
+        data_base pelo calendário da B3)
+    volatilidade: escalar (ex.: calcular_metricas_acao(dados)['volatilidade'])
+        ou uma por strike, no formato de strikes
+    americana: usa a árvore binomial para o prêmio (as gregas são sempre de Black-Scholes)
+
+    Retorna um DataFrame com uma opção por linha.
+    """
+    strikes = np.asarray(strikes, dtype=float)
+    vencimentos = np.atleast_1d(vencimentos)
+    if np.issubdtype(vencimentos.dtype, np.number):
+        dias = vencimentos.astype(int)
+    else:
+        data_base = pd.Timestamp.today().normalize() if data_base is None else pd.Timestamp(data_base)
+        dias = np.asarray(contar_dias_uteis(np.repeat(data_base, len(vencimentos)), vencimentos), dtype=int)
+
+    # Grade (tipos, vencimentos, strikes)
+    tipo = np.asarray(tipos)[:, None, None]
+    prazo = (dias / 252)[None, :, None]
+    strike = strikes[None, None, :]
+    vol = np.broadcast_to(np.asarray(volatilidade, dtype=float), strikes.shape)[None, None, :]
+
+    if americana:
+        premio = precificar_binomial(preco, strike, prazo, taxa, vol, tipo, dividendos, True, passos)
+    else:
+        premio = precificar_black_scholes(preco, strike, prazo, taxa, vol, tipo, dividendos)
+    gregas = calcular_gregas(preco, strike, prazo, taxa, vol, tipo, dividendos)
+
+    formato = premio.shape
+    cadeia = pd.DataFrame({
+        'Tipo': np.broadcast_to(tipo, formato).ravel(),
+        'Vencimento': np.broadcast_to(vencimentos[None, :, None], formato).ravel(),
+        'Dias_Uteis': np.broadcast_to(dias[None, :, None], formato).ravel(),
+        'Strike': np.broadcast_to(strike, formato).ravel(),
+        'Volatilidade': np.broadcast_to(vol, formato).ravel(),
+        'Premio': premio.ravel()
+    })
+    for nome, valores in gregas.items():
+        cadeia[nome.capitalize()] = np.broadcast_to(valores, formato).ravel()
+    return cadeia
@@ -0,0 +1,158 @@
+import cProfile
+import glob
+import hashlib
+import hmac
+import json
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Modo de perfilamento: ligado para todos por variável de ambiente, ou só para
+# quem abrir o app com ?perfil=<token> quando CALCULADORA_PERFILAMENTO_TOKEN
+# estiver definido (sem token, o parâmetro da URL é ignorado)
+PERFILAMENTO_ATIVO = os.environ.get('CALCULADORA_PERFILAMENTO', '0') == '1'
+TOKEN_PERFILAMENTO = os.environ.get('CALCULADORA_PERFILAMENTO_TOKEN', '')
+DIRETORIO_PERFIS = os.environ.get(
+    'CALCULADORA_DIRETORIO_PERFIS',
+    os.path.join(tempfile.gettempdir(), 'calculadora_perfis')
+)
+
+# Só os perfis mais recentes são mantidos no diretório
+MAXIMO_PERFIS = int(os.environ.get('CALCULADORA_MAXIMO_PERFIS', 20))
+
+DIRETORIO_PROJETO = os.path.dirname(os.path.abspath(__file__))
+
+# Só um perfil por vez: o cProfile não aceita dois perfis ativos no mesmo processo
+_trava_perfil = threading.Lock()
+
+def perfilamento_ativo(parametros=None):
+    """
+    Indica se a execução deve ser perfilada: variável de ambiente ou
+    parâmetro 'perfil' da URL igual ao token de perfilamento
+    """
+    if PERFILAMENTO_ATIVO:
+        return True
+    valor = (parametros or {}).get('perfil')
+    if isinstance(valor, list):
+        valor = valor[-1] if valor else None
+    return bool(TOKEN_PERFILAMENTO) and valor is not None and hmac.compare_digest(str(valor), TOKEN_PERFILAMENTO)
+
+def hash_entradas_pagina(pagina, entradas):
+    """
+    Hash curto da página e das entradas (valores que não são JSON viram texto)
+    """
+    texto = json.dumps({'pagina': pagina, 'entradas': entradas}, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode()).hexdigest()[:12]
+
+def _biblioteca(arquivo, funcao):
+    """
+    Origem de uma função do perfil: módulo do projeto, pacote instalado,
+    'python' (biblioteca padrão) ou 'builtins'
+    """
+    caminho = os.path.abspath(arquivo) if arquivo != '~' else arquivo
+    if caminho.startswith(DIRETORIO_PROJETO + os.sep):
+        return os.path.splitext(os.path.relpath(caminho, DIRETORIO_PROJETO))[0]
+
+    partes = arquivo.replace('\\', '/').split('/')
+    for pasta in ('site-packages', 'dist-packages'):
+        if pasta in partes and partes.index(pasta) + 1 < len(partes):
+            return partes[partes.index(pasta) + 1].split('.')[0]
+
+    if arquivo.startswith('<frozen'):
+        return 'python'
+    if arquivo == '~':
+        # Funções em C: atribuídas ao pacote que aparece no nome, se houver
+        nome = re.search(r"(numpy|pandas|plotly|pyarrow)", funcao)
+        return nome.group(1) if nome else 'builtins'
+    return 'python'
+
+def _remover_perfis_antigos(diretorio, manter=None):
+    """
+    Apaga os arquivos .prof mais antigos do diretório, mantendo os 'manter'
+    mais recentes (padrão MAXIMO_PERFIS)
+    """
+    manter = MAXIMO_PERFIS if manter is None else manter
+    arquivos = sorted(glob.glob(os.path.join(diretorio, '*.prof')), key=os.path.getmtime, reverse=True)
+    for arquivo in arquivos[manter:]:
+        try:
+            os.remove(arquivo)
+        except OSError:
+            pass
+
+def _tabela_perfil(estatisticas):
+    linhas = []
+    for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in estatisticas.stats.items():
+        linhas.append({
+            'Funcao': funcao if arquivo == '~' else f"{funcao} ({os.path.basename(arquivo)}:{linha})",
+            'Biblioteca': _biblioteca(arquivo, funcao),
+            'Chamadas': chamadas,
+            'Tempo_Proprio': proprio,
+            'Tempo_Acumulado': acumulado
+        })
+    return pd.DataFrame(linhas, columns=['Funcao', 'Biblioteca', 'Chamadas', 'Tempo_Proprio', 'Tempo_Acumulado'])
+
+def resumir_perfil(estatisticas, n=20, ordem='Tempo_Acumulado'):
+    """
+    As n funções com maior tempo ('Tempo_Acumulado' ou 'Tempo_Proprio', em s)
+    """
+    tabela = _tabela_perfil(estatisticas)
+    return tabela.sort_values(ordem, ascending=False).head(n).reset_index(drop=True)
+
+def agrupar_por_biblioteca(estatisticas):
+    """
+    Tempo próprio somado por origem (módulos do projeto, pandas, plotly...),
+    com a fração do total
+    """
+    tabela = _tabela_perfil(estatisticas).groupby('Biblioteca')[['Tempo_Proprio', 'Chamadas']].sum()
+    tabela['Fracao'] = tabela['Tempo_Proprio'] / tabela['Tempo_Proprio'].sum()
+    return tabela.sort_values('Tempo_Proprio', ascending=False)
+
+@contextmanager
+def perfilar(pagina, entradas=None, n=20, diretorio=None):
+    """
+    Perfila o bloco com cProfile e grava o resultado em
+    <diretorio>/<pagina>_<hash das entradas>_<horário>.prof (formato pstats,
+    aberto por snakeviz, gprof2dot ou python -m pstats). Só os MAXIMO_PERFIS
+    arquivos mais recentes do diretório são mantidos.
+
+    Produz um dicionário preenchido ao final do bloco com 'pagina', 'hash',
+    'arquivo', 'duracao', 'funcoes' (top n) e 'bibliotecas'. Se outro perfil
+    estiver em andamento (outra sessão), o bloco roda sem perfil e 'arquivo'
+    fica None. Só a thread que executa o bloco é perfilada: o tempo esperando
+    buscas em outras threads aparece como espera de trava.
+    """
+    resultado = {'pagina': pagina, 'hash': hash_entradas_pagina(pagina, entradas or {}), 'arquivo': None}
+    if not _trava_perfil.acquire(blocking=False):
+        yield resultado
+        return
+
+    perfil = cProfile.Profile()
+    inicio = time.perf_counter()
+    try:
+        perfil.enable()
+        yield resultado
+    finally:
+        perfil.disable()
+        _trava_perfil.release()
+        resultado['duracao'] = time.perf_counter() - inicio
+
+        diretorio = diretorio or DIRETORIO_PERFIS
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        nome = unicodedata.normalize('NFKD', pagina).encode('ascii', 'ignore').decode()
+        nome = re.sub(r'\W+', '_', nome.lower()).strip('_')
+        resultado['arquivo'] = os.path.join(
+            diretorio, f"{nome}_{resultado['hash']}_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+        )
+        perfil.dump_stats(resultado['arquivo'])
+        _remover_perfis_antigos(diretorio)
+
+        estatisticas = pstats.Stats(perfil)
+        resultado['funcoes'] = resumir_perfil(estatisticas, n)
+        resultado['bibliotecas'] = agrupar_por_biblioteca(estatisticas)
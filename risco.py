@@ -0,0 +1,214 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from funcoes_financeiras import calcular_correlacao_ativos
+
+_NORMAL = NormalDist()
+
+METODOS_VAR = ['historico', 'parametrico', 'cornish_fisher', 'ewma']
+
+def _como_matriz(retornos):
+    """
+    Converte retornos (T,) ou (T, N) em matriz (T, N), indicando se era um vetor
+    """
+    retornos = np.asarray(retornos, dtype=float)
+    if retornos.ndim == 1:
+        return retornos[:, None], True
+    return retornos, False
+
+def calcular_volatilidade_ewma(retornos, decaimento=0.94, aquecimento=20):
+    """
+    Calcula a volatilidade EWMA (RiskMetrics) período a período.
+    Retorna uma matriz (T, N) com a volatilidade condicional de cada data,
+    estimada com os retornos até a data anterior.
+
+    A semente é a média dos quadrados dos primeiros 'aquecimento' retornos
+    (limitado a T - 1), então essas datas iniciais ficam NaN e nenhuma
+    estimativa usa retornos posteriores a ela.
+    """
+    matriz, vetor = _como_matriz(retornos)
+    variancias = np.full(matriz.shape, np.nan)
+
+    inicio = min(int(aquecimento), len(matriz) - 1)
+    if inicio >= 1:
+        variancias[inicio] = np.nanmean(matriz[:inicio] ** 2, axis=0)
+        for t in range(inicio + 1, len(matriz)):
+            variancias[t] = decaimento * variancias[t - 1] + (1 - decaimento) * matriz[t - 1] ** 2
+
+    volatilidades = np.sqrt(variancias)
+    return volatilidades[:, 0] if vetor else volatilidades
+
+METODOS_CORRELACAO = ['movel', 'ewma']
+
+def calcular_correlacao_movel(precos_ativos, janela=20, metodo='movel', decaimento=0.94, triangular=False):
+    """
+    Matrizes de correlação dos log-retornos ao longo do tempo, com a
+    covariância atualizada recursivamente a cada data (O(N²) por data, sem
+    recalcular a janela inteira).
+
+    metodo: 'movel' (janela de tamanho fixo: entra o retorno novo e sai o mais
+        antigo) ou 'ewma' (RiskMetrics, média zero, semeada com a covariância
+        das primeiras 'janela' datas)
+    triangular: se True, guarda só o triângulo superior (sem a diagonal),
+        na ordem de np.triu_indices(N, 1)
+
+    Retorna um array float32 (T - 1, N, N), ou (T - 1, N(N-1)/2) se
+    triangular, alinhado com os retornos; as primeiras janela - 1 datas são NaN.
+    """
+    if metodo not in METODOS_CORRELACAO:
+        raise ValueError(f"Método desconhecido: {metodo}")
+
+    retornos = np.diff(np.log(np.asarray(precos_ativos, dtype=float)), axis=0)
+    t, n = retornos.shape
+    janela = int(janela)
+    if not 2 <= janela <= t:
+        raise ValueError(f"A janela deve estar entre 2 e {t} retornos")
+
+    superior = np.triu_indices(n, 1)
+    saida = np.full((t, len(superior[0])) if triangular else (t, n, n), np.nan, dtype=np.float32)
+
+    def registrar(i, covariancia):
+        desvios = np.sqrt(np.diag(covariancia))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlacao = covariancia / np.outer(desvios, desvios)
+        saida[i] = correlacao[superior] if triangular else correlacao
+
+    if metodo == 'movel':
+        # Somas e produtos cruzados da janela, atualizados a cada data
+        # (retornos centrados na média geral para reduzir o cancelamento numérico)
+        centrados = retornos - retornos.mean(axis=0)
+        soma = centrados[:janela].sum(axis=0)
+        cruzados = centrados[:janela].T @ centrados[:janela]
+        for i in range(janela - 1, t):
+            if i >= janela:
+                entra, sai = centrados[i], centrados[i - janela]
+                soma += entra - sai
+                cruzados += np.outer(entra, entra) - np.outer(sai, sai)
+            registrar(i, cruzados - np.outer(soma, soma) / janela)
+    else:
+        covariancia = retornos[:janela].T @ retornos[:janela] / janela
+        registrar(janela - 1, covariancia)
+        for i in range(janela, t):
+            covariancia = decaimento * covariancia + (1 - decaimento) * np.outer(retornos[i], retornos[i])
+            registrar(i, covariancia)
+
+    return saida
+
+def expandir_triangulo(triangulos, n):
+    """
+    Reconstrói as matrizes (T, N, N) a partir dos triângulos superiores (T, K)
+    """
+    triangulos = np.asarray(triangulos)
+    linhas, colunas = np.triu_indices(n, 1)
+    matrizes = np.zeros(triangulos.shape[:-1] + (n, n), dtype=triangulos.dtype)
+    matrizes[..., linhas, colunas] = triangulos
+    matrizes[..., colunas, linhas] = triangulos
+    diagonal = np.arange(n)
+    matrizes[..., diagonal, diagonal] = np.where(np.isnan(triangulos).all(axis=-1, keepdims=True), np.nan, 1)
+    return matrizes
+
+def _quantis_cornish_fisher(z, assimetria, curtose_excesso):
+    """
+    Ajusta quantis normais z (L,) pela assimetria e curtose de cada ativo (N,)
+    """
+    z = z[:, None]
+    return (z
+            + (z ** 2 - 1) * assimetria / 6
+            + (z ** 3 - 3 * z) * curtose_excesso / 24
+            - (2 * z ** 3 - 5 * z) * assimetria ** 2 / 36)
+
+def calcular_var_cvar(retornos, niveis=(0.95, 0.99), horizontes=(1,), metodo='historico', decaimento=0.94):
+    """
+    Calcula VaR e CVaR (perdas como frações positivas) para vários níveis de
+    confiança e horizontes, para todos os ativos de uma vez.
+
+    retornos: (T,) ou (T, N), um ativo por coluna
+    metodo: 'historico', 'parametrico' (normal), 'cornish_fisher' ou 'ewma'
+
+    Retorna {'var': ..., 'cvar': ...} com formato (L, H, N), ou (L, H) para um
+    único ativo. Horizontes maiores que 1 usam a regra da raiz do tempo.
+    """
+    if metodo not in METODOS_VAR:
+        raise ValueError(f"Método desconhecido: {metodo}")
+
+    matriz, vetor = _como_matriz(retornos)
+    niveis = np.asarray(niveis, dtype=float)
+    horizontes = np.asarray(horizontes, dtype=float)
+    caudas = 1 - niveis
+
+    media = np.nanmean(matriz, axis=0)
+    desvio = np.nanstd(matriz, axis=0, ddof=1)
+    z = np.array([_NORMAL.inv_cdf(c) for c in caudas])
+
+    if metodo == 'historico':
+        quantis = np.nanquantile(matriz, caudas, axis=0)
+        na_cauda = matriz[:, None, :] <= quantis[None, :, :]
+        var = -quantis
+        cvar = -np.nansum(np.where(na_cauda, matriz[:, None, :], 0.0), axis=0) / na_cauda.sum(axis=0)
+        media_h = 0.0
+
+    elif metodo == 'cornish_fisher':
+        padronizados = (matriz - media) / desvio
+        assimetria = np.nanmean(padronizados ** 3, axis=0)
+        curtose_excesso = np.nanmean(padronizados ** 4, axis=0) - 3
+        var = -_quantis_cornish_fisher(z, assimetria, curtose_excesso) * desvio
+
+        # CVaR: média dos quantis ajustados ao longo da cauda
+        grade = (np.arange(200) + 0.5) / 200
+        cvar = np.empty_like(var)
+        for i, cauda in enumerate(caudas):
+            z_cauda = np.array([_NORMAL.inv_cdf(p) for p in grade * cauda])
+            cvar[i] = -_quantis_cornish_fisher(z_cauda, assimetria, curtose_excesso).mean(axis=0) * desvio
+        media_h = media
+
+    else:
+        if metodo == 'ewma':
+            # Previsão para o período seguinte: a última variância condicional
+            # usa os retornos até T-1, então o último retorno entra aqui
+            variancia = calcular_volatilidade_ewma(matriz, decaimento)[-1] ** 2
+            desvio = np.sqrt(decaimento * variancia + (1 - decaimento) * matriz[-1] ** 2)
+            media = np.zeros_like(desvio)
+        densidade = np.array([_NORMAL.pdf(x) for x in z])
+        var = -z[:, None] * desvio
+        cvar = (densidade / caudas)[:, None] * desvio
+        media_h = media
+
+    # Escala para os horizontes: (L, 1, N) * (1, H, 1)
+    raiz_h = np.sqrt(horizontes)[None, :, None]
+    media_h = np.broadcast_to(media_h, var.shape[-1:])[None, None, :] * horizontes[None, :, None]
+    var = var[:, None, :] * raiz_h - media_h
+    cvar = cvar[:, None, :] * raiz_h - media_h
+
+    if vetor:
+        return {'var': var[..., 0], 'cvar': cvar[..., 0]}
+    return {'var': var, 'cvar': cvar}
+
+def calcular_var_portfolio(precos_ativos, pesos, niveis=(0.95, 0.99), horizontes=(1,), metodo='parametrico'):
+    """
+    Calcula VaR e CVaR de um portfólio a partir dos preços (T, N) e dos pesos.
+    O método paramétrico usa a covariância montada a partir de
+    calcular_correlacao_ativos; os demais usam a série de retornos do portfólio.
+    Retorna {'var': (L, H), 'cvar': (L, H)}.
+    """
+    precos_ativos = np.asarray(precos_ativos, dtype=float)
+    pesos = np.asarray(pesos, dtype=float)
+    retornos = np.diff(np.log(precos_ativos), axis=0)
+
+    if metodo != 'parametrico':
+        return calcular_var_cvar(retornos @ pesos, niveis, horizontes, metodo)
+
+    desvios = np.std(retornos, axis=0, ddof=1)
+    covariancia = calcular_correlacao_ativos(precos_ativos) * np.outer(desvios, desvios)
+
+    media_p = retornos.mean(axis=0) @ pesos
+    desvio_p = np.sqrt(pesos @ covariancia @ pesos)
+
+    caudas = 1 - np.asarray(niveis, dtype=float)
+    z = np.array([_NORMAL.inv_cdf(c) for c in caudas])
+    densidade = np.array([_NORMAL.pdf(x) for x in z])
+    horizontes = np.asarray(horizontes, dtype=float)
+
+    var = -z[:, None] * desvio_p * np.sqrt(horizontes) - media_p * horizontes
+    cvar = (densidade / caudas)[:, None] * desvio_p * np.sqrt(horizontes) - media_p * horizontes
+    return {'var': var, 'cvar': cvar}
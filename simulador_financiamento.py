@@ -0,0 +1,218 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from curva import eh_curva, taxas_forward_mensais
+
+SISTEMAS = ['SAC', 'Price']
+
+MODOS_AMORTIZACAO = ['prazo', 'prestacao']
+
+def _correcoes(indexador, inicio, quantidade):
+    """
+    Recorta a correção monetária mensal (TR/IPCA) dos períodos inicio+1 .. inicio+quantidade
+    """
+    if indexador is None:
+        return np.zeros(quantidade)
+    if np.isscalar(indexador):
+        return np.full(quantidade, float(indexador))
+    indexador = np.asarray(indexador, dtype=float)
+    trecho = indexador[inicio:inicio + quantidade]
+    return np.concatenate([trecho, np.zeros(quantidade - len(trecho))])
+
+def _taxas(taxa, inicio, quantidade):
+    """
+    Recorta as taxas dos períodos inicio+1 .. inicio+quantidade: taxa fixa ou
+    trajetória por período (pós-fixado), que repete a última taxa após o fim
+    """
+    if np.isscalar(taxa):
+        return np.full(quantidade, float(taxa))
+    taxa = np.asarray(taxa, dtype=float)
+    trecho = taxa[inicio:inicio + quantidade]
+    return np.concatenate([trecho, np.full(quantidade - len(trecho), taxa[-1])])
+
+def _calcular_trecho(saldo, taxa, parcelas_restantes, sistema, correcao):
+    """
+    Calcula de forma vetorizada len(correcao) períodos de um trecho sem eventos.
+    A cada período o saldo é corrigido e então cai pelo fator do sistema, o que
+    permite obter todos os saldos com um único produto acumulado. taxa pode
+    ser um array com a taxa de cada período (o Price recalcula a prestação).
+    """
+    restantes = parcelas_restantes - np.arange(len(correcao))
+
+    if sistema == 'SAC':
+        fator = (restantes - 1) / restantes
+    else:
+        # Saldo após pagar uma prestação Price = saldo * a(r-1) / a(r)
+        anuidade = lambda r: (1 - (1 + taxa) ** -r) / taxa
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fator = np.where(np.asarray(taxa) == 0, (restantes - 1) / restantes,
+                             anuidade(restantes - 1) / anuidade(restantes))
+
+    saldos = saldo * np.cumprod((1 + correcao) * fator)
+    corrigidos = np.concatenate([[saldo], saldos[:-1]]) * (1 + correcao)
+    juros = corrigidos * taxa
+    amortizacao = corrigidos - saldos
+
+    return pd.DataFrame({
+        'Prestacao': juros + amortizacao,
+        'Amortizacao': amortizacao,
+        'Juros': juros,
+        'Saldo_Devedor': np.maximum(saldos, 0),
+        'Amortizacao_Extra': 0.0,
+        'Taxa': taxa
+    })
+
+def _novo_prazo(saldo, taxa, sistema, ultima_linha, parcelas_restantes):
+    """
+    Prazo restante que mantém a prestação (Price) ou a amortização (SAC) atuais
+    após uma amortização extraordinária, arredondado para cima
+    """
+    if saldo <= 1e-9:
+        return 0
+    if sistema == 'SAC' or taxa == 0:
+        referencia = ultima_linha['Amortizacao'] if sistema == 'SAC' else ultima_linha['Prestacao']
+        prazo = saldo / referencia
+    else:
+        prestacao = ultima_linha['Prestacao']
+        if saldo * taxa >= prestacao:
+            return parcelas_restantes
+        prazo = -math.log(1 - saldo * taxa / prestacao) / math.log(1 + taxa)
+    return min(parcelas_restantes, max(1, math.ceil(prazo - 1e-9)))
+
+def _simular(saldo, taxa, parcelas_restantes, periodo, eventos, sistema, indexador, prefixo=None):
+    """
+    Simula o cronograma a partir de um estado (saldo, taxa, prazo restante) logo
+    após o pagamento da parcela 'periodo', aplicando os eventos seguintes.
+    O prefixo, se informado, são as parcelas já calculadas até 'periodo'.
+    """
+    eventos = sorted(eventos, key=lambda e: e['periodo'])
+    if eh_curva(taxa):
+        taxa = taxas_forward_mensais(taxa, periodo + parcelas_restantes)
+    trechos = [prefixo] if prefixo is not None and not prefixo.empty else []
+    ultima_linha = trechos[-1].iloc[-1] if trechos else None
+    if ultima_linha is None and eventos:
+        # Antes da primeira parcela, o modo 'prazo' mantém a parcela original
+        ultima_linha = _calcular_trecho(saldo, _taxas(taxa, periodo, 1), parcelas_restantes, sistema,
+                                        _correcoes(indexador, periodo, 1)).iloc[0]
+    posicao = 0
+
+    while parcelas_restantes > 0 and saldo > 1e-9:
+        # Eventos da data atual (taxa antes de aportes)
+        while posicao < len(eventos) and eventos[posicao]['periodo'] <= periodo:
+            evento = eventos[posicao]
+            posicao += 1
+            if evento['periodo'] < periodo:
+                continue
+            if 'taxa_mensal' in evento:
+                taxa = evento['taxa_mensal']
+            if evento.get('valor', 0) > 0:
+                valor = min(evento['valor'], saldo)
+                saldo -= valor
+                if trechos:
+                    trechos[-1].loc[trechos[-1].index[-1], 'Amortizacao_Extra'] += valor
+                    trechos[-1].loc[trechos[-1].index[-1], 'Saldo_Devedor'] = max(0, saldo)
+                if evento.get('modo', 'prazo') == 'prazo':
+                    parcelas_restantes = _novo_prazo(saldo, _taxas(taxa, periodo, 1)[0], sistema, ultima_linha,
+                                                     parcelas_restantes)
+
+        if parcelas_restantes <= 0 or saldo <= 1e-9:
+            break
+
+        proximo = eventos[posicao]['periodo'] if posicao < len(eventos) else math.inf
+        quantidade = int(min(parcelas_restantes, proximo - periodo))
+
+        trecho = _calcular_trecho(saldo, _taxas(taxa, periodo, quantidade), parcelas_restantes, sistema,
+                                  _correcoes(indexador, periodo, quantidade))
+        trecho.insert(0, 'Periodo', np.arange(periodo + 1, periodo + quantidade + 1))
+        trechos.append(trecho)
+
+        saldo = trecho['Saldo_Devedor'].iloc[-1]
+        ultima_linha = trecho.iloc[-1]
+        periodo += quantidade
+        parcelas_restantes -= quantidade
+
+    if not trechos:
+        return pd.DataFrame(columns=['Periodo', 'Prestacao', 'Amortizacao', 'Juros', 'Saldo_Devedor',
+                                     'Amortizacao_Extra', 'Taxa'])
+    return pd.concat(trechos, ignore_index=True)
+
+def simular_financiamento(valor_principal, taxa_mensal, num_parcelas, sistema='SAC', eventos=(), indexador=None):
+    """
+    Simula um financiamento SAC ou Price com amortizações extraordinárias,
+    mudanças de taxa e correção monetária (TR/IPCA).
+
+    taxa_mensal: taxa fixa, array com a taxa de cada mês ou uma curva de juros
+        (curva.construir_curva), da qual são usados os forwards mensais
+
+    eventos: lista de dicionários com 'periodo' (após o pagamento da parcela) e
+        'valor' + 'modo' ('prazo' reduz o prazo, 'prestacao' reduz a prestação)
+        e/ou 'taxa_mensal' (nova taxa a partir do período seguinte)
+    indexador: correção mensal constante ou array por período
+
+    Retorna a tabela no formato de calcular_amortizacao_* com as colunas
+    adicionais Amortizacao_Extra e Taxa.
+    """
+    if sistema not in SISTEMAS:
+        raise ValueError(f"Sistema desconhecido: {sistema}")
+    return _simular(valor_principal, taxa_mensal, num_parcelas, 0, list(eventos), sistema, indexador)
+
+def aplicar_eventos(tabela, eventos, sistema='SAC', indexador=None, taxa_mensal=None):
+    """
+    Aplica eventos a um cronograma de simular_financiamento, reaproveitando as
+    parcelas até o primeiro evento e recalculando apenas a cauda. Em
+    financiamentos pós-fixados, taxa_mensal (array ou curva) é a trajetória de
+    taxas original; sem ela a cauda segue com a última taxa da tabela.
+    """
+    eventos = list(eventos)
+    if not eventos or tabela.empty:
+        return tabela
+
+    inicio = int(min(e['periodo'] for e in eventos))
+    prefixo = tabela[tabela['Periodo'] <= inicio].copy()
+    parcelas_restantes = int(tabela['Periodo'].iloc[-1]) - inicio
+    if eh_curva(taxa_mensal):
+        taxa_mensal = taxas_forward_mensais(taxa_mensal, int(tabela['Periodo'].iloc[-1]))
+
+    if prefixo.empty:
+        # Evento antes da primeira parcela: recupera o principal e refaz tudo
+        primeira = tabela.iloc[0]
+        corrigido = primeira['Saldo_Devedor'] + primeira['Amortizacao'] + primeira['Amortizacao_Extra']
+        principal = corrigido / (1 + _correcoes(indexador, 0, 1)[0])
+        taxa = primeira['Taxa'] if taxa_mensal is None else taxa_mensal
+        return _simular(principal, taxa, parcelas_restantes, 0, eventos, sistema, indexador)
+
+    ultima_linha = prefixo.iloc[-1]
+    taxa = ultima_linha['Taxa'] if taxa_mensal is None else taxa_mensal
+    return _simular(ultima_linha['Saldo_Devedor'], taxa, parcelas_restantes, inicio,
+                    eventos, sistema, indexador, prefixo)
+
+def simular_cenarios_amortizacao(valor_principal, taxa_mensal, num_parcelas, cenarios, sistema='SAC', indexador=None):
+    """
+    Simula vários cenários de amortização extraordinária para o mesmo
+    financiamento. O cronograma base é calculado uma vez e cada cenário
+    recalcula apenas a cauda a partir do seu primeiro evento.
+
+    cenarios: dicionário {nome: lista de eventos}
+
+    Retorna (tabelas por cenário, DataFrame resumo comparado ao cenário base)
+    """
+    base = simular_financiamento(valor_principal, taxa_mensal, num_parcelas, sistema, indexador=indexador)
+    tabelas = {'Base': base}
+    for nome, eventos in cenarios.items():
+        tabelas[nome] = aplicar_eventos(base, eventos, sistema, indexador, taxa_mensal)
+
+    juros_base = base['Juros'].sum()
+    resumo = pd.DataFrame([
+        {
+            'Cenario': nome,
+            'Total_Pago': tabela['Prestacao'].sum() + tabela['Amortizacao_Extra'].sum(),
+            'Total_Juros': tabela['Juros'].sum(),
+            'Prazo_Final': int(tabela['Periodo'].iloc[-1]) if not tabela.empty else 0,
+            'Ultima_Prestacao': tabela['Prestacao'].iloc[-1] if not tabela.empty else 0.0,
+            'Economia_Juros': juros_base - tabela['Juros'].sum()
+        }
+        for nome, tabela in tabelas.items()
+    ])
+    return tabelas, resumo
@@ -0,0 +1,38 @@
+import json
+import os
+import pickle
+import sqlite3
+import stat
+
+import pytest
+
+import cenarios
+
+@pytest.fixture
+def arquivo_cenarios(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'cenarios.sqlite')
+    monkeypatch.setattr(cenarios, 'CAMINHO_CENARIOS', caminho)
+    yield caminho
+    conexoes = getattr(cenarios._local, 'conexoes', {})
+    if caminho in conexoes:
+        conexoes.pop(caminho).close()
+
+def test_arquivo_sem_donos_e_migrado_para_o_dono_local(arquivo_cenarios):
+    entradas = {'fluxos': [-100, 60, 60], 'taxa': 0.1}
+    hash_ = cenarios.hash_entradas('vpl', entradas)
+    con = sqlite3.connect(arquivo_cenarios)
+    con.execute('CREATE TABLE cenarios (hash TEXT PRIMARY KEY, nome TEXT, tipo TEXT, '
+                'entradas TEXT, resultado BLOB, origem TEXT, criado REAL)')
+    con.execute('INSERT INTO cenarios VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (hash_, 'Projeto', 'vpl', json.dumps(entradas), pickle.dumps(4.13), None, 0.0))
+    con.commit()
+    con.close()
+
+    lista = cenarios.listar_cenarios(dono=cenarios.DONO_PADRAO)
+    assert lista['Hash'].tolist() == [hash_]
+    assert cenarios.abrir_cenario(hash_, cenarios.DONO_PADRAO)['resultado'] == 4.13
+    assert cenarios.listar_cenarios(dono='outro@exemplo.com').empty
+
+def test_arquivo_criado_so_para_o_dono(arquivo_cenarios):
+    cenarios.salvar_cenario('Projeto', 'vpl', {'fluxos': [-100, 60, 60], 'taxa': 0.1})
+    assert stat.S_IMODE(os.stat(arquivo_cenarios).st_mode) == 0o600
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from metricas_blocos import calcular_metricas_em_blocos
+
+def test_serie_que_comeca_com_nan():
+    precos = np.array([np.nan, 100, 110, 121, 133.1])
+    for tamanho_bloco in (1, 2, 3, 10):
+        metricas = calcular_metricas_em_blocos(precos, tamanho_bloco)
+        assert metricas['preco_inicial'] == 100
+        assert metricas['retorno_periodo'] == pytest.approx(0.331)
+
+def test_resultado_nao_depende_do_tamanho_do_bloco():
+    gerador = np.random.default_rng(7)
+    precos = 100 * np.exp(np.cumsum(gerador.normal(0, 0.02, (500, 3)), axis=0))
+    precos[:37, 0] = np.nan
+    precos[200:210, 1] = np.nan
+    precos[-5:, 2] = np.nan
+
+    referencia = calcular_metricas_em_blocos(precos, len(precos))
+    for tamanho_bloco in (1, 7, 64, 499):
+        metricas = calcular_metricas_em_blocos(precos, tamanho_bloco)
+        for chave, valor in referencia.items():
+            np.testing.assert_allclose(metricas[chave], valor, rtol=1e-9, atol=1e-12, err_msg=chave)
@@ -0,0 +1,23 @@
+import pytest
+
+from simulador_financiamento import aplicar_eventos, simular_financiamento
+
+@pytest.mark.parametrize('periodo, parcelas', [(0, 82), (1, 83)])
+def test_aporte_no_modo_prazo_mantem_a_prestacao_e_reduz_o_prazo(periodo, parcelas):
+    eventos = [{'periodo': periodo, 'valor': 20_000, 'modo': 'prazo'}]
+    base = simular_financiamento(100_000, 0.01, 120, 'Price')
+    tabela = simular_financiamento(100_000, 0.01, 120, 'Price', eventos)
+
+    assert len(tabela) == parcelas
+    assert tabela['Prestacao'].iloc[0] == pytest.approx(base['Prestacao'].iloc[0], rel=1e-3)
+    assert aplicar_eventos(base, eventos, 'Price')['Prestacao'].round(6).tolist() == \
+        tabela['Prestacao'].round(6).tolist()
+
+@pytest.mark.parametrize('periodo', [0, 1])
+def test_aporte_no_modo_prazo_mantem_a_amortizacao_sac(periodo):
+    eventos = [{'periodo': periodo, 'valor': 20_000, 'modo': 'prazo'}]
+    base = simular_financiamento(100_000, 0.01, 120, 'SAC')
+    tabela = simular_financiamento(100_000, 0.01, 120, 'SAC', eventos)
+
+    assert len(tabela) == 96
+    assert tabela['Amortizacao'].iloc[0] == pytest.approx(base['Amortizacao'].iloc[0])
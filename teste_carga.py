@@ -0,0 +1,187 @@
+"""
+Teste de carga do app.py com sessões simuladas concorrentes (Streamlit AppTest).
+
+Cada sessão percorre um roteiro realista: troca de ferramenta na barra
+lateral, alteração dos dados de um financiamento e busca de dados de ações no
+provedor sintético (sem rede). Ao final são informados os percentis de latência
+dos reruns, o pico de memória do processo e a taxa de acerto do cache.
+
+Uso: python teste_carga.py --sessoes 20 --repeticoes 3
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Configurado antes de importar o app: provedor sem rede e cache isolado num
+# diretório temporário novo (sobrescreve a configuração do ambiente, para que
+# limpar_cache() nunca apague o cache de uma instalação real)
+os.environ['CALCULADORA_PROVEDOR_DADOS'] = 'sintetico'
+os.environ['CALCULADORA_CACHE_DB'] = os.path.join(tempfile.mkdtemp(prefix='calculadora_carga_'), 'cache.sqlite')
+
+import numpy as np
+import pandas as pd
+
+from cache_mercado import estatisticas_cache, limpar_cache, zerar_estatisticas_cache
+
+CAMINHO_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+PERCENTIS = [50, 95, 99]
+
+def _memoria_pico_mb():
+    """
+    Pico de memória residente do processo em MB (None fora de sistemas Unix)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / 1024 ** 2 if os.uname().sysname == 'Darwin' else pico / 1024
+
+def _serializar_compilacao():
+    """
+    O AppTest recompila app.py a cada rerun e o ast.parse do CPython 3.11 não
+    é seguro entre threads ("AST constructor recursion depth mismatch"). A
+    compilação passa a ser feita uma de cada vez; o servidor real compila o
+    script uma única vez, então isso não altera o que é medido.
+    """
+    from streamlit.runtime.scriptrunner import magic
+
+    if getattr(magic.add_magic, 'serializado', False):
+        return
+    original = magic.add_magic
+    trava = threading.Lock()
+
+    def add_magic(*args, **kwargs):
+        with trava:
+            return original(*args, **kwargs)
+
+    add_magic.serializado = True
+    magic.add_magic = add_magic
+
+def _widget(lista, rotulo):
+    return next(w for w in lista if w.label == rotulo)
+
+def _roteiro(rng):
+    """
+    Passos de uma sessão: (nome, função que altera o AppTest antes do rerun)
+    """
+    passos = [
+        ('ferramenta: juros compostos', lambda at: at.sidebar.selectbox[0].select("Juros Compostos")),
+        ('ferramenta: amortizacao', lambda at: at.sidebar.selectbox[0].select("Sistema de Amortização")),
+        ('amortizacao: valor', lambda at: _widget(at.number_input, "Valor Principal (R$)")
+            .set_value(float(rng.integers(50, 500)) * 1000)),
+        ('amortizacao: parcelas', lambda at: _widget(at.number_input, "Número de Parcelas")
+            .set_value(int(rng.choice([60, 120, 240, 360])))),
+        ('amortizacao: sistema', lambda at: _widget(at.selectbox, "Escolha o sistema de amortização:")
+            .select("Comparação dos Sistemas")),
+        ('ferramenta: investimentos', lambda at: at.sidebar.selectbox[0].select("Análise de Investimentos")),
+    ]
+
+    def escolher_acao(at):
+        caixa = _widget(at.selectbox, "Escolha uma ação:")
+        return caixa.select(caixa.options[rng.integers(len(caixa.options))].split(' - ')[0])
+
+    passos += [
+        ('acoes: escolher', escolher_acao),
+        ('acoes: buscar dados', lambda at: _widget(at.button, "🔍 Buscar Dados da Ação").click()),
+    ]
+    return passos
+
+def _executar_sessao(sessao, repeticoes, timeout, semente):
+    """
+    Executa o roteiro de uma sessão e devolve as medições de cada rerun
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(semente + sessao)
+    at = AppTest.from_file(CAMINHO_APP, default_timeout=timeout)
+    medicoes = []
+
+    def medir(repeticao, passo, preparar):
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            preparar(at).run()
+            if at.exception:
+                erro = at.exception[0].message
+        except Exception as e:
+            erro = str(e)
+        medicoes.append({
+            'Sessao': sessao,
+            'Repeticao': repeticao,
+            'Passo': passo,
+            'Latencia': time.perf_counter() - inicio,
+            'Erro': erro
+        })
+
+    medir(0, 'abrir', lambda at: at)
+    for repeticao in range(repeticoes):
+        for passo, preparar in _roteiro(rng):
+            medir(repeticao, passo, preparar)
+    return medicoes
+
+def executar_carga(sessoes=10, repeticoes=3, timeout=60.0, cache_frio=True, semente=0):
+    """
+    Roda as sessões em paralelo e resume as medições.
+
+    Retorna {'medicoes': DataFrame com um rerun por linha,
+             'resumo': DataFrame de percentis de latência por passo (s),
+             'memoria_pico_mb', 'cache': estatisticas_cache(), 'erros', 'duracao'}
+    """
+    _serializar_compilacao()
+    if cache_frio:
+        limpar_cache()
+    zerar_estatisticas_cache()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessoes) as executor:
+        futuros = [executor.submit(_executar_sessao, s, repeticoes, timeout, semente) for s in range(sessoes)]
+        medicoes = pd.DataFrame([m for f in futuros for m in f.result()])
+    duracao = time.perf_counter() - inicio
+
+    agrupado = medicoes.groupby('Passo', sort=False)['Latencia']
+    resumo = pd.DataFrame({f'p{p}': agrupado.quantile(p / 100) for p in PERCENTIS})
+    resumo.loc['TOTAL'] = [np.percentile(medicoes['Latencia'], p) for p in PERCENTIS]
+    resumo['Reruns'] = agrupado.size().reindex(resumo.index).fillna(len(medicoes)).astype(int)
+
+    return {
+        'medicoes': medicoes,
+        'resumo': resumo,
+        'memoria_pico_mb': _memoria_pico_mb(),
+        'cache': estatisticas_cache(),
+        'erros': int(medicoes['Erro'].notna().sum()),
+        'duracao': duracao
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da Calculadora Financeira")
+    parser.add_argument('--sessoes', type=int, default=10, help="sessões simultâneas")
+    parser.add_argument('--repeticoes', type=int, default=3, help="vezes que cada sessão repete o roteiro")
+    parser.add_argument('--timeout', type=float, default=60.0, help="tempo máximo de cada rerun (s)")
+    parser.add_argument('--cache-quente', action='store_true', help="não limpa o cache antes de começar")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--csv', help="grava as medições de cada rerun neste arquivo")
+    args = parser.parse_args()
+
+    resultado = executar_carga(args.sessoes, args.repeticoes, args.timeout, not args.cache_quente, args.semente)
+
+    print(f"\nSessões: {args.sessoes} | Reruns: {len(resultado['medicoes'])} | "
+          f"Duração: {resultado['duracao']:.1f}s | Erros: {resultado['erros']}")
+    print("\nLatência por rerun (s):")
+    print(resultado['resumo'].round(3).to_string())
+    if resultado['memoria_pico_mb'] is not None:
+        print(f"\nPico de memória (RSS): {resultado['memoria_pico_mb']:.0f} MB")
+    cache = resultado['cache']
+    print(f"Cache: {cache['acertos']} acertos, {cache['faltas']} faltas "
+          f"(taxa de acerto {cache['taxa_acerto']*100:.1f}%)")
+
+    if args.csv:
+        resultado['medicoes'].to_csv(args.csv, index=False)
+
+if __name__ == '__main__':
+    main()